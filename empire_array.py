@@ -0,0 +1,570 @@
+from __future__ import division
+from pyomo.environ import SolverFactory
+from pyomo.opt import TerminationCondition
+from pyomo.core.expr.numeric_expr import LinearExpression
+import pyomo.kernel as pmo
+from preprocess import load_parameters, prepare_parameters, read_param, frames_by_path
+from empire_results import investment_periods, price_cube, result_tasks, start_writers, finish_writers
+from empire_snapshot import write_snapshot
+import scipy.sparse as sp
+import numpy as np
+import csv
+import sys
+import time
+import os
+try:
+    import highspy
+except ImportError:
+    highspy = None #Only needed for solver = "HiGHS"
+
+#Array build engine for EMPIRE. Reads the same .tab files as run_empire,
+#but keeps sets and parameters as NumPy arrays and assembles the LP as
+#sparse coefficient blocks instead of going through AbstractModel/DataPortal.
+
+#Variable arrays are ordered (index set, hour, period, scenario) for
+#operational quantities and (index set, period) for first stage quantities,
+#where the index sets follow the order of the .tab files.
+
+FIRST_STAGE_VARS = ['genInvCap', 'transmisionInvCap', 'storPWInvCap', 'storENInvCap',
+                    'genInstalledCap', 'transmisionInstalledCap', 'storPWInstalledCap', 'storENInstalledCap']
+
+#######
+##LP##
+#######
+
+def new_lp():
+    return {'ncols': 0, 'nrows': 0, 'vars': {}, 'cons': {},
+            'col_lo': [], 'col_up': [], 'cost_cols': [], 'cost_vals': [],
+            'row_lo': [], 'row_up': [], 'rows': [], 'cols': [], 'vals': []}
+
+def add_var(lp, name, shape, lo=0.0, up=np.inf):
+    #Register a block of columns and return their indices in the given shape
+    size = int(np.prod(shape))
+    idx = np.arange(lp['ncols'], lp['ncols'] + size).reshape(shape)
+    lp['vars'][name] = (lp['ncols'], tuple(shape))
+    lp['ncols'] += size
+    lp['col_lo'].append(np.broadcast_to(np.asarray(lo, dtype=float), shape).ravel())
+    lp['col_up'].append(np.broadcast_to(np.asarray(up, dtype=float), shape).ravel())
+    return idx
+
+def set_cost(lp, cols, cost):
+    cols, cost = np.broadcast_arrays(cols, np.asarray(cost, dtype=float))
+    lp['cost_cols'].append(cols.ravel())
+    lp['cost_vals'].append(cost.ravel())
+
+def add_rows(lp, name, shape, lo, up):
+    #Register a block of rows with bounds lo <= A x <= up and return their indices
+    size = int(np.prod(shape))
+    idx = np.arange(lp['nrows'], lp['nrows'] + size).reshape(shape)
+    lp['cons'][name] = (lp['nrows'], tuple(shape))
+    lp['nrows'] += size
+    lp['row_lo'].append(np.broadcast_to(np.asarray(lo, dtype=float), shape).ravel())
+    lp['row_up'].append(np.broadcast_to(np.asarray(up, dtype=float), shape).ravel())
+    return idx
+
+def add_coef(lp, rows, cols, vals):
+    rows, cols, vals = np.broadcast_arrays(rows, cols, np.asarray(vals, dtype=float))
+    lp['rows'].append(rows.ravel())
+    lp['cols'].append(cols.ravel())
+    lp['vals'].append(vals.ravel())
+
+def finish_lp(lp):
+    #Assemble the coefficient blocks into one sparse matrix
+    for key in ['col_lo', 'col_up', 'row_lo', 'row_up']:
+        lp[key] = np.concatenate(lp[key]) if len(lp[key]) > 0 else np.zeros(0)
+    lp['cost'] = np.zeros(lp['ncols'])
+    np.add.at(lp['cost'], np.concatenate(lp['cost_cols']), np.concatenate(lp['cost_vals']))
+    rows = np.concatenate(lp['rows'])
+    cols = np.concatenate(lp['cols'])
+    vals = np.concatenate(lp['vals'])
+    lp['A'] = sp.csr_matrix((vals, (rows, cols)), shape=(lp['nrows'], lp['ncols']))
+    lp['A'].eliminate_zeros()
+    del lp['rows'], lp['cols'], lp['vals'], lp['cost_cols'], lp['cost_vals']
+    return lp
+
+def var_values(lp, x, name):
+    offset, shape = lp['vars'][name]
+    return x[offset:offset + int(np.prod(shape))].reshape(shape)
+
+def con_values(lp, y, name):
+    offset, shape = lp['cons'][name]
+    return y[offset:offset + int(np.prod(shape))].reshape(shape)
+
+def build_lp(d, EMISSION_CAP, OUT_OF_SAMPLE, lengthRegSeason, lengthPeakSeason, firststage=None):
+    #Emit the EMPIRE LP as sparse blocks. If OUT_OF_SAMPLE, first stage columns
+    #are fixed to the values in firststage and investment constraints are left out.
+
+    print("Building sparse LP...")
+
+    nN = len(d['Node'])
+    nGN = len(d['GeneratorsOfNode'])
+    nBN = len(d['StoragesOfNode'])
+    nL = len(d['DirectionalLink'])
+    nA = len(d['BidirectionalArc'])
+    nH = len(d['Operationalhour'])
+    nI = len(d['PeriodActive'])
+    nW = len(d['Scenario'])
+    nS = len(d['Season'])
+    gn_gen = d['gn_gen']
+    bn_stor = d['bn_stor']
+
+    lp = new_lp()
+
+    #############
+    ##VARIABLES##
+    #############
+
+    fixed = {}
+    if OUT_OF_SAMPLE:
+        for v in FIRST_STAGE_VARS:
+            fixed[v] = (firststage[v], firststage[v])
+    genInvCap = add_var(lp, 'genInvCap', (nGN, nI), *fixed.get('genInvCap', (0.0, np.inf)))
+    transmisionInvCap = add_var(lp, 'transmisionInvCap', (nA, nI), *fixed.get('transmisionInvCap', (0.0, np.inf)))
+    storPWInvCap = add_var(lp, 'storPWInvCap', (nBN, nI), *fixed.get('storPWInvCap', (0.0, np.inf)))
+    storENInvCap = add_var(lp, 'storENInvCap', (nBN, nI), *fixed.get('storENInvCap', (0.0, np.inf)))
+    genInstalledCap = add_var(lp, 'genInstalledCap', (nGN, nI), *fixed.get('genInstalledCap', (0.0, np.inf)))
+    transmisionInstalledCap = add_var(lp, 'transmisionInstalledCap', (nA, nI), *fixed.get('transmisionInstalledCap', (0.0, np.inf)))
+    storPWInstalledCap = add_var(lp, 'storPWInstalledCap', (nBN, nI), *fixed.get('storPWInstalledCap', (0.0, np.inf)))
+    storENInstalledCap = add_var(lp, 'storENInstalledCap', (nBN, nI), *fixed.get('storENInstalledCap', (0.0, np.inf)))
+
+    genOperational = add_var(lp, 'genOperational', (nGN, nH, nI, nW))
+    storOperational = add_var(lp, 'storOperational', (nBN, nH, nI, nW))
+    transmisionOperational = add_var(lp, 'transmisionOperational', (nL, nH, nI, nW))
+    storCharge = add_var(lp, 'storCharge', (nBN, nH, nI, nW))
+    storDischarge = add_var(lp, 'storDischarge', (nBN, nH, nI, nW))
+    loadShed = add_var(lp, 'loadShed', (nN, nH, nI, nW))
+
+    #############
+    ##OBJECTIVE##
+    #############
+
+    disc = d['discount_multiplier']
+    opscale = d['operationalDiscountrate']*disc[None,None,:,None]*d['hourScale'][None,:,None,None]*d['sceProbab'][None,None,None,:]
+    set_cost(lp, genInvCap, disc[None,:]*d['genInvCost'][gn_gen])
+    set_cost(lp, transmisionInvCap, disc[None,:]*d['transmissionInvCost'])
+    set_cost(lp, storPWInvCap, disc[None,:]*d['storPWInvCost'][bn_stor])
+    set_cost(lp, storENInvCap, disc[None,:]*d['storENInvCost'][bn_stor])
+    set_cost(lp, loadShed, opscale*d['nodeLostLoadCost'][:,None,:,None])
+    set_cost(lp, genOperational, opscale*d['genMargCost'][gn_gen][:,None,:,None])
+
+    ###############
+    ##CONSTRAINTS##
+    ###############
+
+    #FlowBalance
+    rows = add_rows(lp, 'FlowBalance', (nN, nH, nI, nW), d['sload'], d['sload'])
+    add_coef(lp, rows[d['gn_node']], genOperational, 1.0)
+    add_coef(lp, rows[d['bn_node']], storDischarge, d['storageDischargeEff'][bn_stor][:,None,None,None])
+    add_coef(lp, rows[d['bn_node']], storCharge, -1.0)
+    add_coef(lp, rows[d['link_to']], transmisionOperational, d['lineEfficiency'][:,None,None,None])
+    add_coef(lp, rows[d['link_from']], transmisionOperational, -1.0)
+    add_coef(lp, rows, loadShed, 1.0)
+
+    #maxGenProduction
+    rows = add_rows(lp, 'maxGenProduction', (nGN, nH, nI, nW), -np.inf, 0.0)
+    add_coef(lp, rows, genOperational, 1.0)
+    add_coef(lp, rows, genInstalledCap[:,None,:,None], -d['genCapAvail'])
+
+    #ramping
+    thermal = np.flatnonzero(d['gen_thermal'][gn_gen])
+    hours = np.flatnonzero(~d['hour_first'] & (d['hour_prev'] >= 0))
+    rows = add_rows(lp, 'ramping', (len(thermal), len(hours), nI, nW), -np.inf, 0.0)
+    add_coef(lp, rows, genOperational[thermal][:,hours], 1.0)
+    add_coef(lp, rows, genOperational[thermal][:,d['hour_prev'][hours]], -1.0)
+    add_coef(lp, rows, genInstalledCap[thermal][:,None,:,None], -d['genRampUpCap'][gn_gen[thermal]][:,None,None,None])
+
+    #storage_energy_balance
+    first = d['hour_first']
+    rows = add_rows(lp, 'storage_energy_balance', (nBN, nH, nI, nW), 0.0, 0.0)
+    add_coef(lp, rows[:,first], storENInstalledCap[:,None,:,None], d['storOperationalInit'][bn_stor][:,None,None,None])
+    add_coef(lp, rows[:,~first], storOperational[:,d['hour_prev'][~first]], d['storageBleedEff'][bn_stor][:,None,None,None])
+    add_coef(lp, rows, storCharge, d['storageChargeEff'][bn_stor][:,None,None,None])
+    add_coef(lp, rows, storDischarge, -1.0)
+    add_coef(lp, rows, storOperational, -1.0)
+
+    #storage_seasonal_net_zero_balance
+    hourpos = {h: k for k, h in enumerate(d['Operationalhour'])}
+    firsthours = [hourpos[h] for h in d['FirstHoursOfRegSeason']] + [hourpos[h] for h in d['FirstHoursOfPeakSeason']]
+    lasthours = [hourpos[h + lengthRegSeason - 1] for h in d['FirstHoursOfRegSeason']] + [hourpos[h + lengthPeakSeason - 1] for h in d['FirstHoursOfPeakSeason']]
+    rows = add_rows(lp, 'storage_seasonal_net_zero_balance', (nBN, len(firsthours), nI, nW), 0.0, 0.0)
+    add_coef(lp, rows, storOperational[:,lasthours], 1.0)
+    add_coef(lp, rows, storENInstalledCap[:,None,:,None], -d['storOperationalInit'][bn_stor][:,None,None,None])
+
+    #storage_operational_cap
+    rows = add_rows(lp, 'storage_operational_cap', (nBN, nH, nI, nW), -np.inf, 0.0)
+    add_coef(lp, rows, storOperational, 1.0)
+    add_coef(lp, rows, storENInstalledCap[:,None,:,None], -1.0)
+
+    #storage_power_discharg_cap
+    rows = add_rows(lp, 'storage_power_discharg_cap', (nBN, nH, nI, nW), -np.inf, 0.0)
+    add_coef(lp, rows, storDischarge, 1.0)
+    add_coef(lp, rows, storPWInstalledCap[:,None,:,None], -d['storageDiscToCharRatio'][bn_stor][:,None,None,None])
+
+    #storage_power_charg_cap
+    rows = add_rows(lp, 'storage_power_charg_cap', (nBN, nH, nI, nW), -np.inf, 0.0)
+    add_coef(lp, rows, storCharge, 1.0)
+    add_coef(lp, rows, storPWInstalledCap[:,None,:,None], -1.0)
+
+    #hydro_gen_limit
+    reghydro = np.flatnonzero(d['gen_reghydro'][gn_gen])
+    rows = add_rows(lp, 'hydro_gen_limit', (len(reghydro), nS, nI, nW), -np.inf, d['maxRegHydroGen'][d['gn_node'][reghydro]].transpose(0, 2, 1, 3))
+    inseason = np.flatnonzero(d['hour_season'] >= 0)
+    add_coef(lp, rows[:,d['hour_season'][inseason]], genOperational[reghydro][:,inseason], 1.0)
+
+    #hydro_node_limit
+    hydro = np.flatnonzero(d['gen_hydro'][gn_gen])
+    nodes = np.unique(d['gn_node'][hydro])
+    rows = add_rows(lp, 'hydro_node_limit', (len(nodes), nI), -np.inf, d['maxHydroNode'][nodes][:,None])
+    rowofnode = np.searchsorted(nodes, d['gn_node'][hydro])
+    add_coef(lp, rows[rowofnode][:,None,:,None], genOperational[hydro],
+             d['hourScale'][None,:,None,None]*d['sceProbab'][None,None,None,:])
+
+    #transmission_cap
+    rows = add_rows(lp, 'transmission_cap', (nL, nH, nI, nW), -np.inf, 0.0)
+    add_coef(lp, rows, transmisionOperational, 1.0)
+    add_coef(lp, rows, transmisionInstalledCap[d['link_arc']][:,None,:,None], -1.0)
+
+    #emission_cap
+    if EMISSION_CAP:
+        rows = add_rows(lp, 'emission_cap', (nI, nW), -np.inf, d['CO2cap'][:,None])
+        emission = d['genCO2TypeFactor'][gn_gen][:,None]*(3.6/d['genEfficiency'][gn_gen])
+        add_coef(lp, rows[None,None,:,:], genOperational,
+                 d['hourScale'][None,:,None,None]*emission[:,None,:,None]/1000000)
+
+    ########################
+    #INVESTMENT CONSTRAINTS#
+    ########################
+
+    if not OUT_OF_SAMPLE:
+        I = np.array(d['PeriodActive'], dtype=float)
+        LeapYearsInvestment = d['LeapYearsInvestment']
+
+        def lifetime_rows(name, invcap, installedcap, initcap, lifetime):
+            #sum of investments still alive - installed capacity = - initial capacity
+            rows = add_rows(lp, name, installedcap.shape, -initcap, -initcap)
+            startperiod = np.maximum(1, 1 + I[None,:] - lifetime[:,None]/LeapYearsInvestment)
+            for j in range(len(I)):
+                alive = (I[j] >= startperiod) & (I[j] <= I[None,:])
+                k, i = np.nonzero(alive)
+                add_coef(lp, rows[k,i], invcap[k,j], 1.0)
+            add_coef(lp, rows, installedcap, -1.0)
+
+        lifetime_rows('installedCapDefinitionGen', genInvCap, genInstalledCap, d['genInitCap'], d['genLifetime'][gn_gen])
+        lifetime_rows('installedCapDefinitionStorEN', storENInvCap, storENInstalledCap, d['storENInitCap'], d['storageLifetime'][bn_stor])
+        lifetime_rows('installedCapDefinitionStorPOW', storPWInvCap, storPWInstalledCap, d['storPWInitCap'], d['storageLifetime'][bn_stor])
+        lifetime_rows('installedCapDefinitionTrans', transmisionInvCap, transmisionInstalledCap, d['transmissionInitCap'], d['transmissionLifetime'])
+
+        #Technology limits per node only where the node has generators of the technology
+        techofgn = d['tech_gen'][:, gn_gen] #technology x generators of node
+        t, k = np.nonzero(techofgn)
+        pairs = np.unique(np.stack([t, d['gn_node'][k]], axis=1), axis=0) if len(t) > 0 else np.zeros((0, 2), dtype=int)
+        pairpos = {(a, b): p for p, (a, b) in enumerate(pairs.tolist())}
+        rowofgn = np.array([pairpos[(a, d['gn_node'][b])] for a, b in zip(t, k)], dtype=int)
+
+        rows = add_rows(lp, 'investment_gen_cap', (len(pairs), nI), -np.inf, d['genMaxBuiltCap'][pairs[:,1], pairs[:,0]])
+        add_coef(lp, rows[rowofgn], genInvCap[k], 1.0)
+
+        rows = add_rows(lp, 'investment_trans_cap', (nA, nI), -np.inf, d['transmissionMaxBuiltCap'])
+        add_coef(lp, rows, transmisionInvCap, 1.0)
+
+        rows = add_rows(lp, 'investment_storage_power_cap', (nBN, nI), -np.inf, d['storPWMaxBuiltCap'])
+        add_coef(lp, rows, storPWInvCap, 1.0)
+
+        rows = add_rows(lp, 'investment_storage_energy_cap', (nBN, nI), -np.inf, d['storENMaxBuiltCap'])
+        add_coef(lp, rows, storENInvCap, 1.0)
+
+        rows = add_rows(lp, 'installed_gen_cap', (len(pairs), nI), -np.inf, d['genMaxInstalledCap'][pairs[:,1], pairs[:,0]])
+        add_coef(lp, rows[rowofgn], genInstalledCap[k], 1.0)
+
+        rows = add_rows(lp, 'installed_trans_cap', (nA, nI), -np.inf, d['transmissionMaxInstalledCap'])
+        add_coef(lp, rows, transmisionInstalledCap, 1.0)
+
+        rows = add_rows(lp, 'installed_storage_power_cap', (nBN, nI), -np.inf, d['storPWMaxInstalledCap'])
+        add_coef(lp, rows, storPWInstalledCap, 1.0)
+
+        rows = add_rows(lp, 'installed_storage_energy_cap', (nBN, nI), -np.inf, d['storENMaxInstalledCap'])
+        add_coef(lp, rows, storENInstalledCap, 1.0)
+
+        dependent = np.flatnonzero(d['stor_dependent'][bn_stor])
+        rows = add_rows(lp, 'power_energy_relate', (len(dependent), nI), 0.0, 0.0)
+        add_coef(lp, rows, storPWInstalledCap[dependent], 1.0)
+        add_coef(lp, rows, storENInstalledCap[dependent], -d['storagePowToEnergy'][bn_stor[dependent]][:,None])
+
+    return finish_lp(lp)
+
+#########
+##SOLVE##
+#########
+
+def lp_block(lp):
+    #Sparse LP as a pyomo.kernel block with a matrix constraint and row duals
+
+    m = pmo.block()
+    m.x = pmo.variable_list(pmo.variable(lb=lo, ub=(None if up == np.inf else up))
+                            for lo, up in zip(lp['col_lo'].tolist(), lp['col_up'].tolist()))
+    nz = np.flatnonzero(lp['cost'])
+    m.Obj = pmo.objective(LinearExpression([c*m.x[j] for c, j in zip(lp['cost'][nz].tolist(), nz.tolist())]), sense=pmo.minimize)
+    m.c = pmo.matrix_constraint(lp['A'], x=list(m.x))
+    m.c.lb = np.where(np.isinf(lp['row_lo']), -np.inf, lp['row_lo'])
+    m.c.ub = np.where(np.isinf(lp['row_up']), np.inf, lp['row_up'])
+    m.dual = pmo.suffix(direction=pmo.suffix.IMPORT)
+    return m
+
+def lp_solver(solver, SOLVER_INTERFACE):
+    #Solver with the same options as run_empire. The file interface writes
+    #the problem to TempfileManager.tempdir for the solver executable, the
+    #memory interface hands it over through the solver's Python API.
+
+    if SOLVER_INTERFACE == "file":
+        if solver == "CPLEX":
+            opt = SolverFactory("cplex", Verbose=True)
+            opt.options["lpmethod"] = 4
+            opt.options["barrier crossover"] = -1
+        if solver == "Xpress":
+            opt = SolverFactory("xpress") #Verbose=True
+            opt.options["defaultAlg"] = 4
+            opt.options["crossover"] = 0
+            opt.options["lpLog"] = 1
+            opt.options["Trace"] = 1
+        if solver == "Gurobi":
+            opt = SolverFactory('gurobi', Verbose=True)
+            opt.options["Crossover"]=0
+            opt.options["Method"]=2
+    else:
+        if solver == "CPLEX":
+            opt = SolverFactory("cplex_direct")
+            opt.options["lpmethod"] = 4
+            opt.options["barrier_crossover"] = -1
+        if solver == "Xpress":
+            opt = SolverFactory("xpress_direct")
+            opt.options["defaultAlg"] = 4
+            opt.options["crossover"] = 0
+            opt.options["lpLog"] = 1
+        if solver == "Gurobi":
+            opt = SolverFactory("gurobi_direct")
+            opt.options["Crossover"]=0
+            opt.options["Method"]=2
+        if solver == "HiGHS":
+            opt = SolverFactory("appsi_highs")
+            opt.options["solver"] = "ipm"
+    return opt
+
+def solve_instance(instance, solver, SOLVER_INTERFACE, tee, logfile):
+    #Solve a pyomo model with lp_solver. Returns the solver results.
+
+    opt = lp_solver(solver, SOLVER_INTERFACE)
+    if solver == "HiGHS":
+        #The appsi interface takes the log file through its config
+        opt.config.logfile = logfile
+        return opt.solve(instance, tee=tee)
+    return opt.solve(instance, tee=tee, logfile=logfile)
+
+def block_solution(m):
+    #Columns that appear in no row and have no cost are not sent to the
+    #solver and come back without a value. Any value in their bounds is
+    #optimal, so take the one closest to zero.
+    x = np.array([v.value if v.value is not None else
+                  min(max(0.0, -np.inf if v.lb is None else v.lb), np.inf if v.ub is None else v.ub) for v in m.x])
+    y = np.array([m.dual.get(c, 0.0) for c in m.c])
+    return x, y
+
+HIGHS_STATUS = {'kOptimal': TerminationCondition.optimal,
+                'kInfeasible': TerminationCondition.infeasible,
+                'kUnboundedOrInfeasible': TerminationCondition.infeasibleOrUnbounded,
+                'kUnbounded': TerminationCondition.unbounded}
+
+def highs_solve(lp, tee, logfile):
+    #Hand the sparse LP to HiGHS as column-wise arrays
+
+    inf = highspy.kHighsInf
+    A = lp['A'].tocsc()
+    model = highspy.HighsLp()
+    model.num_col_ = A.shape[1]
+    model.num_row_ = A.shape[0]
+    model.col_cost_ = lp['cost']
+    model.col_lower_ = np.clip(lp['col_lo'], -inf, inf)
+    model.col_upper_ = np.clip(lp['col_up'], -inf, inf)
+    model.row_lower_ = np.clip(lp['row_lo'], -inf, inf)
+    model.row_upper_ = np.clip(lp['row_up'], -inf, inf)
+    model.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+    model.a_matrix_.start_ = A.indptr.astype(np.int32)
+    model.a_matrix_.index_ = A.indices.astype(np.int32)
+    model.a_matrix_.value_ = A.data
+
+    h = highspy.Highs()
+    h.setOptionValue("output_flag", tee)
+    h.setOptionValue("solver", "ipm")
+    if logfile is not None:
+        h.setOptionValue("log_file", logfile)
+    h.passModel(model)
+    h.run()
+
+    status = HIGHS_STATUS.get(h.getModelStatus().name, TerminationCondition.other)
+    solution = h.getSolution()
+    if not solution.value_valid:
+        return status, np.zeros(model.num_col_), np.zeros(model.num_row_)
+    return status, np.array(solution.col_value), np.array(solution.row_dual)
+
+def solve_array(lp, solver, SOLVER_INTERFACE, tee=False, logfile=None, quadratic=None):
+    #Solve the sparse LP with an optional 0.5 x'Qx term with diagonal quadratic.
+    #HiGHS gets the arrays directly and takes no quadratic term, the other
+    #solvers a pyomo.kernel block.
+    #Returns the termination condition, primal values and row duals.
+
+    if solver == "HiGHS":
+        if quadratic is not None:
+            sys.exit("ERROR! Quadratic objective terms are not available with HiGHS! Options: CPLEX, Xpress, Gurobi")
+        return highs_solve(lp, tee, logfile)
+
+    m = lp_block(lp)
+    if quadratic is not None:
+        m.Obj.expr = m.Obj.expr + sum(0.5*r*m.x[j]**2 for j, r in zip(np.flatnonzero(quadratic).tolist(), quadratic[quadratic != 0].tolist()))
+    results = lp_solver(solver, SOLVER_INTERFACE).solve(m, tee=tee, logfile=logfile)
+    x, y = block_solution(m)
+    return results.solver.termination_condition, x, y
+
+def solve_lp(lp, solver, SOLVER_INTERFACE, logfile):
+    #Returns primal values, row duals and the objective value
+
+    status, x, y = solve_array(lp, solver, SOLVER_INTERFACE, tee=True, logfile=logfile)
+    if status != TerminationCondition.optimal:
+        sys.exit("ERROR! LP not solved to optimality: " + str(status))
+    return x, y, float(lp['cost'] @ x)
+
+###########
+##RESULTS##
+###########
+
+def write_results(d, lp, x, y, obj, result_file_path, LeapYearsInvestment, EMISSION_CAP, OUTPUT_FORMAT, OUTPUT_LEVEL, NO_OF_WORKERS, settings):
+    #Result files from the solution arrays. With the row duals y the price cube
+    #comes from the FlowBalance rows as in run_empire, without them (the
+    #decomposition modes) the files with prices are left out.
+
+    print("Writing results to .csv...")
+
+    inv_per = investment_periods(d['PeriodActive'], LeapYearsInvestment)
+
+    f = open('results_objective.csv', 'a+', newline='')
+    writer = csv.writer(f)
+    writer.writerow([result_file_path, obj])
+    f.close()
+
+    sol = {v: var_values(lp, x, v) for v in lp['vars']}
+    if y is not None:
+        sol['price'] = price_cube(d, con_values(lp, y, 'FlowBalance'))
+        if EMISSION_CAP:
+            sol['emission_cap'] = con_values(lp, y, 'emission_cap')
+    else:
+        print("WARNING! No duals from the decomposition, results_output_Operational.csv, results_output_EuropeSummary.csv and the price cube are not written")
+    start = time.time()
+    tasks = result_tasks(result_file_path, inv_per, False, False, EMISSION_CAP, OUTPUT_FORMAT, OUTPUT_LEVEL, y is not None)
+    if settings is not None:
+        settings['objective'] = obj
+        tasks.append(('snapshot', write_snapshot, (result_file_path, settings)))
+    finish_writers(*start_writers(d, sol, tasks, NO_OF_WORKERS), start)
+
+#######
+##RUN##
+#######
+
+def run_empire_array(name, tab_file_path, result_file_path, scenariogeneration, scenario_data_path,
+                     solver, temp_dir, FirstHoursOfRegSeason, FirstHoursOfPeakSeason, lengthRegSeason,
+                     lengthPeakSeason, Period, Operationalhour, Scenario, Season, HoursOfSeason,
+                     discountrate, WACC, LeapYearsInvestment, HEATMODULE, DRMODULE,
+                     IAMC_PRINT, WRITE_LP, PICKLE_INSTANCE, EMISSION_CAP,
+                     OUT_OF_SAMPLE, sample_file_path, USE_TEMP_DIR, LOADCHANGEMODULE,
+                     SOLUTION_METHOD="extensive", NO_OF_WORKERS=1, OOS_SPLIT="none", SOLVER_INTERFACE="file",
+                     OUTPUT_FORMAT="csv", OUTPUT_LEVEL="hourly", SNAPSHOT=False, BENDERS_GAP=1e-4, BENDERS_MAX_ITER=200,
+                     BENDERS_CUTS="scenario", PH_TOLERANCE=1e-3, PH_MAX_ITER=200, PH_RHO_SCALE=1.0, tab_frames=None):
+
+    if HEATMODULE or DRMODULE:
+        sys.exit("ERROR! The array build engine does not support HEATMODULE or DRMODULE! Use BUILD_ENGINE = 'pyomo'")
+
+    if IAMC_PRINT or WRITE_LP or PICKLE_INSTANCE:
+        sys.exit("ERROR! The array build engine does not support IAMC_PRINT, WRITE_LP or PICKLE_INSTANCE! Use BUILD_ENGINE = 'pyomo'")
+
+    #Tables from reader.generate_tab_files, read from memory instead of the .tab files
+    frames = frames_by_path(tab_file_path, tab_frames)
+
+    if scenariogeneration:
+        scenariopath = tab_file_path
+    else:
+        if OUT_OF_SAMPLE:
+            scenariopath = sample_file_path
+        else:
+            scenariopath = scenario_data_path
+
+    start = time.time()
+
+    print("Reading sets and parameters...")
+
+    d = load_parameters(tab_file_path, scenariopath, Period, Operationalhour, Scenario, Season,
+                        HoursOfSeason, FirstHoursOfRegSeason, FirstHoursOfPeakSeason,
+                        HEATMODULE, DRMODULE, EMISSION_CAP, LOADCHANGEMODULE,
+                        frames=frames)
+    d['LeapYearsInvestment'] = LeapYearsInvestment
+
+    firststage = None
+    if OUT_OF_SAMPLE:
+        GN = d['GeneratorsOfNode']
+        BN = d['StoragesOfNode']
+        A = d['BidirectionalArc']
+        I = d['PeriodActive']
+        firststage = {}
+        for (v, labels) in [('genInvCap', GN), ('transmisionInvCap', A), ('storPWInvCap', BN), ('storENInvCap', BN),
+                            ('genInstalledCap', GN), ('transmisionInstalledCap', A), ('storPWInstalledCap', BN), ('storENInstalledCap', BN)]:
+            firststage[v] = read_param(result_file_path + "/" + v + '.tab', [labels, I])
+        result_file_path = result_file_path + "out-of-sample"
+        if not os.path.exists(result_file_path):
+            os.makedirs(result_file_path)
+
+    d = prepare_parameters(d, result_file_path, name, discountrate, WACC, LeapYearsInvestment,
+                           lengthRegSeason, HEATMODULE, LOADCHANGEMODULE)
+
+    lp = build_lp(d, EMISSION_CAP, OUT_OF_SAMPLE, lengthRegSeason, lengthPeakSeason, firststage)
+
+    end = time.time()
+    print("Building LP took [sec]:")
+    print(end - start)
+
+    print("----------------------Problem Statistics---------------------")
+    print("Nodes: "+ str(len(d['Node'])))
+    print("Lines: "+str(len(d['BidirectionalArc'])))
+    print("TotalGenerators: "+str(len(d['GeneratorsOfNode'])))
+    print("TotalStorages: "+str(len(d['StoragesOfNode'])))
+    print("Scenarios: "+str(len(d['Scenario'])))
+    print("Columns: "+str(lp['ncols']))
+    print("Rows: "+str(lp['nrows']))
+    print("Nonzeros: "+str(lp['A'].nnz))
+    print("--------------------------------------------------------------")
+
+    y = None
+    if OUT_OF_SAMPLE and OOS_SPLIT != "none":
+        #Imported here since the decomposition modules build on the LP helpers above
+        from empire_benders import solve_out_of_sample
+        print("Solving out-of-sample LP per " + OOS_SPLIT + "...")
+        x, obj = solve_out_of_sample(lp, FIRST_STAGE_VARS, d['PeriodActive'], d['Scenario'], d['Season'], d['hour_season'],
+                                     OOS_SPLIT, solver, SOLVER_INTERFACE, NO_OF_WORKERS, result_file_path, name)
+    elif SOLUTION_METHOD == "benders":
+        from empire_benders import solve_benders
+        print("Solving with Benders decomposition...")
+        x, obj = solve_benders(lp, FIRST_STAGE_VARS, len(d['PeriodActive']), len(d['Scenario']), solver,
+                               SOLVER_INTERFACE, NO_OF_WORKERS, result_file_path, name, cuts=BENDERS_CUTS,
+                               gap=BENDERS_GAP, max_iter=BENDERS_MAX_ITER)
+    elif SOLUTION_METHOD == "ph":
+        from empire_ph import solve_ph
+        print("Solving with Progressive Hedging...")
+        x, obj = solve_ph(lp, FIRST_STAGE_VARS, len(d['PeriodActive']), len(d['Scenario']), solver,
+                          SOLVER_INTERFACE, NO_OF_WORKERS, result_file_path, name, tolerance=PH_TOLERANCE,
+                          max_iter=PH_MAX_ITER, rho_scale=PH_RHO_SCALE)
+    else:
+        print("Solving...")
+        x, y, obj = solve_lp(lp, solver, SOLVER_INTERFACE, result_file_path + '/logfile_' + name + '.log')
+
+    settings = None
+    if SNAPSHOT:
+        #The snapshot has a price cube only with the duals of the extensive form
+        settings = {'name': name, 'BUILD_ENGINE': 'array', 'SOLUTION_METHOD': SOLUTION_METHOD, 'OUT_OF_SAMPLE': OUT_OF_SAMPLE,
+                    'HEATMODULE': False, 'DRMODULE': False, 'EMISSION_CAP': EMISSION_CAP, 'IAMC_PRINT': False,
+                    'LeapYearsInvestment': LeapYearsInvestment, 'discountrate': discountrate}
+    write_results(d, lp, x, y, obj, result_file_path, LeapYearsInvestment, EMISSION_CAP, OUTPUT_FORMAT, OUTPUT_LEVEL, NO_OF_WORKERS, settings)
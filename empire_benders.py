@@ -0,0 +1,399 @@
+from __future__ import division
+from pyomo.opt import TerminationCondition
+from empire_array import solve_array
+from empire_pool import process_pool, pool_map
+import scipy.sparse as sp
+import numpy as np
+import csv
+import sys
+import time
+
+#Benders (L-shaped) decomposition of the LP from the array build engine.
+#The first stage columns (investments and installed capacities) form the
+#master problem and the operational columns of every (period, scenario) pair
+#form one subproblem. Rows that link several subproblems, i.e. hydro_node_limit
+#which takes the expectation over scenarios, are split with one budget column
+#per subproblem in the master: sum of budgets <= limit in the master and
+#production <= budget in every subproblem. The LP itself is still built in
+#full by build_lp and split here, so the build needs the memory of the
+#extensive form. Only the solves are per subproblem.
+
+#Optimality cuts are aggregated per scenario ("scenario"), kept per
+#subproblem ("period-scenario") or summed into one cut ("single").
+CUT_AGGREGATIONS = ['scenario', 'period-scenario', 'single']
+
+#The master is stabilised with a box trust region on the first stage columns
+#around the best solution so far, which grows when a step to the edge of the
+#box improves on the best solution as the cuts predicted. The lower bound is
+#the master without the box whenever the box binds.
+
+#The same split evaluates out-of-sample scenarios in parallel once the first
+#stage is fixed (solve_out_of_sample).
+
+#################
+##DECOMPOSITION##
+#################
+
+def column_blocks(lp, firstvars, nI, nW, hour_season=None):
+    #Subproblem of every column, -1 for first stage columns. Subproblems are
+    #(period, scenario) pairs, numbered period*nW + scenario, or with
+    #hour_season (period, scenario, season) triples
+    colblock = np.full(lp['ncols'], -1, dtype=int)
+    blocks = np.arange(nI*nW).reshape(1, nI, nW)
+    if hour_season is not None:
+        blocks = blocks*(hour_season.max() + 1) + np.maximum(hour_season, 0)[:,None,None]
+    for name, (offset, shape) in lp['vars'].items():
+        if name in firstvars:
+            continue
+        if tuple(shape[-2:]) != (nI, nW) or (hour_season is not None and shape[-3] != len(hour_season)):
+            sys.exit("ERROR! Decomposition needs operational variables indexed by (..., hour, period, scenario): " + name)
+        colblock[offset:offset + int(np.prod(shape))] = np.broadcast_to(blocks, shape).ravel()
+    return colblock
+
+def members(block, nblocks):
+    #Indices with block k for every k in 0..nblocks-1
+    idx = np.flatnonzero(block >= 0)
+    idx = idx[np.argsort(block[idx], kind='stable')]
+    return np.split(idx, np.cumsum(np.bincount(block[idx], minlength=nblocks))[:-1])
+
+def decompose(lp, colblock, nblocks, group):
+    #Split the LP into a master problem and one subproblem per block
+
+    A = lp['A'].tocsr()
+    coo = A.tocoo()
+    entryblock = colblock[coo.col]
+    op = entryblock >= 0
+    rowmin = np.full(lp['nrows'], nblocks, dtype=int)
+    rowmax = np.full(lp['nrows'], -1, dtype=int)
+    np.minimum.at(rowmin, coo.row[op], entryblock[op])
+    np.maximum.at(rowmax, coo.row[op], entryblock[op])
+    masterrows = np.flatnonzero(rowmax < 0)
+    linkrows = np.flatnonzero((rowmax >= 0) & (rowmin != rowmax))
+    rowblock = np.where((rowmax >= 0) & (rowmin == rowmax), rowmax, -1)
+
+    firstcols = np.flatnonzero(colblock < 0)
+    nfirst = len(firstcols)
+    ngroups = int(group.max()) + 1
+
+    #Budget columns: the part of a linking row taken by one subproblem
+    islink = np.zeros(lp['nrows'], dtype=bool)
+    islink[linkrows] = True
+    linkentry = op & islink[coo.row]
+    pairs, pairofentry = np.unique(np.stack([coo.row[linkentry], entryblock[linkentry]], axis=1), axis=0, return_inverse=True)
+    pairofentry = pairofentry.ravel()
+    npairs = len(pairs)
+    prow = pairs[:,0]
+    pblock = pairs[:,1]
+
+    #Activity bounds of every budget from the column bounds
+    a = coo.data[linkentry]
+    lo = lp['col_lo'][coo.col[linkentry]]
+    up = lp['col_up'][coo.col[linkentry]]
+    actmin = np.zeros(npairs)
+    actmax = np.zeros(npairs)
+    np.add.at(actmin, pairofentry, np.where(a > 0, a*lo, a*up))
+    np.add.at(actmax, pairofentry, np.where(a > 0, a*up, a*lo))
+    budget_lo = np.where(np.isinf(lp['row_up'][prow]), -np.inf, actmin)
+    budget_up = np.where(np.isinf(lp['row_lo'][prow]), np.inf, actmax)
+
+    #Lower bound of the operational cost of every group
+    cost = lp['cost']
+    nz = np.flatnonzero((cost != 0) & (colblock >= 0))
+    lowest = np.minimum(cost[nz]*lp['col_lo'][nz], cost[nz]*lp['col_up'][nz])
+    theta_lo = np.zeros(ngroups)
+    np.add.at(theta_lo, group[colblock[nz]], lowest)
+    if np.isinf(theta_lo).any():
+        sys.exit("ERROR! Benders decomposition needs operational costs that are bounded below!")
+
+    nmaster = nfirst + npairs + ngroups
+    theta = np.arange(nfirst + npairs, nmaster)
+    budget = np.arange(nfirst, nfirst + npairs)
+
+    def first_stage_part(rows):
+        return sp.hstack([A[rows][:, firstcols], sp.csr_matrix((len(rows), npairs + ngroups))], format='csr')
+
+    linkpos = np.searchsorted(linkrows, prow)
+    master = {'ncols': nmaster, 'theta': theta, 'nfirst': nfirst,
+              'col_lo': np.concatenate([lp['col_lo'][firstcols], budget_lo, theta_lo]),
+              'col_up': np.concatenate([lp['col_up'][firstcols], budget_up, np.full(ngroups, np.inf)]),
+              'cost': np.concatenate([cost[firstcols], np.zeros(npairs), np.ones(ngroups)]),
+              'A': sp.vstack([first_stage_part(masterrows),
+                              first_stage_part(linkrows) + sp.csr_matrix((np.ones(npairs), (linkpos, budget)), shape=(len(linkrows), nmaster))], format='csr'),
+              'row_lo': np.concatenate([lp['row_lo'][masterrows], lp['row_lo'][linkrows]]),
+              'row_up': np.concatenate([lp['row_up'][masterrows], lp['row_up'][linkrows]]),
+              'firstcols': firstcols}
+
+    subproblems = []
+    pairsof = members(pblock, nblocks)
+    for k, (rows, cols) in enumerate(zip(members(rowblock, nblocks), members(colblock, nblocks))):
+        p = pairsof[k]
+        subproblems.append({'cols': cols,
+                            'col_lo': lp['col_lo'][cols],
+                            'col_up': lp['col_up'][cols],
+                            'cost': cost[cols],
+                            'A': sp.vstack([A[rows][:, cols], A[prow[p]][:, cols]], format='csr'),
+                            'T': sp.vstack([first_stage_part(rows),
+                                            sp.csr_matrix((-np.ones(len(p)), (np.arange(len(p)), budget[p])), shape=(len(p), nmaster))], format='csr'),
+                            'row_lo': np.concatenate([lp['row_lo'][rows], np.where(np.isinf(lp['row_lo'][prow[p]]), -np.inf, 0.0)]),
+                            'row_up': np.concatenate([lp['row_up'][rows], np.where(np.isinf(lp['row_up'][prow[p]]), np.inf, 0.0)])})
+
+    return master, subproblems
+
+################
+##SUBPROBLEMS##
+################
+
+_subproblems = None
+_solver = None
+_interface = None
+
+def init_worker(subproblems, solver, SOLVER_INTERFACE):
+    global _subproblems, _solver, _interface
+    _subproblems = subproblems
+    _solver = solver
+    _interface = SOLVER_INTERFACE
+
+def solve_subproblem(k, xmaster, keep):
+    #Solve subproblem k with the master columns at xmaster. Returns whether it
+    #is feasible, its cost (or total violation if infeasible), the gradient
+    #with respect to the master columns and, if keep, the operational values.
+
+    sub = _subproblems[k]
+    shift = sub['T'] @ xmaster
+    lp = {'col_lo': sub['col_lo'], 'col_up': sub['col_up'], 'cost': sub['cost'], 'A': sub['A'],
+          'row_lo': sub['row_lo'] - shift, 'row_up': sub['row_up'] - shift}
+    status, x, y = solve_array(lp, _solver, _interface)
+
+    if status in [TerminationCondition.infeasible, TerminationCondition.infeasibleOrUnbounded]:
+        #Minimize the violation of the rows instead
+        nrows = sub['A'].shape[0]
+        eye = sp.identity(nrows, format='csr')
+        lp = {'col_lo': np.concatenate([sub['col_lo'], np.zeros(2*nrows)]),
+              'col_up': np.concatenate([sub['col_up'], np.full(2*nrows, np.inf)]),
+              'cost': np.concatenate([np.zeros(len(sub['cost'])), np.ones(2*nrows)]),
+              'A': sp.hstack([sub['A'], eye, -eye], format='csr'),
+              'row_lo': lp['row_lo'], 'row_up': lp['row_up']}
+        status, x, y = solve_array(lp, _solver, _interface)
+        return k, False, float(lp['cost'] @ x), -(sub['T'].T @ y), None
+    elif status != TerminationCondition.optimal:
+        sys.exit("ERROR! Benders subproblem " + str(k) + " not solved to optimality: " + str(status))
+
+    return k, True, float(sub['cost'] @ x), -(sub['T'].T @ y), (x if keep else None)
+
+#########
+##SOLVE##
+#########
+
+def cutting_planes(master, solve_all, group, solver, SOLVER_INTERFACE, result_file_path, name, gap, max_iter, trust=0.1):
+    #Benders iterations. Returns the best master solution with feasible
+    #subproblems. trust is the first box half-width relative to the largest
+    #first stage value.
+
+    theta = master['theta']
+    ngroups = len(theta)
+    firstcost = master['cost'].copy()
+    firstcost[theta] = 0
+    fixed = np.flatnonzero(master['col_lo'] == master['col_up'])
+    free = np.setdiff1d(np.arange(master['nfirst']), fixed)
+    cost = master['cost'].copy()
+    col_lo = master['col_lo'].copy()
+    col_up = master['col_up']
+    thetascale = np.zeros(ngroups)
+
+    f = open(result_file_path + "/" + 'results_benders_convergence.csv', 'w', newline='')
+    writer = csv.writer(f)
+    writer.writerow(["Iteration","LowerBound","UpperBound","Gap","OptimalityCuts","FeasibilityCuts","TrustRadius","Time_sec"])
+
+    cut_A = []
+    cut_lo = []
+
+    def add_cut(row, lo):
+        #Cut coefficients span many orders of magnitude (load shedding costs),
+        #so move fixed columns to the bound and scale every cut by its largest
+        #coefficient for the master solve
+        lo = lo - row[fixed] @ master['col_lo'][fixed]
+        row[fixed] = 0
+        scale = np.abs(row).max()
+        if scale > 0:
+            row = row/scale
+            lo = lo/scale
+        cut_A.append(sp.csr_matrix(row[None,:]))
+        cut_lo.append(np.array([lo]))
+
+    def solve_master(lo, up):
+        #The objective is scaled as well, since theta costs are cut slopes
+        mlp = {'col_lo': lo, 'col_up': up, 'cost': cost/np.abs(cost).max(),
+               'A': sp.vstack([master['A']] + cut_A, format='csr'),
+               'row_lo': np.concatenate([master['row_lo']] + cut_lo),
+               'row_up': np.concatenate([master['row_up'], np.full(len(cut_lo), np.inf)])}
+        status, xmaster, ymaster = solve_array(mlp, solver, SOLVER_INTERFACE, logfile=result_file_path + '/logfile_' + name + '.log')
+        if status != TerminationCondition.optimal:
+            sys.exit("ERROR! Benders master problem not solved to optimality: " + str(status))
+        return xmaster, float(cost @ xmaster)
+
+    lower = -np.inf
+    upper = np.inf
+    best = None
+    relgap = np.inf
+    radius = np.inf
+    start = time.time()
+
+    for it in range(1, max_iter + 1):
+        #Master in the box around the best solution, and without the box for
+        #the lower bound if the box binds
+        lo = col_lo.copy()
+        up = col_up.copy()
+        if best is not None:
+            lo[free] = np.maximum(col_lo[free], best[free] - radius)
+            up[free] = np.minimum(col_up[free], best[free] + radius)
+        xmaster, predicted = solve_master(lo, up)
+        tol = 1e-6*max(radius, 1.0) if radius < np.inf else 0.0
+        binding = (((xmaster[free] <= lo[free] + tol) & (lo[free] > col_lo[free])) |
+                   ((xmaster[free] >= up[free] - tol) & (up[free] < col_up[free]))).any()
+        lower = max(lower, solve_master(col_lo, col_up)[1] if binding else predicted)
+
+        out = solve_all(xmaster, False)
+
+        optimality = 0
+        feasibility = 0
+        for (k, feasible, value, grad, x) in out:
+            if not feasible:
+                #value + grad (x - xmaster) <= 0
+                add_cut(-grad, value - grad @ xmaster)
+                feasibility += 1
+        if feasibility == 0:
+            ub = float(firstcost @ xmaster) + sum(value for (k, feasible, value, grad, x) in out)
+            if best is None:
+                radius = trust*max(np.abs(xmaster[free]).max(initial=0.0), 1.0)
+            elif ub < upper and binding and upper - ub >= 0.5*(upper - predicted):
+                #The step reached the edge of the box and gained at least half
+                #of the predicted improvement
+                radius = 2*radius
+            if ub < upper:
+                upper = ub
+                best = xmaster.copy()
+        for j in range(ngroups):
+            ingroup = [o for o in out if group[o[0]] == j]
+            if all(o[1] for o in ingroup):
+                #theta_j >= sum of value + grad (x - xmaster)
+                row = -sum(o[3] for o in ingroup)
+                if thetascale[j] == 0:
+                    #Measure theta in units of the slope of its first cut, so
+                    #that its coefficient survives the scaling of the cuts
+                    thetascale[j] = max(np.abs(np.delete(row, fixed)).max(), 1.0)
+                    cost[theta[j]] = thetascale[j]
+                    col_lo[theta[j]] = master['col_lo'][theta[j]]/thetascale[j]
+                row[theta[j]] += thetascale[j]
+                add_cut(row, sum(o[2] - o[3] @ xmaster for o in ingroup))
+                optimality += 1
+
+        relgap = (upper - lower)/max(abs(upper), 1.0) if upper < np.inf else np.inf
+        print("Benders iteration " + str(it) + ": lower bound " + str(lower) + ", upper bound " + str(upper) + ", gap " + str(relgap))
+        writer.writerow([it, lower, upper, relgap, optimality, feasibility, radius, time.time() - start])
+        if relgap <= gap:
+            break
+
+    writer.writerow([""])
+    writer.writerow(["Status","Iterations","Gap","TargetGap"])
+    writer.writerow(["converged" if relgap <= gap else "iteration limit", it, relgap, gap])
+    f.close()
+
+    if relgap > gap:
+        print("WARNING! Benders stopped at the iteration limit of " + str(max_iter) + " with gap " + str(relgap) + " above " + str(gap) + ". Results are for the best solution found...")
+    return best
+
+def benders(lp, colblock, nblocks, group, solver, SOLVER_INTERFACE, NO_OF_WORKERS, result_file_path, name, gap, max_iter):
+    #Returns primal values of the full LP at the best master solution and the
+    #cost of every subproblem there
+
+    master, subproblems = decompose(lp, colblock, nblocks, group)
+    theta = master['theta']
+    nfirst = master['nfirst']
+
+    print("Subproblems: " + str(nblocks))
+    print("Optimality cuts per iteration: " + str(len(theta)))
+    print("Budget columns for linking rows: " + str(theta[0] - nfirst))
+
+    pool = process_pool(NO_OF_WORKERS, init_worker, (subproblems, solver, SOLVER_INTERFACE))
+
+    def solve_all(xmaster, keep):
+        return pool_map(pool, solve_subproblem, range(nblocks), [xmaster]*nblocks, [keep]*nblocks)
+
+    if (master['col_lo'][:theta[0]] == master['col_up'][:theta[0]]).all():
+        #Nothing to decide in the master (fixed first stage, no linking rows)
+        print("Master problem is fixed. Solving subproblems once...")
+        best = np.concatenate([master['col_lo'][:theta[0]], np.zeros(len(theta))])
+    else:
+        best = cutting_planes(master, solve_all, group, solver, SOLVER_INTERFACE, result_file_path, name, gap, max_iter)
+    if best is None:
+        if pool is not None:
+            pool.shutdown()
+        sys.exit("ERROR! Benders decomposition found no first stage solution with feasible subproblems!")
+
+    #Operational values at the best master solution
+    x = np.zeros(lp['ncols'])
+    x[master['firstcols']] = best[:nfirst]
+    blockcost = np.zeros(nblocks)
+    for (k, feasible, value, grad, xk) in solve_all(best, True):
+        if not feasible:
+            sys.exit("ERROR! Subproblem " + str(k) + " is infeasible at the master solution!")
+        x[subproblems[k]['cols']] = xk
+        blockcost[k] = value
+    if pool is not None:
+        pool.shutdown()
+
+    return x, blockcost
+
+def solve_benders(lp, firstvars, nI, nW, solver, SOLVER_INTERFACE, NO_OF_WORKERS, result_file_path, name,
+                  cuts="scenario", gap=1e-4, max_iter=200):
+    #Returns primal values of the full LP at the best first stage solution and its objective
+
+    print("Decomposing LP...")
+
+    nblocks = nI*nW
+    if cuts == "single":
+        group = np.zeros(nblocks, dtype=int)
+    elif cuts == "scenario":
+        group = np.arange(nblocks) % nW
+    elif cuts == "period-scenario":
+        group = np.arange(nblocks)
+    else:
+        sys.exit("ERROR! Invalid Benders cut aggregation! Options: " + ", ".join(CUT_AGGREGATIONS))
+
+    colblock = column_blocks(lp, firstvars, nI, nW)
+    x, blockcost = benders(lp, colblock, nblocks, group, solver, SOLVER_INTERFACE, NO_OF_WORKERS, result_file_path, name, gap, max_iter)
+    return x, float(lp['cost'] @ x)
+
+def solve_out_of_sample(lp, firstvars, Period, Scenario, Season, hour_season, OOS_SPLIT, solver,
+                        SOLVER_INTERFACE, NO_OF_WORKERS, result_file_path, name, gap=1e-6, max_iter=200):
+    #Out-of-sample evaluation with the first stage fixed, split into one LP per
+    #(period, scenario) or per (period, scenario, season). Rows across the
+    #split (hydro_node_limit, and emission_cap across seasons) get budget
+    #columns in the master as in solve_benders.
+
+    print("Splitting out-of-sample LP...")
+
+    nI = len(Period)
+    nW = len(Scenario)
+    if OOS_SPLIT == "season":
+        nS = len(Season)
+        colblock = column_blocks(lp, firstvars, nI, nW, hour_season)
+    else:
+        nS = 1
+        colblock = column_blocks(lp, firstvars, nI, nW)
+    nblocks = nI*nW*nS
+    x, blockcost = benders(lp, colblock, nblocks, np.arange(nblocks), solver, SOLVER_INTERFACE, NO_OF_WORKERS, result_file_path, name, gap, max_iter)
+
+    f = open(result_file_path + "/" + 'results_oos_costs.csv', 'w', newline='')
+    writer = csv.writer(f)
+    if OOS_SPLIT == "season":
+        writer.writerow(["Period","Scenario","Season","OperationalCost"])
+        for k in range(nblocks):
+            writer.writerow([Period[k // (nW*nS)], Scenario[(k // nS) % nW], Season[k % nS], blockcost[k]])
+    else:
+        writer.writerow(["Period","Scenario","OperationalCost"])
+        for k in range(nblocks):
+            writer.writerow([Period[k // nW], Scenario[k % nW], blockcost[k]])
+    f.close()
+
+    return x, float(lp['cost'] @ x)
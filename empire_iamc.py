@@ -0,0 +1,211 @@
+from __future__ import division
+from pyomo.environ import value
+from preprocess import label_positions
+from empire_results import instance_solution, var_array, group_sum, annual, season_hours
+import pandas as pd
+import numpy as np
+import cloudpickle
+import sys
+import os
+
+#Standard (IAMC) print of the EMPIRE results. Every variable is computed for
+#all its rows at once from the solution arrays of empire_results, the rows are
+#put together in one frame and rows with the same key are summed in a single
+#groupby. Run standalone on an instance pickled with PICKLE_INSTANCE = True:
+#
+#   python empire_iamc.py <pickled instance> <result folder>
+
+Modelname = "EMPIRE"
+Scenario = "1.5degree"
+
+KEYS = ["model", "scenario", "region", "variable", "unit", "subannual"]
+
+dict_countries = {"Austria": "Austria",
+                  "Bosnia and Herzegovina": "BosniaH",
+                  "Belgium": "Belgium", "Bulgaria": "Bulgaria",
+                  "Switzerland": "Switzerland",
+                  "Czech Republic": "CzechR", "Germany": "Germany",
+                  "Denmark": "Denmark", "Estonia": "Estonia",
+                  "Spain": "Spain", "Finland": "Finland",
+                  "France": "France", "United Kingdom": "GreatBrit.",
+                  "Greece": "Greece", "Croatia": "Croatia",
+                  "Hungary": "Hungary", "Ireland": "Ireland",
+                  "Italy": "Italy", "Lithuania": "Lithuania",
+                  "Luxembourg": "Luxemb.", "Latvia": "Latvia",
+                  "North Macedonia": "Macedonia",
+                  "The Netherlands": "Netherlands", "Norway": "Norway",
+                  "Poland": "Poland", "Portugal": "Portugal",
+                  "Romania": "Romania", "Serbia": "Serbia",
+                  "Sweden": "Sweden", "Slovenia": "Slovenia",
+                  "Slovakia": "Slovakia", "Norway|Ostland": "NO1",
+                  "Norway|Sorland": "NO2", "Norway|Norgemidt": "NO3",
+                  "Norway|Troms": "NO4", "Norway|Vestmidt": "NO5"}
+
+dict_countries_reversed = dict([reversed(i) for i in dict_countries.items()])
+
+dict_generators = {"Bio": "Biomass", "Bioexisting": "Biomass",
+                   "Coalexisting": "Coal|w/o CCS",
+                   "Coal": "Coal|w/o CCS", "CoalCCS": "Coal|w/ CCS",
+                   "CoalCCSadv": "Coal|w/ CCS",
+                   "Lignite": "Lignite|w/o CCS",
+                   "Liginiteexisting": "Lignite|w/o CCS",
+                   "LigniteCCSadv": "Lignite|w/ CCS",
+                   "Gasexisting": "Gas|CCGT|w/o CCS",
+                   "GasOCGT": "Gas|OCGT|w/o CCS",
+                   "GasCCGT": "Gas|CCGT|w/o CCS",
+                   "GasCCS": "Gas|CCGT|w/ CCS",
+                   "GasCCSadv": "Gas|CCGT|w/ CCS",
+                   "Oilexisting": "Oil", "Nuclear": "Nuclear",
+                   "Wave": "Ocean", "Geo": "Geothermal",
+                   "Hydroregulated": "Hydro|Reservoir",
+                   "Hydrorun-of-the-river": "Hydro|Run-of-River",
+                   "Windonshore": "Wind|Onshore",
+                   "Windoffshore": "Wind|Offshore",
+                   "Windoffshoregrounded": "Wind|Offshore",
+                   "Windoffshorefloating": "Wind|Offshore",
+                   "Solar": "Solar|PV", "Waste": "Waste",
+                   "Bio10cofiring": "Coal|w/o CCS",
+                   "Bio10cofiringCCS": "Coal|w/ CCS",
+                   "LigniteCCSsup": "Lignite|w/ CCS"}
+
+#Make datetime from HoursOfSeason
+seasonstart={"winter": '2020-01-01',
+             "spring": '2020-04-01',
+             "summer": '2020-07-01',
+             "fall": '2020-10-01',
+             "peak1": '2020-11-01',
+             "peak2": '2020-12-01'}
+
+#Scalefactors to make units
+Mtonperton = (1/1000000)
+
+GJperMWh = 3.6
+EJperMWh = 3.6*10**(-9)
+
+GWperMW = (1/1000)
+
+USD10perEUR10 = 1.33 #Source: https://www.statista.com/statistics/412794/euro-to-u-s-dollar-annual-average-exchange-rate/
+EUR10perEUR18 = 154/171 #Source: https://www.inflationtool.com/euro
+USD10perEUR18 = USD10perEUR10*EUR10perEUR18
+
+def season_timestamps(HoursOfSeason):
+    #Subannual label of every (season, hour), counting hours from the start of the season
+    first = {}
+    labels = []
+    for (s,h) in HoursOfSeason:
+        first.setdefault(s, h)
+        t = pd.Timestamp(seasonstart[s]) + pd.Timedelta(hours=h - first[s])
+        labels.append(str(t)[5:-3] + "+01:00")
+    return labels
+
+def rows(variable, unit, values, region="Europe", subannual="Year", scenario=Scenario):
+    #Block of rows with one row per row of values (rows x periods). The labels
+    #are single strings or one string per row.
+    values = np.atleast_2d(values)
+    block = pd.DataFrame({"model": Modelname, "scenario": scenario, "region": region, "variable": variable,
+                          "unit": unit, "subannual": subannual}, index=range(len(values)))
+    return block, values
+
+def iamc_frame(d, sol, LeapYearsInvestment, discountrate):
+    #The IAMC table from the solution arrays
+
+    I = d['PeriodActive']
+    W = d['Scenario']
+    N = d['Node']
+    G = d['Generator']
+    gn_gen = d['gn_gen']
+    bn_stor = d['bn_stor']
+    nI, nW, nG = len(I), len(W), len(G)
+    hours, seasons, hourlabels = season_hours(d)
+
+    generators = np.array([dict_generators.get(str(g), str(g)) for g in G], dtype=object)
+    countries = np.array([dict_countries_reversed.get(str(n), str(n)) for n in N], dtype=object)
+
+    genInvest = d['genInvCost'][gn_gen]*sol['genInvCap']
+    storInvest = d['storPWInvCost'][bn_stor]*sol['storPWInvCap'] + d['storENInvCost'][bn_stor]*sol['storENInvCap']
+    transInvest = d['transmissionInvCost']*sol['transmisionInvCap']
+    production = annual(d, sol['genOperational']) #GN x period x scenario
+    co2rate = d['genCO2TypeFactor'][:,None]*(GJperMWh/d['genEfficiency'])
+
+    blocks = []
+    blocks.append(rows("Discount rate|Electricity", "%", [discountrate*100]*nI)) #Discount rate
+    blocks.append(rows("Capacity|Electricity", "GW", sol['genInstalledCap'].sum(axis=0)*GWperMW)) #Total European installed generator capacity
+    blocks.append(rows("Investment|Energy Supply|Electricity", "billion US$2010/yr",
+                       (1/LeapYearsInvestment)*USD10perEUR18*(genInvest.sum(axis=0) + transInvest.sum(axis=0) + storInvest.sum(axis=0)))) #Total European investment cost (gen+stor+trans)
+    blocks.append(rows("Investment|Energy Supply|Electricity|Electricity storage", "billion US$2010/yr",
+                       (1/LeapYearsInvestment)*USD10perEUR18*storInvest.sum(axis=0))) #Total European storage investment cost
+    blocks.append(rows("Investment|Energy Supply|Electricity|Transmission and Distribution", "billion US$2010/yr",
+                       (1/LeapYearsInvestment)*USD10perEUR18*transInvest.sum(axis=0))) #Total European transmission investment cost
+
+    #Per scenario
+    scenarios = np.array([Scenario+"|"+str(w) for w in W], dtype=object)
+    blocks.append(rows("Emissions|CO2|Energy|Supply|Electricity", "Mt CO2/yr",
+                       Mtonperton*(co2rate[gn_gen][:,:,None]*production).sum(axis=0).T, scenario=scenarios)) #Total European emissions per scenario
+    blocks.append(rows("Secondary Energy|Electricity", "EJ/yr", EJperMWh*production.sum(axis=0).T, scenario=scenarios)) #Total European generation per scenario
+    blocks.append(rows("Active Power|Electricity|" + np.tile(generators, nW), "MWh",
+                       group_sum(production, gn_gen, nG).transpose(2, 0, 1).reshape(-1, nI), scenario=np.repeat(scenarios, nG))) #Total generation per type and scenario
+
+    #Price per node, hour and scenario, rows by scenario, hour and node
+    nS, nN = len(hours), len(N)
+    prices = sol['price'][:, hours]/GJperMWh #N x HoS x period x scenario
+    blocks.append(rows("Price|Secondary Energy|Electricity", "US$2010/GJ", prices.transpose(3, 1, 0, 2).reshape(-1, nI),
+                       region=np.tile(countries, nW*nS), subannual=np.tile(np.repeat(season_timestamps(d['HoursOfSeason']), nN), nW),
+                       scenario=np.repeat([Scenario+"|"+str(w)+str(s) for w in W for s in seasons], nN)))
+
+    #Per generator type
+    blocks.append(rows("Capacity|Electricity|" + generators, "GW", group_sum(sol['genInstalledCap'], gn_gen, nG)*GWperMW)) #Total European installed generator capacity per type
+    blocks.append(rows("Capital Cost|Electricity|" + generators, "US$2010/kW", d['genCapitalCost']*USD10perEUR18)) #Capital generator cost
+    variable = d['genMargCost'][:,0] != 0
+    blocks.append(rows("Variable Cost|Electricity|" + generators[variable], "EUR/MWh", d['genMargCost'][variable]))
+    blocks.append(rows("Investment|Energy Supply|Electricity|" + generators, "billion US$2010/yr",
+                       (1/LeapYearsInvestment)*USD10perEUR18*group_sum(genInvest, gn_gen, nG))) #Total generator investment cost per type
+    emitting = d['genCO2TypeFactor'] != 0
+    blocks.append(rows("CO2 Emmissions|Electricity|" + generators[emitting], "tons/MWh", co2rate[emitting])) #CO2 factor per generator type
+
+    #Installed generator capacity per country and type
+    blocks.append(rows("Capacity|Electricity|" + generators[gn_gen], "GW", sol['genInstalledCap']*GWperMW,
+                       region=countries[d['gn_node']]))
+
+    years = [2020+int(i)*LeapYearsInvestment for i in I]
+    keys = pd.concat([b[0] for b in blocks if len(b[1]) > 0], ignore_index=True)
+    values = pd.DataFrame(np.concatenate([b[1] for b in blocks if len(b[1]) > 0]), columns=years)
+    f = pd.concat([keys, values], axis=1)
+    return f.groupby(KEYS).sum().reset_index() #NB! DOES NOT WORK FOR UNIT COSTS; SHOULD BE FIXED
+
+def write_iamc(d, sol, result_file_path, LeapYearsInvestment, discountrate):
+    print("Writing standard output to .csv...")
+    f = iamc_frame(d, sol, LeapYearsInvestment, discountrate)
+    os.makedirs(result_file_path + "/" + 'IAMC', exist_ok=True)
+    f.to_csv(result_file_path + "/" + 'IAMC/empire_iamc.csv', index=None)
+
+def instance_parameters(instance):
+    #Sets and parameters of write_iamc and instance_solution from an instance
+
+    d = {}
+    for s in ['Node', 'Generator', 'Storage', 'Season', 'Scenario', 'PeriodActive', 'Operationalhour',
+              'GeneratorsOfNode', 'StoragesOfNode', 'BidirectionalArc', 'DirectionalLink', 'HoursOfSeason']:
+        d[s] = list(getattr(instance, s))
+    G = d['Generator']
+    I = d['PeriodActive']
+    d['gn_node'] = label_positions(d['Node'], [[n for (n,g) in d['GeneratorsOfNode']]])
+    d['gn_gen'] = label_positions(G, [[g for (n,g) in d['GeneratorsOfNode']]])
+    d['bn_stor'] = label_positions(d['Storage'], [[b for (n,b) in d['StoragesOfNode']]])
+    season = dict((h, s) for (s,h) in d['HoursOfSeason'])
+    d['hourScale'] = np.array([value(instance.seasScale[season[h]]) if h in season else 0.0 for h in d['Operationalhour']])
+    d['sceProbab'] = var_array(instance.sceProbab, [d['Scenario']])
+    d['operationalDiscountrate'] = value(instance.operationalDiscountrate)
+    for (p, index) in [('genInvCost', [G, I]), ('storPWInvCost', [d['Storage'], I]), ('storENInvCost', [d['Storage'], I]),
+                       ('transmissionInvCost', [d['BidirectionalArc'], I]), ('genCO2TypeFactor', [G]),
+                       ('genEfficiency', [G, I]), ('genCapitalCost', [G, I]), ('genMargCost', [G, I])]:
+        d[p] = var_array(getattr(instance, p), index)
+    return d
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("ERROR! Usage: python empire_iamc.py <pickled instance> <result folder>")
+    print("Reading instance...")
+    with open(sys.argv[1], mode='rb') as file:
+        instance = cloudpickle.load(file)
+    d = instance_parameters(instance)
+    sol = instance_solution(instance, d, False, False, False)
+    write_iamc(d, sol, sys.argv[2], value(instance.LeapYearsInvestment), value(instance.discountrate))
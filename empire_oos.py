@@ -0,0 +1,89 @@
+from __future__ import division
+from pyomo.environ import *
+import time
+import sys
+
+#Out-of-sample scenarios evaluated in batches on one instance built over the
+#scenarios of the first batch. The instance is handed to a persistent solver of
+#the appsi interface once. For every further batch the stochastic parameters
+#are stored in the mutable parameters of the instance and the solver changes
+#the coefficients, right hand sides and objective costs holding them in place,
+#so a batch costs about one solve.
+#
+#hydro_node_limit takes the expectation over all scenarios. Every batch gets
+#the share of maxHydroNode of its probability mass, which is a restriction of
+#the problem over all scenarios. The operational problems of the scenarios are
+#independent otherwise (the investments are fixed out-of-sample), so the
+#batches give the out-of-sample objective exactly when that budget does not
+#bind in any batch. A binding budget stops the run, the problem over all
+#scenarios is then solved with OOS_BATCH_SIZE = 0.
+
+BATCH_SOLVERS = {'CPLEX': 'appsi_cplex', 'Gurobi': 'appsi_gurobi', 'HiGHS': 'appsi_highs'}
+
+#Relative slack of maxHydroNode below which the budget of a batch binds
+BUDGET_TOLERANCE = 1e-6
+
+def batch_solver(solver, logfile):
+    if solver not in BATCH_SOLVERS:
+        sys.exit("ERROR! Out-of-sample batches are not available with " + solver + "! Options: " + ", ".join(BATCH_SOLVERS))
+    opt = SolverFactory(BATCH_SOLVERS[solver])
+    if solver == "CPLEX":
+        opt.options["lpmethod"] = 4
+        opt.options["barrier_crossover"] = -1
+    if solver == "Gurobi":
+        opt.options["Crossover"] = 0
+        opt.options["Method"] = 2
+        opt.options["LogFile"] = logfile
+    if solver == "HiGHS":
+        opt.options["solver"] = "ipm"
+        opt.config.logfile = logfile
+    #Only parameter values change between batches
+    opt.update_config.check_for_new_or_removed_constraints = False
+    opt.update_config.check_for_new_or_removed_vars = False
+    opt.update_config.check_for_new_or_removed_params = False
+    opt.update_config.update_constraints = False
+    opt.update_config.update_vars = False
+    opt.update_config.update_named_expressions = False
+    return opt
+
+def solve_batches(instance, batches, probability, batch_values, scenario_cost, solver, logfile):
+    #Returns the out-of-sample objective and the operational cost of every
+    #(period, scenario). The instance holds the values of batches[0], and
+    #batch_values(batch) gives the values of the stochastic parameters of any
+    #other batch over the scenarios of the instance.
+
+    opt = batch_solver(solver, logfile)
+    budget = {n: value(instance.maxHydroNode[n]) for n in instance.Node}
+    total = sum(probability.values())
+
+    firststage = []
+    operational = 0
+    costs = []
+    for (k, batch) in enumerate(batches):
+        print("Solving out-of-sample batch " + str(k + 1) + " of " + str(len(batches)) + "...")
+        start = time.time()
+        if k > 0:
+            for (param, values) in batch_values(batch).items():
+                getattr(instance, param).store_values(values)
+        share = sum(probability[w] for w in batch)/total
+        for n in instance.Node:
+            instance.maxHydroNode[n] = budget[n]*share
+        results = opt.solve(instance, tee=True)
+        if results.solver.termination_condition != TerminationCondition.optimal:
+            sys.exit("ERROR! Out-of-sample batch " + str(k + 1) + " not solved to optimality: " + str(results.solver.termination_condition))
+        for (n, i) in instance.hydro_node_limit:
+            if budget[n] > 0 and instance.hydro_node_limit[n,i].uslack() <= BUDGET_TOLERANCE*budget[n]*share:
+                sys.exit("ERROR! Hydro budget of " + str(n) + " binds in out-of-sample batch " + str(k + 1) + ", the batches would not give the out-of-sample objective! Use OOS_BATCH_SIZE = 0")
+        batchcost = 0
+        for (w, slot) in zip(batch, instance.Scenario):
+            for i in instance.PeriodActive:
+                cost = scenario_cost(i, slot)
+                costs.append((i, w, cost))
+                batchcost += cost
+        #The first stage cost is in every batch objective
+        firststage.append(value(instance.Obj) - batchcost)
+        operational += batchcost
+        end = time.time()
+        print("Batch took [sec]:")
+        print(end - start)
+    return sum(firststage)/len(firststage) + operational, costs
@@ -0,0 +1,187 @@
+from __future__ import division
+from pyomo.opt import TerminationCondition
+from empire_array import solve_array
+from empire_benders import column_blocks, decompose
+from empire_pool import process_pool, pool_map
+import scipy.sparse as sp
+import numpy as np
+import csv
+import sys
+import time
+
+#Progressive Hedging over the scenarios of the LP from the array build engine.
+#Every scenario is solved as its own problem with a copy of the first stage
+#columns and the operational columns of all periods of that scenario.
+#Non-anticipativity is imposed on the investment columns through the usual
+#multipliers and quadratic penalty.
+
+#emission_cap is indexed by (period, scenario) and stays inside its scenario.
+#hydro_node_limit takes the expectation over scenarios and is split with the
+#budget columns from empire_benders: every scenario holds the row
+#sum of budgets <= limit over all budgets, its own production <= budget, and
+#the budgets are non-anticipative like the investments.
+
+NONANTICIPATIVE_VARS = ['genInvCap', 'transmisionInvCap', 'storPWInvCap', 'storENInvCap']
+
+#############
+##SCENARIOS##
+#############
+
+def scenario_problems(master, subproblems, nI, nW):
+    #One problem per scenario with the first stage and budget columns first
+
+    ncopy = master['ncols'] - len(master['theta'])
+    first = master['A'][:, :ncopy]
+    scenarios = []
+    for w in range(nW):
+        blocks = [subproblems[i*nW + w] for i in range(nI)]
+        scenarios.append({'cols': np.concatenate([b['cols'] for b in blocks]),
+                          #The first stage cost is shared equally so that the scenario objectives sum to the total
+                          'cost': np.concatenate([master['cost'][:ncopy]/nW] + [b['cost'] for b in blocks]),
+                          'col_lo': np.concatenate([master['col_lo'][:ncopy]] + [b['col_lo'] for b in blocks]),
+                          'col_up': np.concatenate([master['col_up'][:ncopy]] + [b['col_up'] for b in blocks]),
+                          'A': sp.bmat([[first] + [None]*nI] +
+                                       [[b['T'][:, :ncopy]] + [b['A'] if j == i else None for j in range(nI)] for i, b in enumerate(blocks)], format='csr'),
+                          'row_lo': np.concatenate([master['row_lo']] + [b['row_lo'] for b in blocks]),
+                          'row_up': np.concatenate([master['row_up']] + [b['row_up'] for b in blocks])})
+    return scenarios
+
+_scenarios = None
+_solver = None
+_interface = None
+_na = None
+
+def init_worker(scenarios, solver, SOLVER_INTERFACE, na):
+    global _scenarios, _solver, _interface, _na
+    _scenarios = scenarios
+    _solver = solver
+    _interface = SOLVER_INTERFACE
+    _na = na
+
+def solve_scenario(w, linear, rho, xbar, fixed):
+    #Solve scenario w with linear and quadratic (rho/2 x^2) terms added on the
+    #non-anticipative columns, or with these columns fixed at xbar. Returns the
+    #values, the scenario cost and the reduced costs of the copied columns.
+
+    sc = _scenarios[w]
+    ncopy = len(xbar)
+    lp = dict(sc)
+    lp['cost'] = sc['cost'].copy()
+    lp['cost'][:ncopy] += linear
+    if fixed:
+        lp['col_lo'] = sc['col_lo'].copy()
+        lp['col_up'] = sc['col_up'].copy()
+        lp['col_lo'][_na] = xbar[_na]
+        lp['col_up'][_na] = xbar[_na]
+    quadratic = None
+    if rho is not None:
+        quadratic = np.zeros(len(lp['cost']))
+        quadratic[_na] = rho[_na]
+    status, x, y = solve_array(lp, _solver, _interface, quadratic=quadratic)
+    if status != TerminationCondition.optimal:
+        sys.exit("ERROR! Progressive Hedging scenario " + str(w) + " not solved to optimality: " + str(status))
+
+    reduced = sc['cost'][:ncopy] - sc['A'][:, :ncopy].T @ y
+    return w, x, float(sc['cost'] @ x), reduced
+
+def project_first_stage(master, xbar, na, ncopy, solver, SOLVER_INTERFACE):
+    #The scenario average satisfies the first stage rows only up to the solver
+    #tolerance, which is enough to make the evaluation with fixed columns
+    #infeasible. Move it to the closest (in L1 norm) point that satisfies them.
+    nna = len(na)
+    select = sp.csr_matrix((np.ones(nna), (np.arange(nna), na)), shape=(nna, ncopy))
+    eye = sp.identity(nna, format='csr')
+    lp = {'col_lo': np.concatenate([master['col_lo'][:ncopy], np.zeros(nna)]),
+          'col_up': np.concatenate([master['col_up'][:ncopy], np.full(nna, np.inf)]),
+          'cost': np.concatenate([np.zeros(ncopy), np.ones(nna)]),
+          'A': sp.bmat([[master['A'][:, :ncopy], None], [select, -eye], [select, eye]], format='csr'),
+          'row_lo': np.concatenate([master['row_lo'], np.full(nna, -np.inf), xbar[na]]),
+          'row_up': np.concatenate([master['row_up'], xbar[na], np.full(nna, np.inf)])}
+    status, x, y = solve_array(lp, solver, SOLVER_INTERFACE)
+    if status != TerminationCondition.optimal:
+        sys.exit("ERROR! Projection of the average first stage solution not solved to optimality: " + str(status))
+    return x[:ncopy]
+
+#########
+##SOLVE##
+#########
+
+def solve_ph(lp, firstvars, nI, nW, solver, SOLVER_INTERFACE, NO_OF_WORKERS, result_file_path, name,
+             tolerance=1e-3, max_iter=200, rho_scale=1.0):
+    #Returns primal values of the full LP with the investments fixed at the
+    #projected scenario average and its objective
+
+    print("Splitting LP into scenarios...")
+
+    nblocks = nI*nW
+    colblock = column_blocks(lp, firstvars, nI, nW)
+    master, subproblems = decompose(lp, colblock, nblocks, np.arange(nblocks) % nW)
+    nfirst = master['nfirst']
+    ncopy = master['ncols'] - len(master['theta'])
+    scenarios = scenario_problems(master, subproblems, nI, nW)
+
+    #Non-anticipative columns: investments and hydro budgets
+    na = [np.flatnonzero(np.isin(master['firstcols'], np.arange(lp['vars'][v][0], lp['vars'][v][0] + int(np.prod(lp['vars'][v][1])))))
+          for v in NONANTICIPATIVE_VARS]
+    na = np.concatenate(na + [np.arange(nfirst, ncopy)])
+
+    print("Scenarios: " + str(nW))
+    print("Non-anticipative columns: " + str(len(na)))
+
+    pool = process_pool(NO_OF_WORKERS, init_worker, (scenarios, solver, SOLVER_INTERFACE, na))
+
+    def solve_all(linear, rho, xbar, fixed):
+        return pool_map(pool, solve_scenario, range(nW), linear, [rho]*nW, [xbar]*nW, [fixed]*nW)
+
+    f = open(result_file_path + "/" + 'results_ph_convergence.csv', 'w', newline='')
+    writer = csv.writer(f)
+    writer.writerow(["Iteration","Convergence","Objective","Time_sec"])
+    start = time.time()
+
+    #Iteration 0: scenarios on their own
+    zero = np.zeros(ncopy)
+    out = solve_all([zero]*nW, None, zero, False)
+    xs = np.array([o[1][:ncopy] for o in out])
+    xbar = xs.mean(axis=0)
+
+    #Penalty per column from its cost, or its marginal value if it has no
+    #cost, over the spread of the scenario solutions
+    value = np.abs(scenarios[0]['cost'][:ncopy])
+    free = value == 0
+    value[free] = np.abs(np.array([o[3] for o in out])).mean(axis=0)[free]
+    rho = np.zeros(ncopy)
+    rho[na] = rho_scale*value[na]/np.maximum(np.abs(xs[:, na] - xbar[na]).mean(axis=0), 1.0)
+    if (rho[na] > 0).any():
+        rho[na] = np.where(rho[na] > 0, rho[na], rho[na][rho[na] > 0].min())
+    multipliers = rho*(xs - xbar)
+
+    for it in range(max_iter + 1):
+        convergence = np.abs(xs[:, na] - xbar[na]).mean(axis=0).sum()/max(np.abs(xbar[na]).sum(), 1.0)
+        objective = sum(o[2] for o in out)
+        print("Progressive Hedging iteration " + str(it) + ": convergence " + str(convergence) + ", objective " + str(objective))
+        writer.writerow([it, convergence, objective, time.time() - start])
+        if convergence <= tolerance or it == max_iter:
+            break
+
+        out = solve_all([multipliers[w] - rho*xbar for w in range(nW)], rho, xbar, False)
+        xs = np.array([o[1][:ncopy] for o in out])
+        xbar = xs.mean(axis=0)
+        multipliers += rho*(xs - xbar)
+
+    f.close()
+
+    if convergence > tolerance:
+        print("Progressive Hedging stopped at the iteration limit with convergence " + str(convergence) + "...")
+
+    #Operational values with the investments and budgets fixed at the projected average
+    print("Evaluating average first stage solution...")
+    xbar = project_first_stage(master, xbar, na, ncopy, solver, SOLVER_INTERFACE)
+    x = np.zeros(lp['ncols'])
+    for (w, xw, cost, reduced) in solve_all([zero]*nW, None, xbar, True):
+        if w == 0:
+            x[master['firstcols']] = xw[:nfirst]
+        x[scenarios[w]['cols']] = xw[ncopy:]
+    if pool is not None:
+        pool.shutdown()
+
+    return x, float(lp['cost'] @ x)
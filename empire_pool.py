@@ -0,0 +1,21 @@
+import concurrent.futures
+import multiprocessing
+
+#Process pool shared by the decomposition, the result writers, the queries, the
+#workbook reader and the scenario generation. The workers are forked, so they
+#get the module state set up by the initializer without pickling it.
+
+def process_pool(NO_OF_WORKERS, initializer, initargs):
+    #Pool of worker processes that run initializer once, or None to solve in this process
+    if NO_OF_WORKERS > 1 and "fork" in multiprocessing.get_all_start_methods():
+        return concurrent.futures.ProcessPoolExecutor(max_workers=NO_OF_WORKERS, mp_context=multiprocessing.get_context("fork"),
+                                                      initializer=initializer, initargs=initargs)
+    if NO_OF_WORKERS > 1:
+        print("Process pool needs the fork start method. Running tasks one by one...")
+    initializer(*initargs)
+    return None
+
+def pool_map(pool, fn, *args):
+    if pool is None:
+        return list(map(fn, *args))
+    return list(pool.map(fn, *args))
@@ -0,0 +1,310 @@
+from __future__ import division
+from empire_results import investment_periods
+from empire_snapshot import SOLUTION_SETS, read_snapshot
+from empire_pool import process_pool, pool_map
+import pandas as pd
+import numpy as np
+import glob
+import sys
+import os
+
+#Filtered and aggregated queries over the results of finished runs, e.g. the
+#installed capacity of a generator in a node and period or the curtailment in
+#a scenario and season:
+#
+#   query(result_file_path, 'genInstalledCap_MW', Node='Germany', Generator='Windoffshoregrounded', Period=2)
+#   query(result_file_path + '/snapshot', 'curtailment', Scenario=17, Season='winter', by=['Node'])
+#
+#A source is a result folder or a snapshot (empire_snapshot). In a result
+#folder the value is a column of one of the result files (.csv, .tab or the
+#Parquet/Arrow datasets), in a snapshot it is a solution array or one of the
+#DERIVED quantities. Filters are column names with a label or a list of
+#labels and are applied before anything is aggregated: datasets only read the
+#partitions and row groups that match, snapshots only the selected slices of
+#the memory mapped arrays, and .csv files only the used columns in chunks.
+#Integer periods and scenarios are positions as in the first stage .tab files
+#(Period=2 is the second period, Scenario=17 is scenario17). Results are
+#cached per source until its files change.
+
+#Columns of the members of the index sets
+SET_COLUMNS = {'GeneratorsOfNode': ['Node', 'Generator'], 'StoragesOfNode': ['Node', 'Storage'],
+               'DirectionalLink': ['FromNode', 'ToNode'], 'BidirectionalArc': ['FromNode', 'ToNode'],
+               'ConverterOfNode': ['Node', 'Converter'], 'NeighbourhoodOfNode': ['Node', 'Neighbourhood'],
+               'Node': ['Node']}
+
+#Names of these columns in the result files
+FILE_COLUMNS = {'Generator': ['GeneratorType', 'RESGeneratorType'], 'Storage': ['StorageType'],
+                'FromNode': ['BetweenNode'], 'ToNode': ['AndNode']}
+
+#Quantities of a snapshot that are not solution arrays
+DERIVED = {'curtailment': 'GeneratorsOfNode'}
+
+AGGREGATES = ['sum', 'mean', 'min', 'max', 'count']
+
+CSV_CHUNK_ROWS = 1000000
+
+_cache = {}
+_tables = {}
+
+###########
+##SOURCES##
+###########
+
+def is_snapshot(source):
+    return os.path.isfile(source + "/" + 'manifest.json')
+
+def source_version(source):
+    #Changes whenever a file of the source is written again. Datasets are
+    #rewritten inside their Period=/Scenario= folders, which leaves the
+    #mtime of the dataset folder as it is, so their part files count too.
+    if is_snapshot(source):
+        files = [source + "/" + 'manifest.json']
+    else:
+        files = glob.glob(source + "/" + '*') + glob.glob(source + "/" + '*/*/*/part-*')
+    return (len(files), max([os.path.getmtime(f) for f in files] + [0]))
+
+def result_tables(source):
+    #Columns of every result file and dataset of a result folder
+    version = source_version(source)
+    if source in _tables and _tables[source][0] == version:
+        return _tables[source][1]
+    tables = {}
+    for f in sorted(glob.glob(source + "/" + '*')):
+        name = os.path.basename(f)
+        if name.endswith('.csv'):
+            tables[name] = list(pd.read_csv(f, nrows=0).columns)
+        elif name.endswith('.tab'):
+            tables[name] = list(pd.read_csv(f, sep='\t', nrows=0).columns)
+        elif os.path.isdir(f) and len(glob.glob(f + "/" + '*/*/part-*')) > 0:
+            import pyarrow.dataset as ds
+            tables[name] = ds.dataset(f, format=dataset_format(f), partitioning='hive').schema.names
+    _tables[source] = (version, tables)
+    return tables
+
+def dataset_format(path):
+    return 'parquet' if len(glob.glob(path + "/" + '*/*/part-*.parquet')) > 0 else 'arrow'
+
+def file_column(name, columns):
+    #Column of a result file for a filter or group name
+    for c in [name] + FILE_COLUMNS.get(name, []):
+        if c in columns:
+            return c
+    return None
+
+def find_table(source, value, names):
+    tables = result_tables(source)
+    found = [t for (t, columns) in tables.items()
+             if value in columns and all(file_column(n, columns) is not None for n in names)]
+    if len(found) == 0:
+        sys.exit("ERROR! No result file in " + source + " with column " + value + " and " + ", ".join(names))
+    if len(found) > 1:
+        sys.exit("ERROR! Column " + value + " is in " + ", ".join(found) + ". Choose one with table=")
+    return found[0]
+
+def as_list(labels):
+    return list(labels) if isinstance(labels, (list, tuple, set, np.ndarray)) else [labels]
+
+def period_labels(labels, periods):
+    #Integer positions to the period labels of a result file
+    periods = sorted(periods)
+    return [periods[int(l) - 1] if isinstance(l, (int, np.integer)) else l for l in labels]
+
+def scenario_labels(labels):
+    return ["scenario" + str(l) if isinstance(l, (int, np.integer)) else l for l in labels]
+
+#########
+##FILES##
+#########
+
+def file_frame(source, table, usecols, filters):
+    #Used columns of the rows of a result file or dataset that pass the filters
+    path = source + "/" + table
+    if table.endswith('.csv') or table.endswith('.tab'):
+        sep = '\t' if table.endswith('.tab') else ','
+        if 'Period' in filters and not pd.api.types.is_numeric_dtype(pd.read_csv(path, sep=sep, usecols=['Period'], nrows=1)['Period']):
+            if any(isinstance(l, (int, np.integer)) for l in filters['Period']):
+                periods = pd.read_csv(path, sep=sep, usecols=['Period'])['Period'].unique()
+                filters = dict(filters, Period=period_labels(filters['Period'], periods))
+        frames = []
+        for chunk in pd.read_csv(path, sep=sep, usecols=usecols, chunksize=CSV_CHUNK_ROWS):
+            keep = np.ones(len(chunk), dtype=bool)
+            for (c, labels) in filters.items():
+                keep &= chunk[c].isin(labels).to_numpy()
+            frames.append(chunk[keep])
+        return pd.concat(frames, ignore_index=True)
+
+    import pyarrow.dataset as ds
+    dataset = ds.dataset(path, format=dataset_format(path), partitioning='hive')
+    if 'Period' in filters:
+        periods = [os.path.basename(p).split('=', 1)[1] for p in glob.glob(path + "/" + 'Period=*')]
+        filters = dict(filters, Period=period_labels(filters['Period'], periods))
+    expression = None
+    for (c, labels) in filters.items():
+        e = ds.field(c).isin(labels)
+        expression = e if expression is None else expression & e
+    return dataset.to_table(columns=usecols, filter=expression).to_pandas()
+
+def file_query(source, table, value, filters, by, how):
+    columns = result_tables(source)[table]
+    rename = {file_column(n, columns): n for n in list(filters) + list(by)}
+    filters = {file_column(n, columns): labels for (n, labels) in filters.items()}
+    if 'Scenario' in filters:
+        filters['Scenario'] = scenario_labels(filters['Scenario'])
+    usecols = list(dict.fromkeys(list(filters) + [file_column(n, columns) for n in by] + [value]))
+    df = file_frame(source, table, usecols, filters).rename(columns=rename)
+    if len(by) == 0:
+        return float(df[value].agg(how))
+    return df.groupby(list(by), sort=False, observed=True)[value].agg(how).reset_index()
+
+#############
+##SNAPSHOTS##
+#############
+
+def snapshot_dims(key, values):
+    #Dimensions of a snapshot array as (index set or None, period and
+    #scenario) or (index set, hour, period, scenario)
+    labels = DERIVED.get(key, SOLUTION_SETS.get(key, 'Node' if key in ['price', 'priceTR'] else None))
+    if labels is None:
+        return ['Period', 'Scenario']
+    if values.ndim == 2:
+        return [labels, 'Period']
+    return [labels, 'Hour', 'Period', 'Scenario']
+
+def selection(d, settings, dim, filters):
+    #Positions and labels (columns to values) along a dimension that pass the filters
+    if dim == 'Period':
+        labels = investment_periods(d['PeriodActive'], settings['LeapYearsInvestment'])
+        keep = np.ones(len(labels), dtype=bool)
+        if 'Period' in filters:
+            wanted = filters['Period']
+            keep = np.array([i in wanted or p in wanted for (i, p) in zip(d['PeriodActive'], labels)])
+        return np.flatnonzero(keep), {'Period': labels}
+    if dim == 'Scenario':
+        keep = np.ones(len(d['Scenario']), dtype=bool)
+        if 'Scenario' in filters:
+            keep = np.isin(d['Scenario'], scenario_labels(filters['Scenario']))
+        return np.flatnonzero(keep), {'Scenario': d['Scenario']}
+    if dim == 'Hour':
+        season = dict((h, s) for (s, h) in d['HoursOfSeason'])
+        seasons = [season.get(h) for h in d['Operationalhour']]
+        #Only the hours of the seasons, as in the hourly files
+        keep = np.array([s is not None for s in seasons])
+        if 'Hour' in filters:
+            keep &= np.isin(d['Operationalhour'], filters['Hour'])
+        if 'Season' in filters:
+            keep &= np.isin(np.array(seasons, dtype=object), filters['Season'])
+        return np.flatnonzero(keep), {'Hour': d['Operationalhour'], 'Season': seasons}
+    members = [m if isinstance(m, tuple) else (m,) for m in d[dim]]
+    keep = np.ones(len(members), dtype=bool)
+    columns = SET_COLUMNS[dim]
+    for (k, c) in enumerate(columns):
+        if c in filters:
+            keep &= np.isin([m[k] for m in members], filters[c])
+    return np.flatnonzero(keep), {c: [m[k] for m in members] for (k, c) in enumerate(columns)}
+
+def snapshot_values(d, sol, key, ix):
+    if key == 'curtailment':
+        #Available minus produced energy of the generators
+        cap = sol['genInstalledCap'][np.ix_(ix[0], ix[2])][:, None, :, None]
+        return d['genCapAvail'][np.ix_(*ix)]*cap - sol['genOperational'][np.ix_(*ix)]
+    return sol[key][np.ix_(*ix)]
+
+def snapshot_query(source, value, filters, by, how):
+    d, sol, settings = read_snapshot(source)
+    if value not in sol and value not in DERIVED:
+        sys.exit("ERROR! " + value + " is not in the snapshot " + source + ". Options: " + ", ".join(list(sol) + list(DERIVED)))
+    dims = snapshot_dims(value, sol['genOperational'] if value in DERIVED else sol[value])
+    names = [c for dim in dims for c in (SET_COLUMNS.get(dim, [dim]) + (['Season'] if dim == 'Hour' else []))]
+    for n in list(filters) + list(by):
+        if n not in names:
+            sys.exit("ERROR! " + value + " has no column " + n + ". Options: " + ", ".join(names))
+
+    selected = [selection(d, settings, dim, filters) for dim in dims]
+    values = snapshot_values(d, sol, value, [ix for (ix, labels) in selected])
+    if len(by) == 0:
+        return float(pd.Series(values.ravel()).agg(how))
+
+    #Long table of the selected slice, rows in C order of the array
+    index = np.indices(values.shape).reshape(len(dims), -1)
+    df = pd.DataFrame({c: np.asarray(labels[c], dtype=object)[ix[index[k]]]
+                       for (k, (ix, labels)) in enumerate(selected) for c in labels if c in by})
+    df[value] = values.ravel()
+    return df.groupby(list(by), sort=False)[value].agg(how).reset_index()
+
+#########
+##QUERY##
+#########
+
+def query_key(source, value, by, how, table, filters):
+    #Cache key of a query, new whenever the files of the source change
+    return (os.path.realpath(source), source_version(source), table, value, tuple(as_list(by)), how,
+            tuple(sorted((n, tuple(as_list(labels))) for (n, labels) in filters.items())))
+
+def run_query(source, value, by, how, table, filters):
+    if how not in AGGREGATES:
+        sys.exit("ERROR! Invalid aggregate! Options: " + ", ".join(AGGREGATES))
+    source = os.path.normpath(source)
+    by = tuple(as_list(by))
+    filters = {n: as_list(labels) for (n, labels) in filters.items()}
+    if is_snapshot(source):
+        return snapshot_query(source, value, filters, by, how)
+    if table is None:
+        table = find_table(source, value, list(filters) + list(by))
+    return file_query(source, table, value, filters, by, how)
+
+def query(source, value, by=(), how='sum', table=None, **filters):
+    #Aggregate (sum, mean, min, max or count) of value over the rows that pass
+    #the filters, one number or a table with a row per group of the columns by
+    key = query_key(source, value, by, how, table, filters)
+    if key not in _cache:
+        _cache[key] = run_query(source, value, by, how, table, filters)
+    result = _cache[key]
+    return result.copy() if isinstance(result, pd.DataFrame) else result
+
+def init_query():
+    #Forked workers only run queries, the cache of this process is left as it is
+    pass
+
+def query_task(args):
+    return run_query(*args)
+
+def compare(sources, value, by=(), how='sum', table=None, NO_OF_WORKERS=1, **filters):
+    #The same query over many runs as one table with a Run column. The runs
+    #that are not cached are spread over NO_OF_WORKERS processes and their
+    #results are cached here.
+    keys = [query_key(s, value, by, how, table, filters) for s in sources]
+    missing = [k for (k, key) in enumerate(keys) if key not in _cache]
+    if len(missing) > 0:
+        pool = process_pool(min(NO_OF_WORKERS, len(missing)), init_query, ())
+        results = pool_map(pool, query_task, [(sources[k], value, by, how, table, filters) for k in missing])
+        if pool is not None:
+            pool.shutdown()
+        for (k, result) in zip(missing, results):
+            _cache[keys[k]] = result
+
+    frames = []
+    for (source, key) in zip(sources, keys):
+        result = _cache[key]
+        result = result.copy() if isinstance(result, pd.DataFrame) else pd.DataFrame({value: [result]})
+        result.insert(0, 'Run', source)
+        frames.append(result)
+    return pd.concat(frames, ignore_index=True)
+
+if __name__ == "__main__":
+    #python empire_query.py <result folder or snapshot> <value> [Column=label[,label...]] [by=Column[,Column...]] [how=sum]
+    if len(sys.argv) < 3:
+        sys.exit("ERROR! Usage: python empire_query.py <result folder or snapshot> <value> [Column=label,...] [by=Column,...] [how=sum]")
+    options = {'by': (), 'how': 'sum', 'table': None}
+    filters = {}
+    for arg in sys.argv[3:]:
+        name, labels = arg.split('=', 1)
+        labels = [int(l) if l.isdigit() else l for l in labels.split(',')]
+        if name in options:
+            options[name] = labels if name == 'by' else labels[0]
+        else:
+            filters[name] = labels
+    result = query(sys.argv[1], sys.argv[2], options['by'], options['how'], options['table'], **filters)
+    if isinstance(result, pd.DataFrame):
+        print(result.to_string(index=False))
+    else:
+        print(result)
@@ -0,0 +1,642 @@
+from __future__ import division
+from preprocess import frame_to_array, label_positions, positions
+from empire_pool import process_pool
+import scipy.sparse as sp
+import pandas as pd
+import numpy as np
+import csv
+import time
+
+#Result files of EMPIRE from the solution as NumPy arrays. Variable values and
+#duals are pulled from the instance once, over the index sets of the
+#preprocessing and in the layout of read_param: (index set, hour, period,
+#scenario) for operational quantities and (index set, period) for first stage
+#quantities. Every aggregate in the result files is a reduction over these
+#arrays, so both build engines write through the functions below.
+
+RES_TECHNOLOGIES = ['Hydro_ror', 'Wind_onshr', 'Wind_offshr', 'Solar']
+RES_GENERATORS = ['Hydrorun-of-the-river', 'Windonshore', 'Windoffshore', 'Solar']
+
+#Label columns of the hourly files, dictionary encoded in Parquet and Arrow output
+LABEL_COLUMNS = ['Node', 'FromNode', 'ToNode', 'Period', 'Scenario', 'Season']
+
+#Output levels from the least to the most detailed. summary writes the
+#objective, EuropeSummary and the first stage .tab files, capacity adds the
+#tables per generator, storage, line and type, and seasonal, daily and hourly
+#add the hourly files averaged over seasons, over days or not at all.
+OUTPUT_LEVELS = ['summary', 'capacity', 'seasonal', 'daily', 'hourly']
+
+def output_at(OUTPUT_LEVEL, level):
+    return OUTPUT_LEVELS.index(OUTPUT_LEVEL) >= OUTPUT_LEVELS.index(level)
+
+##############
+##EXTRACTION##
+##############
+
+def component_array(keys, values, index):
+    #Dense array over the index sets from the keys and values of an indexed component
+    df = pd.DataFrame.from_records([k if isinstance(k, tuple) else (k,) for k in keys])
+    df[df.shape[1]] = values
+    return frame_to_array(df, index)
+
+def var_array(var, index):
+    #Values of a Var (or of a Param for the fixed first stage out-of-sample).
+    #Columns the solver never saw have no value and count as zero.
+    values = np.array([v.value if hasattr(v, 'value') else v for v in var.values()], dtype=float)
+    return component_array(list(var.keys()), np.nan_to_num(values), index)
+
+def dual_array(instance, constraint, index):
+    #Duals of an indexed constraint, zero where the constraint was skipped
+    return component_array(list(constraint.keys()), [instance.dual.get(c, 0.0) for c in constraint.values()], index)
+
+def instance_solution(instance, d, HEATMODULE, DRMODULE, EMISSION_CAP):
+    #Variable values and the duals the result files need as arrays
+
+    I = d['PeriodActive']
+    H = d['Operationalhour']
+    W = d['Scenario']
+    N = d['Node']
+    GN = d['GeneratorsOfNode']
+    BN = d['StoragesOfNode']
+
+    sol = {}
+    for (v, labels) in [('genInvCap', GN), ('transmisionInvCap', d['BidirectionalArc']), ('storPWInvCap', BN), ('storENInvCap', BN),
+                        ('genInstalledCap', GN), ('transmisionInstalledCap', d['BidirectionalArc']), ('storPWInstalledCap', BN), ('storENInstalledCap', BN)]:
+        sol[v] = var_array(getattr(instance, v), [labels, I])
+    for (v, labels) in [('genOperational', GN), ('storOperational', BN), ('storCharge', BN), ('storDischarge', BN),
+                        ('transmisionOperational', d['DirectionalLink']), ('loadShed', N)]:
+        sol[v] = var_array(getattr(instance, v), [labels, H, I, W])
+    sol['price'] = price_cube(d, dual_array(instance, instance.FlowBalance, [N, H, I, W]))
+    if EMISSION_CAP:
+        sol['emission_cap'] = dual_array(instance, instance.emission_cap, [I, W])
+
+    if HEATMODULE:
+        RN = d['ConverterOfNode']
+        ZN = d['NeighbourhoodOfNode']
+        for (v, labels) in [('ConverterInvCap', RN), ('ConverterInstalledCap', RN), ('neighInvCap', ZN), ('neighInstalledCap', ZN)]:
+            sol[v] = var_array(getattr(instance, v), [labels, I])
+        for (v, labels) in [('ConverterOperational', RN), ('neighElectricOperational', ZN), ('neighHeatOperational', ZN),
+                            ('neighConverterOperational', ZN), ('loadShedTR', N)]:
+            sol[v] = var_array(getattr(instance, v), [labels, H, I, W])
+        sol['priceTR'] = price_cube(d, dual_array(instance, instance.FlowBalanceTR, [N, H, I, W]))
+
+    if DRMODULE:
+        #Over all storages of nodes, zero outside StoragesOfNodeDR
+        sol['storMargCost'] = var_array(instance.storMargCost, [BN, H, I, W])
+
+    return sol
+
+###########
+##HELPERS##
+###########
+
+def investment_periods(I, LeapYearsInvestment):
+    return [str(2015+int(i)*LeapYearsInvestment)+"-"+str(2020+int(i)*LeapYearsInvestment) for i in I]
+
+def group_sum(values, groups, ngroups):
+    #Sum the entries of values with the same group along the first axis
+    incidence = sp.csr_matrix((np.ones(len(groups)), (groups, np.arange(len(groups)))), shape=(ngroups, len(groups)))
+    return (incidence @ values.reshape(len(groups), -1)).reshape((ngroups,) + values.shape[1:])
+
+def member_of(labels, members):
+    #Whether the last entry of every label (e.g. g of (n,g)) is in members
+    return np.isin([l[-1] if isinstance(l, tuple) else l for l in labels], list(members))
+
+def expected(d, values):
+    #Expected annual sum over hours and scenarios, (index set, period)
+    return np.einsum('khiw,h,w->ki', values, d['hourScale'], d['sceProbab'])
+
+def annual(d, values):
+    #Annual sum over hours per scenario, (index set, period, scenario)
+    return np.einsum('khiw,h->kiw', values, d['hourScale'])
+
+def season_hours(d):
+    #Hour positions and season names in HoursOfSeason order
+    hours = positions(d['Operationalhour'], [h for (s,h) in d['HoursOfSeason']])
+    return hours, [s for (s,h) in d['HoursOfSeason']], [h for (s,h) in d['HoursOfSeason']]
+
+def hourly(values, hours):
+    #(index set, hour, period, scenario) as rows ordered by index set, period,
+    #scenario and the hours in HoursOfSeason order
+    return values[:, hours].transpose(0, 2, 3, 1).ravel()
+
+def price_cube(d, dual):
+    #Price per MWh from the duals of a flow balance (node, hour, period,
+    #scenario), zero in hours outside the seasons
+    scale = d['operationalDiscountrate']*d['hourScale'][None,:,None,None]*d['sceProbab'][None,None,None,:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(scale != 0, dual/scale, 0.0)
+
+def co2_rate(d):
+    #CO2 per MWh of every generator of a node per period
+    gn_gen = d['gn_gen']
+    return d['genCO2TypeFactor'][gn_gen][:,None]*(3.6/d['genEfficiency'][gn_gen])
+
+def average_hours(df, d, OUTPUT_LEVEL):
+    #Mean of the hourly columns over every season (seasonal) or every 24 hours
+    #of a season (daily), in the row order of the hourly file
+    keys = [c for c in LABEL_COLUMNS if c in df.columns]
+    if OUTPUT_LEVEL == 'daily':
+        first = {}
+        day = {}
+        for (s,h) in d['HoursOfSeason']:
+            first.setdefault(s, h)
+            day[h] = (h - first[s])//24 + 1
+        df = df.assign(Hour=df['Hour'].map(day)).rename(columns={'Hour': 'Day'})
+        keys.append('Day')
+    else:
+        df = df.drop(columns='Hour')
+    return df.groupby(keys, sort=False).mean().reset_index()
+
+def write_hourly(df, d, result_file_path, filename, OUTPUT_FORMAT, OUTPUT_LEVEL, rows_per_group):
+    #Hourly results (or their averages, see average_hours) as one .csv, or as a
+    #compressed Parquet or Arrow dataset in the directory filename with a
+    #subdirectory per period and scenario (Period=.../Scenario=...). The rows
+    #of every partition are kept in node (or link) order with rows_per_group
+    #rows per row group, so readers can skip the row groups of other nodes
+    #from the statistics.
+    if OUTPUT_LEVEL != 'hourly':
+        nrows = len(df)
+        df = average_hours(df, d, OUTPUT_LEVEL)
+        rows_per_group = rows_per_group*len(df)//max(nrows, 1)
+        filename = filename + '_' + OUTPUT_LEVEL
+
+    if OUTPUT_FORMAT == "csv":
+        df.to_csv(result_file_path + "/" + filename + '.csv', index=False)
+        return
+
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    df = df.assign(**{c: df[c].astype(str).astype('category') for c in LABEL_COLUMNS if c in df.columns})
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if OUTPUT_FORMAT == "parquet":
+        fileformat = ds.ParquetFileFormat()
+        options = fileformat.make_write_options(compression='zstd')
+    else:
+        fileformat = ds.IpcFileFormat()
+        options = fileformat.make_write_options(compression='zstd')
+    rows_per_group = max(int(rows_per_group), 1)
+    ds.write_dataset(table, result_file_path + "/" + filename, format=fileformat, file_options=options,
+                     partitioning=ds.partitioning(pa.schema([table.schema.field('Period'), table.schema.field('Scenario')]), flavor='hive'),
+                     basename_template='part-{i}.' + OUTPUT_FORMAT, existing_data_behavior='delete_matching',
+                     min_rows_per_group=rows_per_group, max_rows_per_group=rows_per_group)
+
+###########
+##WRITERS##
+###########
+
+def write_gen(d, sol, result_file_path, inv_per, HEATMODULE):
+    GN = d['GeneratorsOfNode']
+    gn_gen = d['gn_gen']
+    disc = d['discount_multiplier']
+    genInvCap = sol['genInvCap']
+    genInstalledCap = sol['genInstalledCap']
+    production = expected(d, sol['genOperational'])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        capacityfactor = np.where(genInstalledCap != 0, production/(genInstalledCap*8760), 0)
+    df = pd.DataFrame({"Node": np.repeat([n for (n,g) in GN], len(inv_per)),
+                       "GeneratorType": np.repeat([g for (n,g) in GN], len(inv_per)),
+                       "Period": np.tile(inv_per, len(GN)),
+                       "genInvCap_MW": genInvCap.ravel(),
+                       "genInstalledCap_MW": genInstalledCap.ravel(),
+                       "genExpectedCapacityFactor": capacityfactor.ravel(),
+                       "DiscountedInvestmentCost_Euro": (disc[None,:]*genInvCap*d['genInvCost'][gn_gen]).ravel()})
+    if HEATMODULE:
+        #Electricity from CHP generators, heat from heat generators
+        el = label_positions(d['GeneratorEL'], [[g for (n,g) in GN]])
+        tr = member_of(GN, d['GeneratorTR'])
+        chp = d['genCHPEfficiency'][np.maximum(el, 0)]
+        df["genExpectedAnnualProduction_GWh"] = np.where(el[:,None] >= 0, chp*production/1000, 0).ravel()
+        df["genExpectedAnnualHeatProduction_GWh"] = np.where((el[:,None] < 0) | tr[:,None], production/1000, 0).ravel()
+    else:
+        df["genExpectedAnnualProduction_GWh"] = (production/1000).ravel()
+    df.to_csv(result_file_path + "/" + 'results_output_gen.csv', index=False)
+
+def write_stor(d, sol, result_file_path, inv_per):
+    BN = d['StoragesOfNode']
+    bn_stor = d['bn_stor']
+    disc = d['discount_multiplier']
+    storPWInvCap = sol['storPWInvCap']
+    storENInvCap = sol['storENInvCap']
+    discharge = expected(d, sol['storDischarge'])
+    charge = expected(d, sol['storCharge'])
+    df = pd.DataFrame({"Node": np.repeat([n for (n,b) in BN], len(inv_per)),
+                       "StorageType": np.repeat([b for (n,b) in BN], len(inv_per)),
+                       "Period": np.tile(inv_per, len(BN)),
+                       "storPWInvCap_MW": storPWInvCap.ravel(),
+                       "storPWInstalledCap_MW": sol['storPWInstalledCap'].ravel(),
+                       "storENInvCap_MWh": storENInvCap.ravel(),
+                       "storENInstalledCap_MWh": sol['storENInstalledCap'].ravel(),
+                       "DiscountedInvestmentCostPWEN_EuroPerMWMWh": (disc[None,:]*(storPWInvCap*d['storPWInvCost'][bn_stor] + storENInvCap*d['storENInvCost'][bn_stor])).ravel(),
+                       "ExpectedAnnualDischargeVolume_GWh": (discharge/1000).ravel(),
+                       "ExpectedAnnualLossesChargeDischarge_GWh": (((1 - d['storageDischargeEff'][bn_stor])[:,None]*discharge + (1 - d['storageChargeEff'][bn_stor])[:,None]*charge)/1000).ravel()})
+    df.to_csv(result_file_path + "/" + 'results_output_stor.csv', index=False)
+
+def write_transmission(d, sol, result_file_path, inv_per):
+    A = d['BidirectionalArc']
+    disc = d['discount_multiplier']
+    transmisionInvCap = sol['transmisionInvCap']
+    flow = expected(d, sol['transmisionOperational']) #directional link x period
+    tocount = d['link_arc'] >= 0
+    volume = group_sum(flow[tocount], d['link_arc'][tocount], len(A))
+    losses = group_sum(((1 - d['lineEfficiency'])[:,None]*flow)[tocount], d['link_arc'][tocount], len(A))
+    df = pd.DataFrame({"BetweenNode": np.repeat([n1 for (n1,n2) in A], len(inv_per)),
+                       "AndNode": np.repeat([n2 for (n1,n2) in A], len(inv_per)),
+                       "Period": np.tile(inv_per, len(A)),
+                       "transmisionInvCap_MW": transmisionInvCap.ravel(),
+                       "transmisionInstalledCap_MW": sol['transmisionInstalledCap'].ravel(),
+                       "DiscountedInvestmentCost_EuroPerMW": (disc[None,:]*transmisionInvCap*d['transmissionInvCost']).ravel(),
+                       "transmisionExpectedAnnualVolume_GWh": (volume/1000).ravel(),
+                       "ExpectedAnnualLosses_GWh": (losses/1000).ravel()})
+    df.to_csv(result_file_path + "/" + 'results_output_transmision.csv', index=False)
+
+def write_transmission_operational(d, sol, result_file_path, inv_per, OUTPUT_FORMAT, OUTPUT_LEVEL):
+    #Rows by link, period, hour and scenario
+    L = d['DirectionalLink']
+    W = d['Scenario']
+    hours, seasons, hourlabels = season_hours(d)
+    nI, nS, nW = len(inv_per), len(hours), len(W)
+    flow = sol['transmisionOperational'][:, hours].transpose(0, 2, 1, 3)
+    eff = d['lineEfficiency'][:,None,None,None]
+    df = pd.DataFrame({"FromNode": np.repeat([n1 for (n1,n2) in L], nI*nS*nW),
+                       "ToNode": np.repeat([n2 for (n1,n2) in L], nI*nS*nW),
+                       "Period": np.tile(np.repeat(inv_per, nS*nW), len(L)),
+                       "Season": np.tile(np.repeat(seasons, nW), len(L)*nI),
+                       "Scenario": np.tile(W, len(L)*nI*nS),
+                       "Hour": np.tile(np.repeat(hourlabels, nW), len(L)*nI),
+                       "TransmissionRecieved_MW": (eff*flow).ravel(),
+                       "Losses_MW": ((1 - eff)*flow).ravel()})
+    write_hourly(df, d, result_file_path, 'results_output_transmision_operational', OUTPUT_FORMAT, OUTPUT_LEVEL, nS)
+
+def node_hour_frame(d, inv_per, hours, seasons, hourlabels):
+    #Key columns of the hourly node files, rows by node, period, scenario and hour
+    N = d['Node']
+    W = d['Scenario']
+    nI, nS, nW = len(inv_per), len(hours), len(W)
+    return pd.DataFrame({"Node": np.repeat(N, nI*nW*nS),
+                         "Period": np.tile(np.repeat(inv_per, nW*nS), len(N)),
+                         "Scenario": np.tile(np.repeat(W, nS), len(N)*nI),
+                         "Season": np.tile(seasons, len(N)*nI*nW),
+                         "Hour": np.tile(hourlabels, len(N)*nI*nW)})
+
+def write_operational(d, sol, result_file_path, inv_per, HEATMODULE, DRMODULE, OUTPUT_FORMAT, OUTPUT_LEVEL):
+    #Electricity balance per node and hour, results_output_OperationalEL.csv
+    #with only the electricity generators and storages of the heat module
+
+    N = d['Node']
+    nN = len(N)
+    GN = d['GeneratorsOfNode']
+    BN = d['StoragesOfNode']
+    gn_node = d['gn_node']
+    bn_node = d['bn_node']
+    bn_stor = d['bn_stor']
+    hours, seasons, hourlabels = season_hours(d)
+
+    genOperational = sol['genOperational']
+    storCharge = sol['storCharge']
+    storDischarge = sol['storDischarge']
+    storOperational = sol['storOperational']
+    flow = sol['transmisionOperational']
+    eff = d['lineEfficiency'][:,None,None,None]
+
+    if HEATMODULE:
+        generators = d['GeneratorEL']
+        gen = member_of(GN, generators)
+        stor = member_of(BN, d['StorageEL'])
+        el = label_positions(generators, [[g for (n,g) in GN]])
+        chp = np.where(gen[:,None], d['genCHPEfficiency'][np.maximum(el, 0)], 0)[:,None,:,None]
+    else:
+        generators = d['Generator']
+        gen = np.ones(len(GN), dtype=bool)
+        stor = np.ones(len(BN), dtype=bool)
+        chp = np.ones((len(GN), 1, 1, 1))
+    elgen = chp*genOperational
+
+    storsum = lambda values: group_sum(values[stor], bn_node[stor], nN)
+    inflow = group_sum(eff*flow, d['link_to'], nN)
+    netload = d['sload'] - sol['loadShed'] + storsum(storCharge - d['storageDischargeEff'][bn_stor][:,None,None,None]*storDischarge) + \
+        group_sum(flow, d['link_from'], nN) - inflow
+
+    df = node_hour_frame(d, inv_per, hours, seasons, hourlabels)
+    df["AllGen_MW"] = hourly(group_sum(elgen[gen], gn_node[gen], nN), hours)
+    df["Load_MW"] = hourly(-d['sload'], hours)
+    df["Net_load_MW"] = hourly(-netload, hours)
+    genofnode = label_positions(generators, [[g for (n,g) in GN]])
+    for (k, g) in enumerate(generators):
+        atnode = np.zeros((nN,) + genOperational.shape[1:])
+        rows = genofnode == k
+        atnode[gn_node[rows]] = elgen[rows]
+        df[str(g)+"_MW"] = hourly(atnode, hours)
+    if HEATMODULE:
+        df["Converter_MW"] = hourly(-group_sum(sol['ConverterOperational'], label_positions(N, [[n for (n,r) in d['ConverterOfNode']]]), nN), hours)
+        df["Neighbourhood_MW"] = hourly(group_sum(sol['neighElectricOperational'] - sol['neighConverterOperational'],
+                                                  label_positions(N, [[n for (n,z) in d['NeighbourhoodOfNode']]]), nN), hours)
+    if DRMODULE:
+        dr = member_of(BN, d['StorageDR'])
+        drsum = lambda values: group_sum(values[dr], bn_node[dr], nN)
+        df["DRCharge_MW"] = hourly(-drsum(storCharge), hours)
+        df["DRDischarge_MW"] = hourly(drsum(storDischarge), hours)
+        df["DREnergyLevel_MWh"] = hourly(drsum(storOperational), hours)
+        df["DRMargCost_Euro"] = hourly(drsum(sol['storMargCost']), hours)
+    df["storCharge_MW"] = hourly(-storsum(storCharge), hours)
+    df["storDischarge_MW"] = hourly(storsum(storDischarge), hours)
+    df["storEnergyLevel_MWh"] = hourly(storsum(storOperational), hours)
+    df["LossesChargeDischargeBleed_MW"] = hourly(-storsum((1 - d['storageDischargeEff'][bn_stor])[:,None,None,None]*storDischarge +
+                                                          (1 - d['storageChargeEff'][bn_stor])[:,None,None,None]*storCharge +
+                                                          (1 - d['storageBleedEff'][bn_stor])[:,None,None,None]*storOperational), hours)
+    df["FlowOut_MW"] = hourly(-group_sum(flow, d['link_from'], nN), hours)
+    df["FlowIn_MW"] = hourly(group_sum(flow, d['link_to'], nN), hours)
+    df["LossesFlowIn_MW"] = hourly(-group_sum((1 - eff)*flow, d['link_to'], nN), hours)
+    df["LoadShed_MW"] = hourly(sol['loadShed'], hours)
+    df["Price_EURperMWh"] = hourly(sol['price'], hours)
+    generation = group_sum(genOperational[gen], gn_node[gen], nN)
+    co2 = group_sum((elgen*co2_rate(d)[:,None,:,None])[gen], gn_node[gen], nN)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df["AvgCO2_kgCO2perMWh"] = hourly(np.where(generation != 0, co2/generation, 0), hours)
+
+    if HEATMODULE:
+        write_hourly(df, d, result_file_path, 'results_output_OperationalEL', OUTPUT_FORMAT, OUTPUT_LEVEL, len(hours))
+    else:
+        write_hourly(df, d, result_file_path, 'results_output_Operational', OUTPUT_FORMAT, OUTPUT_LEVEL, len(hours))
+
+def write_operational_tr(d, sol, result_file_path, inv_per, OUTPUT_FORMAT, OUTPUT_LEVEL):
+    #Heat balance per node and hour, for the hours with heat load
+
+    N = d['Node']
+    nN = len(N)
+    GN = d['GeneratorsOfNode']
+    BN = d['StoragesOfNode']
+    RN = d['ConverterOfNode']
+    ZN = d['NeighbourhoodOfNode']
+    gn_node = d['gn_node']
+    bn_node = d['bn_node']
+    bn_stor = d['bn_stor']
+    rn_node = label_positions(N, [[n for (n,r) in RN]])
+    zn_node = label_positions(N, [[n for (n,z) in ZN]])
+    hours, seasons, hourlabels = season_hours(d)
+
+    genOperational = sol['genOperational']
+    storCharge = sol['storCharge']
+    storDischarge = sol['storDischarge']
+    storOperational = sol['storOperational']
+    gen = member_of(GN, d['GeneratorTR'])
+    stor = member_of(BN, d['StorageTR'])
+    storsum = lambda values: group_sum(values[stor], bn_node[stor], nN)
+
+    df = node_hour_frame(d, inv_per, hours, seasons, hourlabels)
+    df["AllGen_MW"] = hourly(group_sum(genOperational[gen], gn_node[gen], nN), hours)
+    df["Load_MW"] = hourly(-d['sloadTR'], hours)
+    df["Net_load_MW"] = hourly(-(d['sloadTR'] - sol['loadShedTR'] + storsum(storCharge - d['storageDischargeEff'][bn_stor][:,None,None,None]*storDischarge)), hours)
+    for (labels, members, rows, values) in [
+            (d['GeneratorTR'], GN, gn_node, genOperational),
+            (d['Converter'], RN, rn_node, d['ConverterEff'][label_positions(d['Converter'], [[r for (n,r) in RN]])][:,None,None,None]*d['convAvail']*sol['ConverterOperational']),
+            (d['Neighbourhood'], ZN, zn_node, sol['neighHeatOperational'] + d['neighConverterEff'][:,:,None,:]*sol['neighConverterOperational'])]:
+        ofnode = label_positions(labels, [[m[-1] for m in members]])
+        for (k, m) in enumerate(labels):
+            atnode = np.zeros((nN,) + genOperational.shape[1:])
+            atnode[rows[ofnode == k]] = values[ofnode == k]
+            df[str(m)+"_MW"] = hourly(atnode, hours)
+    df["storCharge_MW"] = hourly(-storsum(storCharge), hours)
+    df["storDischarge_MW"] = hourly(storsum(storDischarge), hours)
+    df["LossesChargeDischargeBleed_MW"] = hourly(-storsum((1 - d['storageDischargeEff'][bn_stor])[:,None,None,None]*storDischarge +
+                                                          (1 - d['storageChargeEff'][bn_stor])[:,None,None,None]*storCharge +
+                                                          (1 - d['storageBleedEff'][bn_stor])[:,None,None,None]*storOperational), hours)
+    df["LoadShedTR_MW"] = hourly(sol['loadShedTR'], hours)
+    df["Price_EURperMWh"] = hourly(sol['priceTR'], hours)
+    generation = group_sum(genOperational[gen], gn_node[gen], nN)
+    co2 = group_sum((genOperational*co2_rate(d)[:,None,:,None])[gen], gn_node[gen], nN)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df["MargCO2_kgCO2perMWh"] = hourly(np.where(generation != 0, co2/generation, 0), hours)
+    df["storEnergyLevel_MWh"] = hourly(storsum(storOperational), hours)
+    write_hourly(df[hourly(d['sloadTR'], hours) != 0], d, result_file_path, 'results_output_OperationalTR', OUTPUT_FORMAT, OUTPUT_LEVEL, len(hours))
+
+def write_conv(d, sol, result_file_path, inv_per):
+    RN = d['ConverterOfNode']
+    r = label_positions(d['Converter'], [[r for (n,r) in RN]])
+    ConverterInvCap = sol['ConverterInvCap']
+    ConverterInstalledCap = sol['ConverterInstalledCap']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        capacityfactor = np.where(ConverterInstalledCap != 0, expected(d, sol['ConverterOperational'])/(ConverterInstalledCap*8760), 0)
+    df = pd.DataFrame({"Node": np.repeat([n for (n,r) in RN], len(inv_per)),
+                       "ConverterType": np.repeat([r for (n,r) in RN], len(inv_per)),
+                       "Period": np.tile(inv_per, len(RN)),
+                       "ConverterInvCap_MW": ConverterInvCap.ravel(),
+                       "ConverterInstalledCap_MW": ConverterInstalledCap.ravel(),
+                       "ConverterExpectedCapacityFactor": capacityfactor.ravel(),
+                       "DiscountedInvestmentCost_Euro": (d['discount_multiplier'][None,:]*ConverterInvCap*d['ConverterInvCost'][r]).ravel(),
+                       "ConverterExpectedAnnualHeatProduction_GWh": (expected(d, d['ConverterEff'][r][:,None,None,None]*d['convAvail']*sol['ConverterOperational'])/1000).ravel()})
+    df.to_csv(result_file_path + "/" + 'results_output_conv.csv', index=False)
+
+def write_neigh(d, sol, result_file_path, inv_per):
+    ZN = d['NeighbourhoodOfNode']
+    z = label_positions(d['Neighbourhood'], [[z for (n,z) in ZN]])
+    neighInvCap = sol['neighInvCap']
+    df = pd.DataFrame({"Node": np.repeat([n for (n,z) in ZN], len(inv_per)),
+                       "NeighbourhoodType": np.repeat([z for (n,z) in ZN], len(inv_per)),
+                       "Period": np.tile(inv_per, len(ZN)),
+                       "neighInvCap_MW": neighInvCap.ravel(),
+                       "neighInstalledCap_MW": sol['neighInstalledCap'].ravel(),
+                       "DiscountedInvestmentCost_Euro": (d['discount_multiplier'][None,:]*neighInvCap*d['neighInvCost'][z]).ravel(),
+                       "neighExpectedElectricAnnualProduction_GWh": (expected(d, sol['neighElectricOperational'])/1000).ravel(),
+                       "neighExpectedHeatAnnualProduction_GWh": (expected(d, sol['neighHeatOperational'])/1000).ravel(),
+                       "neighExpectedConverterAnnualHeatProduction_GWh": (expected(d, d['neighConverterEff'][:,:,None,:]*sol['neighConverterOperational'])/1000).ravel()})
+    df.to_csv(result_file_path + "/" + 'results_output_neigh.csv', index=False)
+
+def write_curtailed(d, sol, result_file_path, inv_per):
+    GN = d['GeneratorsOfNode']
+    curtailed = expected(d, d['genCapAvail']*sol['genInstalledCap'][:,None,:,None] - sol['genOperational'])/1000
+    rows = [np.flatnonzero(d['tech_gen'][k, d['gn_gen']]) for (k, t) in enumerate(d['Technology']) if t in RES_TECHNOLOGIES]
+    rows = np.concatenate(rows) if len(rows) > 0 else np.zeros(0, dtype=int)
+    df = pd.DataFrame({"Node": np.repeat([GN[k][0] for k in rows], len(inv_per)),
+                       "RESGeneratorType": np.repeat([GN[k][1] for k in rows], len(inv_per)),
+                       "Period": np.tile(inv_per, len(rows)),
+                       "ExpectedAnnualCurtailment_GWh": curtailed[rows].ravel()})
+    df.to_csv(result_file_path + "/" + 'results_output_curtailed_prod.csv', index=False)
+
+def type_table(writer, title, labels, inv_per, values, first=None):
+    #Block of rows per period over the generator (or storage) types
+    writer.writerow(["Period", title])
+    writer.writerow([""] + list(labels))
+    if first is not None:
+        writer.writerow(["Initial"] + first.tolist())
+    for (k, p) in enumerate(inv_per):
+        writer.writerow([p] + values[:, k].tolist())
+
+def write_europe_plot(d, sol, result_file_path, inv_per, HEATMODULE):
+    G = d['Generator']
+    B = d['Storage']
+    gn_gen = d['gn_gen']
+    bn_stor = d['bn_stor']
+    initial = group_sum(d['genInitCap'][:, list(d['PeriodActive']).index(1)], gn_gen, len(G))
+
+    f = open(result_file_path + "/" + 'results_output_EuropePlot.csv', 'w', newline='')
+    writer = csv.writer(f)
+    type_table(writer, "genInstalledCap_MW", G, inv_per, group_sum(sol['genInstalledCap'], gn_gen, len(G)), initial)
+    writer.writerow([""])
+    type_table(writer, "genExpectedAnnualProduction_GWh", G, inv_per, group_sum(expected(d, sol['genOperational'])/1000, gn_gen, len(G)))
+    writer.writerow([""])
+    type_table(writer, "storPWInstalledCap_MW", B, inv_per, group_sum(sol['storPWInstalledCap'], bn_stor, len(B)))
+    writer.writerow([""])
+    type_table(writer, "storENInstalledCap_MW", B, inv_per, group_sum(sol['storENInstalledCap'], bn_stor, len(B)))
+    writer.writerow([""])
+    type_table(writer, "storExpectedAnnualDischarge_GWh", B, inv_per, group_sum(expected(d, sol['storDischarge'])/1000, bn_stor, len(B)))
+    if HEATMODULE:
+        R = d['Converter']
+        Z = d['Neighbourhood']
+        writer.writerow([""])
+        type_table(writer, "ConverterInstalledCap_MW", R, inv_per,
+                   group_sum(sol['ConverterInstalledCap'], label_positions(R, [[r for (n,r) in d['ConverterOfNode']]]), len(R)))
+        writer.writerow([""])
+        type_table(writer, "NeighbourhoodInstalledCap_MW", Z, inv_per,
+                   group_sum(sol['neighInstalledCap'], label_positions(Z, [[z for (n,z) in d['NeighbourhoodOfNode']]]), len(Z)))
+    f.close()
+
+def write_europe_summary(d, sol, result_file_path, inv_per, EMISSION_CAP):
+    G = d['Generator']
+    B = d['Storage']
+    W = d['Scenario']
+    GN = d['GeneratorsOfNode']
+    gn_gen = d['gn_gen']
+    bn_stor = d['bn_stor']
+    disc = d['discount_multiplier']
+    hours, seasons, hourlabels = season_hours(d)
+    nI, nW = len(inv_per), len(W)
+
+    genOperational = sol['genOperational']
+    co2 = annual(d, genOperational*co2_rate(d)[:,None,:,None]).sum(axis=0)
+    generation = annual(d, genOperational).sum(axis=0)
+    res = member_of(GN, RES_GENERATORS)
+    curtailed = annual(d, (d['genCapAvail']*sol['genInstalledCap'][:,None,:,None] - genOperational)[res]).sum(axis=0)
+    storlosses = annual(d, (1 - d['storageDischargeEff'][bn_stor])[:,None,None,None]*sol['storDischarge'] +
+                        (1 - d['storageChargeEff'][bn_stor])[:,None,None,None]*sol['storCharge']).sum(axis=0)
+    tocount = d['link_arc'] >= 0
+    linelosses = annual(d, ((1 - d['lineEfficiency'])[:,None,None,None]*sol['transmisionOperational'])[tocount]).sum(axis=0)
+    avgprice = sol['price'][:, hours].mean(axis=(0, 1))
+    if EMISSION_CAP:
+        co2price = sol['emission_cap']/(d['operationalDiscountrate']*d['sceProbab'][None,:]*1e6)
+        co2cap = np.repeat(d['CO2cap'][:,None]*1e6, nW, axis=1)
+    else:
+        co2price = np.repeat(d['CO2price'][:,None], nW, axis=1)
+        co2cap = np.zeros((nI, nW))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        co2factor = co2/generation
+
+    f = open(result_file_path + "/" + 'results_output_EuropeSummary.csv', 'w', newline='')
+    writer = csv.writer(f)
+    writer.writerow(["Period","Scenario","AnnualCO2emission_Ton","CO2Price_EuroPerTon","CO2Cap_Ton","AnnualGeneration_GWh","AvgCO2factor_TonPerMWh","AvgELPrice_EuroPerMWh","TotAnnualCurtailedRES_GWh","TotAnnualLossesChargeDischarge_GWh","AnnualLossesTransmission_GWh"])
+    writer.writerows(zip(np.repeat(inv_per, nW), np.tile(W, nI), co2.ravel().tolist(), co2price.ravel().tolist(), co2cap.ravel().tolist(),
+                         (generation/1000).ravel().tolist(), co2factor.ravel().tolist(), avgprice.ravel().tolist(), (curtailed/1000).ravel().tolist(),
+                         (storlosses/1000).ravel().tolist(), (linelosses/1000).ravel().tolist()))
+    writer.writerow([""])
+    writer.writerow(["GeneratorType","Period","genInvCap_MW","genInstalledCap_MW","TotDiscountedInvestmentCost_Euro","genExpectedAnnualProduction_GWh"])
+    writer.writerows(zip(np.repeat(G, nI), np.tile(inv_per, len(G)),
+                         group_sum(sol['genInvCap'], gn_gen, len(G)).ravel().tolist(),
+                         group_sum(sol['genInstalledCap'], gn_gen, len(G)).ravel().tolist(),
+                         group_sum(disc[None,:]*sol['genInvCap']*d['genInvCost'][gn_gen], gn_gen, len(G)).ravel().tolist(),
+                         group_sum(expected(d, genOperational)/1000, gn_gen, len(G)).ravel().tolist()))
+    writer.writerow([""])
+    writer.writerow(["StorageType","Period","storPWInvCap_MW","storPWInstalledCap_MW","storENInvCap_MWh","storENInstalledCap_MWh","TotDiscountedInvestmentCostPWEN_Euro","ExpectedAnnualDischargeVolume_GWh"])
+    writer.writerows(zip(np.repeat(B, nI), np.tile(inv_per, len(B)),
+                         group_sum(sol['storPWInvCap'], bn_stor, len(B)).ravel().tolist(),
+                         group_sum(sol['storPWInstalledCap'], bn_stor, len(B)).ravel().tolist(),
+                         group_sum(sol['storENInvCap'], bn_stor, len(B)).ravel().tolist(),
+                         group_sum(sol['storENInstalledCap'], bn_stor, len(B)).ravel().tolist(),
+                         group_sum(disc[None,:]*(sol['storPWInvCap']*d['storPWInvCost'][bn_stor] + sol['storENInvCap']*d['storENInvCost'][bn_stor]), bn_stor, len(B)).ravel().tolist(),
+                         group_sum(expected(d, sol['storDischarge'])/1000, bn_stor, len(B)).ravel().tolist()))
+    f.close()
+
+def write_price_cube(d, sol, result_file_path, inv_per):
+    #Prices per node, hour, period and scenario (as the hourly files, in
+    #EUR/MWh) with their labels in one compressed NumPy file, the heat prices
+    #next to the electricity prices with the heat module
+    cube = {'price': sol['price'].astype(np.float32)}
+    if 'priceTR' in sol:
+        cube['priceTR'] = sol['priceTR'].astype(np.float32)
+    season = dict((h, s) for (s,h) in d['HoursOfSeason'])
+    np.savez_compressed(result_file_path + "/" + 'results_output_price_cube.npz',
+                        Node=np.array(d['Node'], dtype=str), Hour=np.array(d['Operationalhour']),
+                        Season=np.array([season.get(h, '') for h in d['Operationalhour']], dtype=str),
+                        Period=np.array(inv_per, dtype=str), Scenario=np.array(d['Scenario'], dtype=str), **cube)
+
+def write_first_stage(d, sol, result_file_path):
+    #Print first stage decisions for out-of-sample
+    I = d['PeriodActive']
+    for (v, labels, header) in [('genInvCap', d['GeneratorsOfNode'], ["Node","Generator"]),
+                                ('transmisionInvCap', d['BidirectionalArc'], ["FromNode","ToNode"]),
+                                ('storPWInvCap', d['StoragesOfNode'], ["Node","Storage"]),
+                                ('storENInvCap', d['StoragesOfNode'], ["Node","Storage"]),
+                                ('genInstalledCap', d['GeneratorsOfNode'], ["Node","Generator"]),
+                                ('transmisionInstalledCap', d['BidirectionalArc'], ["FromNode","ToNode"]),
+                                ('storPWInstalledCap', d['StoragesOfNode'], ["Node","Storage"]),
+                                ('storENInstalledCap', d['StoragesOfNode'], ["Node","Storage"])]:
+        df = pd.DataFrame({header[0]: np.repeat([a for (a,b) in labels], len(I)),
+                           header[1]: np.repeat([b for (a,b) in labels], len(I)),
+                           "Period": np.tile(I, len(labels)),
+                           v: sol[v].ravel()})
+        df.to_csv(result_file_path + "/" + v + '.tab', sep='\t', index=False)
+
+###########
+##WRITING##
+###########
+
+def result_tasks(result_file_path, inv_per, HEATMODULE, DRMODULE, EMISSION_CAP, OUTPUT_FORMAT, OUTPUT_LEVEL, duals):
+    #Result files of the output level as independent tasks (file, writer,
+    #arguments after d and sol), the hourly files first as they take longest.
+    #Without duals (decomposition modes) the files with prices are left out.
+    tasks = []
+    if output_at(OUTPUT_LEVEL, 'seasonal'):
+        if duals:
+            tasks.append(('results_output_OperationalEL' if HEATMODULE else 'results_output_Operational', write_operational,
+                          (result_file_path, inv_per, HEATMODULE, DRMODULE, OUTPUT_FORMAT, OUTPUT_LEVEL)))
+            if HEATMODULE:
+                tasks.append(('results_output_OperationalTR', write_operational_tr, (result_file_path, inv_per, OUTPUT_FORMAT, OUTPUT_LEVEL)))
+        tasks.append(('results_output_transmision_operational', write_transmission_operational, (result_file_path, inv_per, OUTPUT_FORMAT, OUTPUT_LEVEL)))
+        if duals:
+            tasks.append(('results_output_price_cube.npz', write_price_cube, (result_file_path, inv_per)))
+    if output_at(OUTPUT_LEVEL, 'capacity'):
+        if HEATMODULE:
+            tasks.append(('results_output_conv.csv', write_conv, (result_file_path, inv_per)))
+            tasks.append(('results_output_neigh.csv', write_neigh, (result_file_path, inv_per)))
+        tasks.append(('results_output_gen.csv', write_gen, (result_file_path, inv_per, HEATMODULE)))
+        tasks.append(('results_output_stor.csv', write_stor, (result_file_path, inv_per)))
+        tasks.append(('results_output_transmision.csv', write_transmission, (result_file_path, inv_per)))
+        tasks.append(('results_output_curtailed_prod.csv', write_curtailed, (result_file_path, inv_per)))
+        tasks.append(('results_output_EuropePlot.csv', write_europe_plot, (result_file_path, inv_per, HEATMODULE)))
+    if duals:
+        tasks.append(('results_output_EuropeSummary.csv', write_europe_summary, (result_file_path, inv_per, EMISSION_CAP)))
+    tasks.append(('first stage .tab files', write_first_stage, (result_file_path,)))
+    return tasks
+
+_d = None
+_sol = None
+
+def init_writer(d, sol):
+    global _d, _sol
+    _d = d
+    _sol = sol
+
+def write_task(filename, writer, args):
+    start = time.time()
+    writer(_d, _sol, *args)
+    return filename, time.time() - start
+
+def start_writers(d, sol, tasks, NO_OF_WORKERS):
+    #Run the tasks on a pool of at most NO_OF_WORKERS processes. The workers are
+    #forked with d and sol, so the solution is shared read-only and only the
+    #task names and timings pass between the processes. Without a pool the
+    #tasks run here and now.
+    pool = process_pool(min(NO_OF_WORKERS, len(tasks)), init_writer, (d, sol))
+    if pool is None:
+        return None, [write_task(*t) for t in tasks]
+    return pool, [pool.submit(write_task, *t) for t in tasks]
+
+def finish_writers(pool, futures, start):
+    #Wait for the tasks from start_writers and print the time per file
+    if pool is not None:
+        futures = [f.result() for f in futures]
+        pool.shutdown()
+    print("Writing results took [sec]:")
+    print(time.time() - start)
+    for (filename, seconds) in futures:
+        print("  " + filename + ": " + str(round(seconds, 3)))
@@ -0,0 +1,113 @@
+from __future__ import division
+from preprocess import array_to_dict
+from empire_results import investment_periods, result_tasks, start_writers, finish_writers
+import numpy as np
+import json
+import time
+import sys
+import os
+
+#Solution snapshot of a run: the index sets, the parameter dict of the
+#preprocessing, the solution arrays of empire_results (variable values, the
+#price cube and the emission_cap duals) and the run settings. Every array is
+#one .npy file that numpy.load can memory map, and manifest.json lists the
+#sets, the arrays and the settings. A snapshot is enough to write the result
+#files again or to set the variable values of a new instance, without the
+#model or the solver. Rewrite the result files from a snapshot with
+#
+#   python empire_snapshot.py <snapshot folder> <result folder> [OUTPUT_FORMAT] [OUTPUT_LEVEL]
+
+SNAPSHOT_FORMAT = 1
+
+#Solution arrays over (index set, period) and (index set, hour, period, scenario)
+SOLUTION_SETS = {'genInvCap': 'GeneratorsOfNode', 'transmisionInvCap': 'BidirectionalArc', 'storPWInvCap': 'StoragesOfNode',
+                 'storENInvCap': 'StoragesOfNode', 'genInstalledCap': 'GeneratorsOfNode', 'transmisionInstalledCap': 'BidirectionalArc',
+                 'storPWInstalledCap': 'StoragesOfNode', 'storENInstalledCap': 'StoragesOfNode', 'ConverterInvCap': 'ConverterOfNode',
+                 'ConverterInstalledCap': 'ConverterOfNode', 'neighInvCap': 'NeighbourhoodOfNode', 'neighInstalledCap': 'NeighbourhoodOfNode',
+                 'genOperational': 'GeneratorsOfNode', 'storOperational': 'StoragesOfNode', 'storCharge': 'StoragesOfNode',
+                 'storDischarge': 'StoragesOfNode', 'transmisionOperational': 'DirectionalLink', 'loadShed': 'Node',
+                 'ConverterOperational': 'ConverterOfNode', 'neighElectricOperational': 'NeighbourhoodOfNode',
+                 'neighHeatOperational': 'NeighbourhoodOfNode', 'neighConverterOperational': 'NeighbourhoodOfNode',
+                 'loadShedTR': 'Node', 'storMargCost': 'StoragesOfNode'}
+
+def array_entry(path, prefix, key, values):
+    filename = prefix + '_' + key + '.npy'
+    np.save(path + "/" + filename, values)
+    return {'file': filename, 'shape': list(values.shape), 'dtype': str(values.dtype)}
+
+def write_snapshot(d, sol, result_file_path, settings):
+    #Snapshot in result_file_path/snapshot, the manifest last so that a
+    #snapshot with a manifest is complete
+
+    path = result_file_path + "/" + 'snapshot'
+    os.makedirs(path, exist_ok=True)
+
+    manifest = {'format': SNAPSHOT_FORMAT, 'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'settings': settings,
+                'sets': {}, 'scalars': {}, 'parameters': {}, 'solution': {}}
+    for (key, values) in d.items():
+        if isinstance(values, list):
+            manifest['sets'][key] = values
+        elif isinstance(values, np.ndarray):
+            manifest['parameters'][key] = array_entry(path, 'd', key, values)
+        else:
+            manifest['scalars'][key] = float(values)
+    for (key, values) in sol.items():
+        manifest['solution'][key] = array_entry(path, 'sol', key, np.asarray(values))
+
+    with open(path + "/" + 'manifest.json', 'w') as f:
+        json.dump(manifest, f, indent=1, default=lambda o: o.item())
+
+def read_snapshot(path, mmap_mode='r'):
+    #Parameter dict, solution arrays and settings of a snapshot, the arrays
+    #memory mapped unless mmap_mode is None
+    with open(path + "/" + 'manifest.json') as f:
+        manifest = json.load(f)
+    if manifest['format'] != SNAPSHOT_FORMAT:
+        sys.exit("ERROR! Snapshot format " + str(manifest['format']) + " is not supported")
+
+    #JSON has no tuples, members of sets of tuples come back as lists
+    d = {key: [tuple(m) if isinstance(m, list) else m for m in members] for (key, members) in manifest['sets'].items()}
+    d.update(manifest['scalars'])
+    for (key, entry) in manifest['parameters'].items():
+        d[key] = np.load(path + "/" + entry['file'], mmap_mode=mmap_mode)
+    sol = {key: np.load(path + "/" + entry['file'], mmap_mode=mmap_mode) for (key, entry) in manifest['solution'].items()}
+    return d, sol, manifest['settings']
+
+def load_values(instance, d, sol):
+    #Set the variables of a (new) instance to the snapshot values, e.g. to
+    #evaluate the objective or the constraints of a changed model at them
+    for (v, labels) in SOLUTION_SETS.items():
+        if v not in sol or not hasattr(instance, v):
+            continue
+        var = getattr(instance, v)
+        if sol[v].ndim == 2:
+            index = [d[labels], d['PeriodActive']]
+        else:
+            index = [d[labels], d['Operationalhour'], d['PeriodActive'], d['Scenario']]
+        for (k, x) in array_to_dict(np.asarray(sol[v]), index).items():
+            if k in var:
+                var[k].set_value(x, skip_validation=True)
+
+def write_snapshot_results(path, result_file_path, OUTPUT_FORMAT, OUTPUT_LEVEL, NO_OF_WORKERS):
+    #Result files (and the IAMC file if the run printed it) from a snapshot
+
+    print("Reading snapshot...")
+    d, sol, settings = read_snapshot(path)
+    os.makedirs(result_file_path, exist_ok=True)
+
+    print("Writing results to .csv...")
+    start = time.time()
+    inv_per = investment_periods(d['PeriodActive'], settings['LeapYearsInvestment'])
+    tasks = result_tasks(result_file_path, inv_per, settings['HEATMODULE'], settings['DRMODULE'], settings['EMISSION_CAP'],
+                         OUTPUT_FORMAT, OUTPUT_LEVEL, 'price' in sol)
+    if settings['IAMC_PRINT'] and 'price' in sol:
+        #Imported here since empire_iamc needs pyomo
+        from empire_iamc import write_iamc
+        tasks.append(('IAMC/empire_iamc.csv', write_iamc, (result_file_path, settings['LeapYearsInvestment'], settings['discountrate'])))
+    finish_writers(*start_writers(d, sol, tasks, NO_OF_WORKERS), start)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or len(sys.argv) > 5:
+        sys.exit("ERROR! Usage: python empire_snapshot.py <snapshot folder> <result folder> [OUTPUT_FORMAT] [OUTPUT_LEVEL]")
+    write_snapshot_results(sys.argv[1], sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else "csv",
+                           sys.argv[4] if len(sys.argv) > 4 else "hourly", os.cpu_count() or 1)
@@ -0,0 +1,503 @@
+from __future__ import division
+import pandas as pd
+import numpy as np
+
+#Parameter preprocessing for EMPIRE on whole arrays. Sets are kept as ordered
+#member lists and parameters as dense NumPy arrays over those lists, so that
+#derived parameters (investment costs, availabilities, load profiles, ...) are
+#computed in one pass instead of element by element in BuildActions.
+
+#Stochastic parameters are ordered (..., hour, period, scenario) like the
+#model variables, whatever the column order in the .tab files.
+
+##########
+##INPUTS##
+##########
+
+#The .tab tables of reader.generate_tab_files are handed on as frames, a dict
+#of frames by path. A file is read from disk if it is not in frames.
+
+def frames_by_path(tab_file_path, tab_frames):
+    #Frames by path from the frames of generate_tab_files (by name relative to
+    #tab_file_path), or None to read every .tab file from disk
+    if tab_frames is None:
+        return None
+    return {tab_file_path + "/" + name: df for (name, df) in tab_frames.items()}
+
+def read_tab(filename, frames=None):
+    if frames is not None and filename in frames:
+        return frames[filename]
+    return pd.read_csv(filename, sep='\t')
+
+def load_tab(data, filename, format, set=None, param=None, frames=None):
+    #DataPortal.load of a set or a parameter table, from frames if possible
+    if frames is None or filename not in frames:
+        if set is not None:
+            data.load(filename=filename, format=format, set=set)
+        else:
+            data.load(filename=filename, format=format, param=param)
+    elif set is not None:
+        data[set.name] = read_set(filename, frames)
+    else:
+        df = frames[filename]
+        keys = [df.iloc[:,k].tolist() for k in range(df.shape[1] - 1)]
+        keys = keys[0] if len(keys) == 1 else list(zip(*keys))
+        data[param.name] = dict(zip(keys, df.iloc[:,-1].tolist()))
+
+def read_set(filename, frames=None):
+    #Read a set from a .tab file, keeping the order and dropping duplicates
+    df = read_tab(filename, frames)
+    if df.shape[1] == 1:
+        members = df.iloc[:,0].tolist()
+    else:
+        members = list(df.itertuples(index=False, name=None))
+    return list(dict.fromkeys(members))
+
+def merge_sets(members, extra):
+    #Members added by a module go after the existing members (as Set.add)
+    return list(dict.fromkeys(list(members) + list(extra)))
+
+def positions(labels, members):
+    #Position of each member in an (ordered) index set
+    labelpos = {l: k for k, l in enumerate(labels)}
+    return np.array([labelpos[m] for m in members if m in labelpos], dtype=int)
+
+def label_positions(labels, columns):
+    #Position of each row key in an (ordered) index set, -1 if not a member
+    if len(columns) == 1:
+        return pd.Index(labels).get_indexer(columns[0])
+    if len(labels) == 0:
+        return np.full(len(columns[0]), -1)
+    return pd.MultiIndex.from_tuples(labels).get_indexer(pd.MultiIndex.from_arrays(columns))
+
+def read_param(filename, index, default=0.0, frames=None):
+    #Read a parameter from a .tab file into a dense array over the index sets
+    return frame_to_array(read_tab(filename, frames), index, default)
+
+def frame_to_array(df, index, default=0.0):
+    #Dense array over the index sets from a frame with the index columns first
+    #and the values last. Every entry in index is the ordered member list of
+    #one index set; sets of tuples (e.g. GeneratorsOfNode) take as many
+    #columns as their dimension.
+    values = np.full(tuple(len(labels) for labels in index), default, dtype=float)
+    if len(df) == 0:
+        return values
+    pos = []
+    col = 0
+    for labels in index:
+        dimen = len(labels[0]) if len(labels) > 0 and isinstance(labels[0], tuple) else 1
+        pos.append(label_positions(labels, [df.iloc[:,col+k] for k in range(dimen)]))
+        col += dimen
+    keep = np.all([p >= 0 for p in pos], axis=0)
+    values[tuple(p[keep] for p in pos)] = df.iloc[:,col].to_numpy(dtype=float)[keep]
+    return values
+
+def array_to_dict(values, index, default=None):
+    #Flatten an array over the index sets into {key: value} as DataPortal
+    #expects, leaving out entries equal to the parameter default
+    if default is None:
+        pos = np.indices(values.shape).reshape(values.ndim, -1)
+    else:
+        pos = np.nonzero(values != default)
+    columns = []
+    for labels, p in zip(index, pos):
+        if len(labels) > 0 and isinstance(labels[0], tuple):
+            for col in zip(*labels):
+                columns.append(np.array(col, dtype=object)[p])
+        else:
+            columns.append(np.array(labels, dtype=object)[p])
+    if len(columns) == 1:
+        keys = columns[0].tolist()
+    else:
+        keys = list(zip(*columns))
+    return dict(zip(keys, values[tuple(pos)].tolist()))
+
+def load_parameters(tab_file_path, scenariopath, Period, Operationalhour, Scenario, Season,
+                    HoursOfSeason, FirstHoursOfRegSeason, FirstHoursOfPeakSeason,
+                    HEATMODULE, DRMODULE, EMISSION_CAP, LOADCHANGEMODULE, frames=None):
+    #Read sets and the parameters that enter the preprocessing into a
+    #dictionary of lists and arrays, with heat and DR module input merged in
+
+    d = {}
+    d['Generator'] = read_set(tab_file_path + "/" + 'Sets_Generator.tab', frames)
+    d['ThermalGenerators'] = read_set(tab_file_path + "/" + 'Sets_ThermalGenerators.tab', frames)
+    d['HydroGenerator'] = read_set(tab_file_path + "/" + 'Sets_HydroGenerator.tab', frames)
+    d['RegHydroGenerator'] = read_set(tab_file_path + "/" + 'Sets_HydroGeneratorWithReservoir.tab', frames)
+    d['Storage'] = read_set(tab_file_path + "/" + 'Sets_Storage.tab', frames)
+    d['DependentStorage'] = read_set(tab_file_path + "/" + 'Sets_DependentStorage.tab', frames)
+    d['Technology'] = read_set(tab_file_path + "/" + 'Sets_Technology.tab', frames)
+    d['Node'] = read_set(tab_file_path + "/" + 'Sets_Node.tab', frames)
+    d['Period'] = read_set(tab_file_path + "/" + 'Sets_Horizon.tab', frames)
+    d['DirectionalLink'] = read_set(tab_file_path + "/" + 'Sets_DirectionalLines.tab', frames)
+    d['TransmissionType'] = read_set(tab_file_path + "/" + 'Sets_LineType.tab', frames)
+    d['TransmissionTypeOfDirectionalLink'] = read_set(tab_file_path + "/" + 'Sets_LineTypeOfDirectionalLines.tab', frames)
+    d['GeneratorsOfTechnology'] = read_set(tab_file_path + "/" + 'Sets_GeneratorsOfTechnology.tab', frames)
+    d['GeneratorsOfNode'] = read_set(tab_file_path + "/" + 'Sets_GeneratorsOfNode.tab', frames)
+    d['StoragesOfNode'] = read_set(tab_file_path + "/" + 'Sets_StorageOfNodes.tab', frames)
+
+    d['PeriodActive'] = list(Period)
+    d['Operationalhour'] = list(Operationalhour)
+    d['Scenario'] = list(Scenario)
+    d['Season'] = list(Season)
+    d['HoursOfSeason'] = list(HoursOfSeason)
+    d['FirstHoursOfRegSeason'] = list(FirstHoursOfRegSeason)
+    d['FirstHoursOfPeakSeason'] = list(FirstHoursOfPeakSeason)
+
+    if HEATMODULE:
+        d['Converter'] = read_set(tab_file_path + "/" + 'HeatModule/HeatModuleSets_ElectrToHeatConverter.tab', frames)
+        d['ConverterOfNode'] = read_set(tab_file_path + "/" + 'HeatModule/HeatModuleSets_ConverterOfNodes.tab', frames)
+        d['GeneratorCHP'] = read_set(tab_file_path + "/" + 'HeatModule/HeatModuleSets_GeneratorHeatAndElectricity.tab', frames)
+        d['GeneratorTR'] = read_set(tab_file_path + "/" + 'HeatModule/HeatModuleSets_GeneratorHeat.tab', frames)
+        d['StorageTR'] = read_set(tab_file_path + "/" + 'HeatModule/HeatModuleSets_StorageHeat.tab', frames)
+        d['DependentStorageTR'] = read_set(tab_file_path + "/" + 'HeatModule/HeatModuleSets_DependentStorageHeat.tab', frames)
+        d['TechnologyHeat'] = read_set(tab_file_path + "/" + 'HeatModule/HeatModuleSets_TechnologyHeat.tab', frames)
+        d['Neighbourhood'] = read_set(tab_file_path + "/" + 'HeatModule/HeatModuleSets_Neighbourhood.tab', frames)
+        d['NeighbourhoodOfNode'] = read_set(tab_file_path + "/" + 'HeatModule/HeatModuleSets_NeighbourhoodOfNode.tab', frames)
+
+        d['GeneratorEL'] = merge_sets(d['Generator'], d['GeneratorCHP'])
+        d['StorageEL'] = list(d['Storage'])
+        d['Generator'] = merge_sets(d['Generator'], d['GeneratorTR'])
+        d['ThermalGenerators'] = merge_sets(d['ThermalGenerators'], read_set(tab_file_path + "/" + 'HeatModule/HeatModuleSets_ThermalGenerators.tab', frames))
+        d['Storage'] = merge_sets(d['Storage'], d['StorageTR'])
+        d['DependentStorage'] = merge_sets(d['DependentStorage'], d['DependentStorageTR'])
+        d['Technology'] = merge_sets(d['Technology'], d['TechnologyHeat'])
+        d['StoragesOfNode'] = merge_sets(d['StoragesOfNode'], read_set(tab_file_path + "/" + 'HeatModule/HeatModuleSets_StorageOfNodes.tab', frames))
+        d['GeneratorsOfNode'] = merge_sets(d['GeneratorsOfNode'], read_set(tab_file_path + "/" + 'HeatModule/HeatModuleSets_GeneratorsOfNode.tab', frames))
+        d['GeneratorsOfTechnology'] = merge_sets(d['GeneratorsOfTechnology'], read_set(tab_file_path + "/" + 'HeatModule/HeatModuleSets_GeneratorsOfTechnology.tab', frames))
+
+    if DRMODULE:
+        d['StorageDR'] = read_set(tab_file_path + "/" + 'DRModule/DRModuleSets_StorageDemandResponse.tab', frames)
+        d['DependentStorageDR'] = read_set(tab_file_path + "/" + 'DRModule/DRModuleSets_DependentStorage.tab', frames)
+
+        d['Storage'] = merge_sets(d['Storage'], d['StorageDR'])
+        if HEATMODULE:
+            d['StorageEL'] = merge_sets(d['StorageEL'], d['StorageDR'])
+        d['DependentStorage'] = merge_sets(d['DependentStorage'], d['DependentStorageDR'])
+        d['StoragesOfNode'] = merge_sets(d['StoragesOfNode'], read_set(tab_file_path + "/" + 'DRModule/DRModuleSets_StorageOfNodes.tab', frames))
+
+    #Derived sets and index maps
+
+    d['BidirectionalArc'] = []
+    arcs = set()
+    for (i,j) in d['DirectionalLink']:
+        if i != j and (j,i) not in arcs:
+            arcs.add((i,j))
+            d['BidirectionalArc'].append((i,j))
+
+    nodepos = {n: k for k, n in enumerate(d['Node'])}
+    genpos = {g: k for k, g in enumerate(d['Generator'])}
+    storpos = {b: k for k, b in enumerate(d['Storage'])}
+    techpos = {t: k for k, t in enumerate(d['Technology'])}
+    hourpos = {h: k for k, h in enumerate(d['Operationalhour'])}
+    seasonpos = {s: k for k, s in enumerate(d['Season'])}
+    arcpos = {a: k for k, a in enumerate(d['BidirectionalArc'])}
+
+    d['gn_node'] = np.array([nodepos[n] for (n,g) in d['GeneratorsOfNode']], dtype=int)
+    d['gn_gen'] = np.array([genpos[g] for (n,g) in d['GeneratorsOfNode']], dtype=int)
+    d['bn_node'] = np.array([nodepos[n] for (n,b) in d['StoragesOfNode']], dtype=int)
+    d['bn_stor'] = np.array([storpos[b] for (n,b) in d['StoragesOfNode']], dtype=int)
+    d['link_from'] = np.array([nodepos[i] for (i,j) in d['DirectionalLink']], dtype=int)
+    d['link_to'] = np.array([nodepos[j] for (i,j) in d['DirectionalLink']], dtype=int)
+    d['link_arc'] = np.array([arcpos.get((i,j), arcpos.get((j,i), -1)) for (i,j) in d['DirectionalLink']], dtype=int)
+    d['hour_season'] = np.full(len(d['Operationalhour']), -1, dtype=int)
+    for (s,h) in d['HoursOfSeason']:
+        d['hour_season'][hourpos[h]] = seasonpos[s]
+    d['hour_prev'] = np.array([hourpos.get(h-1, -1) for h in d['Operationalhour']], dtype=int)
+    d['hour_first'] = np.isin(d['Operationalhour'], d['FirstHoursOfRegSeason'] + d['FirstHoursOfPeakSeason'])
+
+    d['gen_ccs'] = np.isin(d['Generator'], [g for (t,g) in d['GeneratorsOfTechnology'] if t == 'CCS'])
+    d['gen_thermal'] = np.isin(d['Generator'], d['ThermalGenerators'])
+    d['gen_hydro'] = np.isin(d['Generator'], d['HydroGenerator'])
+    d['gen_reghydro'] = np.isin(d['Generator'], d['RegHydroGenerator'])
+    d['stor_dependent'] = np.isin(d['Storage'], d['DependentStorage'])
+    d['tech_gen'] = np.zeros((len(d['Technology']), len(d['Generator'])))
+    for (t,g) in d['GeneratorsOfTechnology']:
+        if t in techpos and g in genpos:
+            d['tech_gen'][techpos[t], genpos[g]] = 1
+
+    G = d['Generator']
+    N = d['Node']
+    T = d['Technology']
+    B = d['Storage']
+    I = d['PeriodActive']
+    H = d['Operationalhour']
+    W = d['Scenario']
+    GN = d['GeneratorsOfNode']
+    BN = d['StoragesOfNode']
+    A = d['BidirectionalArc']
+    L = d['DirectionalLink']
+
+    d['genCapitalCost'] = read_param(tab_file_path + "/" + 'Generator_CapitalCosts.tab', [G, I], frames=frames)
+    d['genFixedOMCost'] = read_param(tab_file_path + "/" + 'Generator_FixedOMCosts.tab', [G, I], frames=frames)
+    d['genVariableOMCost'] = read_param(tab_file_path + "/" + 'Generator_VariableOMCosts.tab', [G], frames=frames)
+    d['genFuelCost'] = read_param(tab_file_path + "/" + 'Generator_FuelCosts.tab', [G, I], frames=frames)
+    d['CCSCostTSVariable'] = read_param(tab_file_path + "/" + 'Generator_CCSCostTSVariable.tab', [I], frames=frames)
+    d['genEfficiency'] = read_param(tab_file_path + "/" + 'Generator_Efficiency.tab', [G, I], default=1.0, frames=frames)
+    d['genRefInitCap'] = read_param(tab_file_path + "/" + 'Generator_RefInitialCap.tab', [GN], frames=frames)
+    d['genScaleInitCap'] = read_param(tab_file_path + "/" + 'Generator_ScaleFactorInitialCap.tab', [G, I], frames=frames)
+    d['genInitCap'] = read_param(tab_file_path + "/" + 'Generator_InitialCapacity.tab', [GN, I], frames=frames)
+    d['genMaxBuiltCap'] = read_param(tab_file_path + "/" + 'Generator_MaxBuiltCapacity.tab', [N, T, I], default=500000.0, frames=frames)
+    d['genMaxInstalledCapRaw'] = read_param(tab_file_path + "/" + 'Generator_MaxInstalledCapacity.tab', [N, T], frames=frames)
+    d['genCO2TypeFactor'] = read_param(tab_file_path + "/" + 'Generator_CO2Content.tab', [G], frames=frames)
+    d['genRampUpCap'] = read_param(tab_file_path + "/" + 'Generator_RampRate.tab', [G], frames=frames)
+    d['genCapAvailTypeRaw'] = read_param(tab_file_path + "/" + 'Generator_GeneratorTypeAvailability.tab', [G], default=1.0, frames=frames)
+    d['genLifetime'] = read_param(tab_file_path + "/" + 'Generator_Lifetime.tab', [G], frames=frames)
+
+    d['transmissionInitCap'] = read_param(tab_file_path + "/" + 'Transmission_InitialCapacity.tab', [A, I], frames=frames)
+    d['transmissionMaxBuiltCap'] = read_param(tab_file_path + "/" + 'Transmission_MaxBuiltCapacity.tab', [A, I], default=20000.0, frames=frames)
+    d['transmissionMaxInstalledCapRaw'] = read_param(tab_file_path + "/" + 'Transmission_MaxInstallCapacityRaw.tab', [A, I], frames=frames)
+    d['transmissionLength'] = read_param(tab_file_path + "/" + 'Transmission_Length.tab', [A], frames=frames)
+    d['transmissionTypeCapitalCost'] = read_param(tab_file_path + "/" + 'Transmission_TypeCapitalCost.tab', [d['TransmissionType'], I], frames=frames)
+    d['transmissionTypeFixedOMCost'] = read_param(tab_file_path + "/" + 'Transmission_TypeFixedOMCost.tab', [d['TransmissionType'], I], frames=frames)
+    d['lineEfficiency'] = read_param(tab_file_path + "/" + 'Transmission_lineEfficiency.tab', [L], default=0.97, frames=frames)
+    d['transmissionLifetime'] = read_param(tab_file_path + "/" + 'Transmission_Lifetime.tab', [A], default=40.0, frames=frames)
+
+    d['storageBleedEff'] = read_param(tab_file_path + "/" + 'Storage_StorageBleedEfficiency.tab', [B], default=1.0, frames=frames)
+    d['storageChargeEff'] = read_param(tab_file_path + "/" + 'Storage_StorageChargeEff.tab', [B], default=1.0, frames=frames)
+    d['storageDischargeEff'] = read_param(tab_file_path + "/" + 'Storage_StorageDischargeEff.tab', [B], default=1.0, frames=frames)
+    d['storagePowToEnergy'] = read_param(tab_file_path + "/" + 'Storage_StoragePowToEnergy.tab', [B], default=1.0, frames=frames)
+    d['storENCapitalCost'] = read_param(tab_file_path + "/" + 'Storage_EnergyCapitalCost.tab', [B, I], frames=frames)
+    d['storENFixedOMCost'] = read_param(tab_file_path + "/" + 'Storage_EnergyFixedOMCost.tab', [B, I], frames=frames)
+    d['storENInitCap'] = read_param(tab_file_path + "/" + 'Storage_EnergyInitialCapacity.tab', [BN, I], frames=frames)
+    d['storENMaxBuiltCap'] = read_param(tab_file_path + "/" + 'Storage_EnergyMaxBuiltCapacity.tab', [BN, I], default=500000.0, frames=frames)
+    d['storENMaxInstalledCapRaw'] = read_param(tab_file_path + "/" + 'Storage_EnergyMaxInstalledCapacity.tab', [BN], frames=frames)
+    d['storOperationalInit'] = read_param(tab_file_path + "/" + 'Storage_StorageInitialEnergyLevel.tab', [B], frames=frames)
+    d['storPWCapitalCost'] = read_param(tab_file_path + "/" + 'Storage_PowerCapitalCost.tab', [B, I], frames=frames)
+    d['storPWFixedOMCost'] = read_param(tab_file_path + "/" + 'Storage_PowerFixedOMCost.tab', [B, I], frames=frames)
+    d['storPWInitCap'] = read_param(tab_file_path + "/" + 'Storage_InitialPowerCapacity.tab', [BN, I], frames=frames)
+    d['storPWMaxBuiltCap'] = read_param(tab_file_path + "/" + 'Storage_PowerMaxBuiltCapacity.tab', [BN, I], default=500000.0, frames=frames)
+    d['storPWMaxInstalledCapRaw'] = read_param(tab_file_path + "/" + 'Storage_PowerMaxInstalledCapacity.tab', [BN], frames=frames)
+    d['storageLifetime'] = read_param(tab_file_path + "/" + 'Storage_Lifetime.tab', [B], frames=frames)
+    d['storageDiscToCharRatio'] = np.ones(len(B)) #NB! Hard-coded
+
+    d['nodeLostLoadCost'] = read_param(tab_file_path + "/" + 'Node_NodeLostLoadCost.tab', [N, I], default=22000.0, frames=frames)
+    d['sloadAnnualDemand'] = read_param(tab_file_path + "/" + 'Node_ElectricAnnualDemand.tab', [N, I], frames=frames)
+    d['maxHydroNode'] = read_param(tab_file_path + "/" + 'Node_HydroGenMaxAnnualProduction.tab', [N], frames=frames)
+
+    d['maxRegHydroGenRaw'] = read_param(scenariopath + "/" + 'Stochastic_HydroGenMaxSeasonalProduction.tab', [N, I, d['HoursOfSeason'], W], frames=frames)
+    d['genCapAvailStochRaw'] = read_param(scenariopath + "/" + 'Stochastic_StochasticAvailability.tab', [GN, H, W, I], frames=frames).transpose(0, 1, 3, 2)
+    d['sloadRaw'] = read_param(scenariopath + "/" + 'Stochastic_ElectricLoadRaw.tab', [N, H, W, I], frames=frames).transpose(0, 1, 3, 2)
+
+    d['seasScale'] = read_param(tab_file_path + "/" + 'General_seasonScale.tab', [d['Season']], default=1.0, frames=frames)
+
+    if EMISSION_CAP:
+        d['CO2cap'] = read_param(tab_file_path + "/" + 'General_CO2Cap.tab', [I], default=5000.0, frames=frames)
+        d['CO2price'] = np.zeros(len(I))
+    else:
+        d['CO2price'] = read_param(tab_file_path + "/" + 'General_CO2Price.tab', [I], frames=frames)
+
+    if LOADCHANGEMODULE:
+        d['sloadMod'] = read_param(scenariopath + "/" + 'LoadchangeModule/Stochastic_ElectricLoadMod.tab', [N, H, W, I], frames=frames).transpose(0, 1, 3, 2)
+        if HEATMODULE:
+            d['sloadModTR'] = read_param(scenariopath + "/" + 'LoadchangeModule/Stochastic_HeatLoadMod.tab', [N, H, W, I], frames=frames).transpose(0, 1, 3, 2)
+
+    if HEATMODULE:
+        R = d['Converter']
+        RN = d['ConverterOfNode']
+        Z = d['Neighbourhood']
+        ZN = d['NeighbourhoodOfNode']
+
+        d['ConverterCapitalCost'] = read_param(tab_file_path + "/" + 'HeatModule/HeatModuleConverter_CapitalCosts.tab', [R, I], frames=frames)
+        d['ConverterFixedOMCost'] = read_param(tab_file_path + "/" + 'HeatModule/HeatModuleConverter_FixedOMCosts.tab', [R, I], frames=frames)
+        d['ConverterLifetime'] = read_param(tab_file_path + "/" + 'HeatModule/HeatModuleConverter_Lifetime.tab', [R], frames=frames)
+        d['ConverterEff'] = read_param(tab_file_path + "/" + 'HeatModule/HeatModuleConverter_Efficiency.tab', [R], default=1.0, frames=frames)
+        d['ConverterMaxInstalledCapRaw'] = read_param(tab_file_path + "/" + 'HeatModule/HeatModuleConverter_MaxInstallCapacity.tab', [RN], default=200000.0, frames=frames)
+
+        d['neighCapitalCost'] = read_param(tab_file_path + "/" + 'HeatModule/HeatModuleNeighbourhood_CapitalCosts.tab', [Z, I], frames=frames)
+        d['neighFixedOMCost'] = read_param(tab_file_path + "/" + 'HeatModule/HeatModuleNeighbourhood_FixedOMCosts.tab', [Z, I], frames=frames)
+        d['neighLifetime'] = read_param(tab_file_path + "/" + 'HeatModule/HeatModuleNeighbourhood_Lifetime.tab', [Z], default=60.0, frames=frames)
+        d['neighMaxInstalledCapRaw'] = read_param(tab_file_path + "/" + 'HeatModule/HeatModuleNeighbourhood_MaxInstallCapacity.tab', [ZN], default=200000.0, frames=frames)
+
+        d['genCHPEfficiencyRaw'] = read_param(tab_file_path + "/" + 'HeatModule/HeatModuleGenerator_CHPEfficiency.tab', [d['GeneratorEL'], I], frames=frames)
+
+        d['sloadRawTR'] = read_param(scenariopath + "/" + 'HeatModule/HeatModuleStochastic_HeatLoadRaw.tab', [N, H, W, I], frames=frames).transpose(0, 1, 3, 2)
+        d['convAvail'] = read_param(scenariopath + "/" + 'HeatModule/HeatModuleStochastic_ConverterAvail.tab', [RN, H, W, I], default=1.0, frames=frames).transpose(0, 1, 3, 2)
+        d['neighGenElectricAvailStoch'] = read_param(tab_file_path + "/" + 'HeatModule/HeatModuleNeighbourhood_ElectricAvailability.tab', [ZN, H, W], frames=frames)
+        d['neighGenHeatAvailStoch'] = read_param(tab_file_path + "/" + 'HeatModule/HeatModuleNeighbourhood_HeatAvailability.tab', [ZN, H, W], frames=frames)
+        d['neighConvAvailStoch'] = read_param(tab_file_path + "/" + 'HeatModule/HeatModuleNeighbourhood_ConverterAvailability.tab', [ZN, H, W], frames=frames)
+        d['neighConverterEff'] = read_param(tab_file_path + "/" + 'HeatModule/HeatModuleNeighbourhood_ConverterEfficiency.tab', [ZN, H, W], default=1.0, frames=frames)
+        d['sloadAnnualDemandTR'] = read_param(tab_file_path + "/" + 'HeatModule/HeatModuleNode_HeatAnnualDemand.tab', [N, I], frames=frames)
+        d['ElectricHeatShare'] = read_param(tab_file_path + "/" + 'HeatModule/HeatModuleNode_ElectricHeatShare.tab', [N], frames=frames)
+
+        #Heat generators and storages take their input from the heat module
+
+        g = positions(G, d['GeneratorTR'])
+        gn = positions(GN, [(n,gg) for (n,gg) in GN if gg in d['GeneratorTR']])
+        for (param, filename, index, default) in [
+                ('genVariableOMCost', 'HeatModuleGenerator_VariableOMCosts.tab', [G], 0.0),
+                ('genRampUpCap', 'HeatModuleGenerator_RampRate.tab', [G], 0.0),
+                ('genCapAvailTypeRaw', 'HeatModuleGenerator_GeneratorTypeAvailability.tab', [G], 1.0),
+                ('genCO2TypeFactor', 'HeatModuleGenerator_CO2Content.tab', [G], 0.0),
+                ('genLifetime', 'HeatModuleGenerator_Lifetime.tab', [G], 0.0),
+                ('genCapitalCost', 'HeatModuleGenerator_CapitalCosts.tab', [G, I], 0.0),
+                ('genFixedOMCost', 'HeatModuleGenerator_FixedOMCosts.tab', [G, I], 0.0),
+                ('genFuelCost', 'HeatModuleGenerator_FuelCosts.tab', [G, I], 0.0),
+                ('genEfficiency', 'HeatModuleGenerator_Efficiency.tab', [G, I], 1.0),
+                ('genScaleInitCap', 'HeatModuleGenerator_ScaleFactorInitialCap.tab', [G, I], 0.0)]:
+            d[param][g] = read_param(tab_file_path + "/" + 'HeatModule/' + filename, index, default=default, frames=frames)[g]
+        d['genRefInitCap'][gn] = read_param(tab_file_path + "/" + 'HeatModule/HeatModuleGenerator_RefInitialCap.tab', [GN], frames=frames)[gn]
+
+        t = positions(T, d['TechnologyHeat'])
+        d['genMaxInstalledCapRaw'][:,t] = read_param(tab_file_path + "/" + 'HeatModule/HeatModuleGenerator_MaxInstalledCapacity.tab', [N, T], frames=frames)[:,t]
+        d['genMaxBuiltCap'][:,t] = read_param(tab_file_path + "/" + 'HeatModule/HeatModuleGenerator_MaxBuiltCapacity.tab', [N, T, I], default=500000.0, frames=frames)[:,t]
+
+        merge_storage_module(d, tab_file_path + "/" + 'HeatModule/HeatModuleStorage_', d['StorageTR'], d['DependentStorageTR'], 'StoragePowToEnergy.tab', 2000000.0, frames)
+
+    if DRMODULE:
+        merge_storage_module(d, tab_file_path + "/" + 'DRModule/DRModuleStorage_', d['StorageDR'], d['DependentStorageDR'], 'StoragePowToEnergy.tab', 0.0, frames)
+
+    d['genRampUpCap'] = d['genRampUpCap']*d['gen_thermal']
+
+    return d
+
+def merge_storage_module(d, prefix, storages, dependent, powtoenergyfile, maxinstalleddefault, frames):
+    #Storages of a module (heat, DR) take their input from the module files
+
+    B = d['Storage']
+    BN = d['StoragesOfNode']
+    I = d['PeriodActive']
+    b = positions(B, storages)
+    bn = positions(BN, [(n,bb) for (n,bb) in BN if bb in storages])
+    for (param, filename, index, default) in [
+            ('storOperationalInit', 'StorageInitialEnergyLevel.tab', [B], 0.0),
+            ('storageChargeEff', 'StorageChargeEff.tab', [B], 1.0),
+            ('storageDischargeEff', 'StorageDischargeEff.tab', [B], 1.0),
+            ('storageBleedEff', 'StorageBleedEfficiency.tab', [B], 1.0),
+            ('storageLifetime', 'Lifetime.tab', [B], 0.0),
+            ('storPWCapitalCost', 'PowerCapitalCost.tab', [B, I], 0.0),
+            ('storENCapitalCost', 'EnergyCapitalCost.tab', [B, I], 0.0),
+            ('storPWFixedOMCost', 'PowerFixedOMCost.tab', [B, I], 0.0),
+            ('storENFixedOMCost', 'EnergyFixedOMCost.tab', [B, I], 0.0)]:
+        d[param][b] = read_param(prefix + filename, index, default=default, frames=frames)[b]
+    bd = positions(B, [bb for bb in storages if bb in dependent])
+    d['storagePowToEnergy'][bd] = read_param(prefix + powtoenergyfile, [B], default=1.0, frames=frames)[bd]
+    for (param, filename, index, default) in [
+            ('storPWMaxInstalledCapRaw', 'PowerMaxInstalledCapacity.tab', [BN], maxinstalleddefault),
+            ('storENMaxInstalledCapRaw', 'EnergyMaxInstalledCapacity.tab', [BN], maxinstalleddefault),
+            ('storPWInitCap', 'InitialPowerCapacity.tab', [BN, I], 0.0),
+            ('storPWMaxBuiltCap', 'PowerMaxBuiltCapacity.tab', [BN, I], 500000.0),
+            ('storENInitCap', 'EnergyInitialCapacity.tab', [BN, I], 0.0),
+            ('storENMaxBuiltCap', 'EnergyMaxBuiltCapacity.tab', [BN, I], 500000.0)]:
+        d[param][bn] = read_param(prefix + filename, index, default=default, frames=frames)[bn]
+
+##############
+##PARAMETERS##
+##############
+
+def investment_cost(capitalcost, fixedomcost, lifetime, remaining, discountrate, WACC):
+    #Annual cost for the lifetime discounted for the investment period (or the remaining lifetime)
+    life = lifetime[:,None]
+    costperyear = (WACC/(1 - ((1 + WACC)**(-life))))*capitalcost + fixedomcost
+    return costperyear*1000*(1 - (1 + discountrate)**-(np.minimum(remaining[None,:], life)))/(1 - (1/(1 + discountrate)))
+
+def prepare_parameters(d, result_file_path, name, discountrate, WACC, LeapYearsInvestment,
+                       lengthRegSeason, HEATMODULE, LOADCHANGEMODULE):
+    #Build derived parameters on whole arrays
+
+    print("Constructing parameter values...")
+
+    I = np.array(d['PeriodActive'], dtype=float)
+    remaining = (len(I) - I + 1)*LeapYearsInvestment
+    d['sceProbab'] = np.full(len(d['Scenario']), 1/len(d['Scenario']))
+    d['operationalDiscountrate'] = sum((1 + discountrate)**(-j) for j in range(0, LeapYearsInvestment))
+    d['discount_multiplier'] = np.where(I > 1, (1.0 + discountrate)**(-LeapYearsInvestment*(I - 1)), 1.0)
+    d['hourScale'] = np.where(d['hour_season'] >= 0, d['seasScale'][d['hour_season']], 0.0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        #Generator. CCS generators have additional fixed costs depending on emissions
+        d['genInvCost'] = investment_cost(d['genCapitalCost'], d['genFixedOMCost'], d['genLifetime'], remaining, discountrate, WACC)
+        d['genInvCost'] += np.where(d['gen_ccs'][:,None], 1149873.72*0.9*d['genCO2TypeFactor'][:,None]*(3.6/d['genEfficiency']), 0) #NB! Hard-coded CCSCostTSFix and CCSRemFrac
+
+        #Storage
+        d['storPWInvCost'] = investment_cost(d['storPWCapitalCost'], d['storPWFixedOMCost'], d['storageLifetime'], remaining, discountrate, WACC)
+        d['storENInvCost'] = investment_cost(d['storENCapitalCost'], d['storENFixedOMCost'], d['storageLifetime'], remaining, discountrate, WACC)
+
+        #Transmission. Cost of the last line type of the arc
+        d['transmissionInvCost'] = np.full((len(d['BidirectionalArc']), len(I)), 3000000.0)
+        typepos = {t: k for k, t in enumerate(d['TransmissionType'])}
+        arcpos = {a: k for k, a in enumerate(d['BidirectionalArc'])}
+        life = d['transmissionLifetime'][:,None]
+        for t in d['TransmissionType']:
+            arcs = [arcpos[(n1,n2)] for (n1,n2,tt) in d['TransmissionTypeOfDirectionalLink'] if tt == t and (n1,n2) in arcpos]
+            if len(arcs) == 0:
+                continue
+            costperyear = (WACC/(1 - ((1 + WACC)**(1 - life[arcs]))))*d['transmissionLength'][arcs,None]*d['transmissionTypeCapitalCost'][typepos[t]] + d['transmissionTypeFixedOMCost'][typepos[t]]
+            d['transmissionInvCost'][arcs] = costperyear*(1 - (1 + discountrate)**-(np.minimum(remaining[None,:], life[arcs])))/(1 - (1/(1 + discountrate)))
+
+        #Short term marginal cost
+        heatrate = 3.6/d['genEfficiency']
+        co2 = d['genCO2TypeFactor'][:,None]
+        d['genMargCost'] = np.where(d['gen_ccs'][:,None],
+                                    heatrate*(d['genFuelCost'] + (1 - 0.9)*co2*d['CO2price'][None,:]) + heatrate*(0.9*co2*d['CCSCostTSVariable'][None,:]),
+                                    heatrate*(d['genFuelCost'] + co2*d['CO2price'][None,:])) + d['genVariableOMCost'][:,None]
+
+        if HEATMODULE:
+            d['ConverterInvCost'] = investment_cost(d['ConverterCapitalCost'], d['ConverterFixedOMCost'], d['ConverterLifetime'], remaining, discountrate, WACC)
+            d['neighInvCost'] = investment_cost(d['neighCapitalCost'], d['neighFixedOMCost'], d['neighLifetime'], remaining, discountrate, WACC)
+
+    #Initial capacities and installed limits. Avoid infeasibility if installed limit lower than initially installed cap
+    d['genInitCap'] = np.where(d['genInitCap'] == 0, d['genRefInitCap'][:,None]*(1 - d['genScaleInitCap'][d['gn_gen']]), d['genInitCap'])
+    d['transmissionMaxInstalledCap'] = np.where(d['transmissionMaxInstalledCapRaw'] <= d['transmissionInitCap'], d['transmissionInitCap'], d['transmissionMaxInstalledCapRaw'])
+    initcap = np.zeros((len(d['Node']), len(d['Technology']), len(I)))
+    techofgn = d['tech_gen'][:, d['gn_gen']]
+    for k in range(len(d['Node'])):
+        atnode = d['gn_node'] == k
+        initcap[k] = techofgn[:, atnode] @ d['genInitCap'][atnode]
+    d['genMaxInstalledCap'] = np.where(d['genMaxInstalledCapRaw'][:,:,None] <= initcap, initcap, d['genMaxInstalledCapRaw'][:,:,None])
+    d['storENMaxInstalledCap'] = np.repeat(d['storENMaxInstalledCapRaw'][:,None], len(I), axis=1)
+    d['storPWMaxInstalledCap'] = np.repeat(d['storPWMaxInstalledCapRaw'][:,None], len(I), axis=1)
+
+    if HEATMODULE:
+        d['ConverterMaxInstalledCap'] = np.repeat(d['ConverterMaxInstalledCapRaw'][:,None], len(I), axis=1)
+        d['neighMaxInstalledCap'] = np.repeat(d['neighMaxInstalledCapRaw'][:,None], len(I), axis=1)
+        chp = np.isin(d['GeneratorEL'], d['GeneratorTR'])[:,None]
+        d['genCHPEfficiency'] = np.where(chp, d['genCHPEfficiencyRaw'], 1.0)
+
+    #Hydro limits per season
+    seasons = np.array([d['Season'].index(s) for (s,h) in d['HoursOfSeason']], dtype=int)
+    raw = d['maxRegHydroGenRaw'] #node x period x hours of season x scenario
+    d['maxRegHydroGen'] = np.zeros((raw.shape[0], raw.shape[1], len(d['Season']), raw.shape[3]))
+    np.add.at(d['maxRegHydroGen'], (slice(None), slice(None), seasons, slice(None)), raw)
+
+    #Generator availability
+    typeraw = d['genCapAvailTypeRaw'][d['gn_gen']][:,None,None,None]
+    d['genCapAvail'] = np.where(typeraw == 0, d['genCapAvailStochRaw'], typeraw)
+
+    #Load profiles scaled to the annual demand over the regular seasons
+    regular = np.array(d['Operationalhour']) < d['FirstHoursOfRegSeason'][-1] + lengthRegSeason
+    weight = np.where(regular, d['hourScale'], 0.0)
+    noderawdemand = np.einsum('nhiw,h,w->ni', d['sloadRaw'], weight, d['sceProbab'])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        hourlyscale = np.where(d['sloadAnnualDemand'] < 1, 0, d['sloadAnnualDemand']/noderawdemand)
+    sload = d['sloadRaw']*hourlyscale[:,None,:,None]
+    if HEATMODULE:
+        sload = sload - d['ElectricHeatShare'][:,None,None,None]*d['sloadRawTR']
+    if LOADCHANGEMODULE:
+        sload = sload + d['sloadMod']
+    f = open(result_file_path + '/AdjustedNegativeLoad_' + name + '.txt', 'w')
+    write_adjusted_load(f, d, sload, 'Adjusted electricity load: ', ', 10 MW for hour ')
+    f.write('Hours with too small raw electricity load: ' + str(np.count_nonzero(sload < 0)))
+    f.close()
+    d['sload'] = np.where(sload < 0, 10.0, sload)
+
+    if HEATMODULE:
+        noderawdemand = np.einsum('nhiw,h,w->ni', d['sloadRawTR'], weight, d['sceProbab'])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            hourlyscale = np.where(noderawdemand != 0, d['sloadAnnualDemandTR']/noderawdemand, 0)
+        sload = d['sloadRawTR']*hourlyscale[:,None,:,None]
+        if LOADCHANGEMODULE:
+            sload = sload + d['sloadModTR']
+        f = open(result_file_path + '/AdjustedNegativeLoad_' + name + '.txt', 'a')
+        write_adjusted_load(f, d, sload, 'Adjusted heat load: ', ', 0 MW for hour ')
+        f.write('Hours with too small raw heat load: ' + str(np.count_nonzero(sload < 0)))
+        f.close()
+        d['sloadTR'] = np.where(sload < 0, 0.0, sload)
+
+    return d
+
+def write_adjusted_load(f, d, sload, text, adjustment):
+    #Log negative load entries ordered by node, period, hour and scenario
+    negative = np.argwhere(sload < 0)
+    negative = negative[np.lexsort((negative[:,3], negative[:,1], negative[:,2], negative[:,0]))]
+    for (n,h,i,w) in negative:
+        f.write(text + str(sload[n,h,i,w]) + adjustment + str(d['Operationalhour'][h]) + ' and scenario ' + str(d['Scenario'][w]) + ' in ' + str(d['Node'][n]) + "\n")
@@ -1,9 +1,103 @@
 import pandas as pd
+import hashlib
+import shutil
+import time
+import sys
 import os
+from empire_pool import process_pool, pool_map
 
-def read_file(filepath, excel, sheet, columns, tab_file_path):
-    input_sheet = pd.read_excel(filepath + "/" +excel, sheet, skiprows=2)
+#Format of the TabCache entries, part of their key. Raise it when the
+#conversion of a sheet or the layout of an entry changes.
+TAB_CACHE_VERSION = 1
 
+#Sheets converted to .tab files, per workbook: (sheet, columns) for sheets
+#with the column names in the third row and (sheet, None) for sheets of sets
+#with one set per column
+WORKBOOKS = [
+    ('Sets.xlsx', [('Nodes', None), ('Horizon', None), ('LineType', None), ('Technology', None), ('Storage', None),
+                   ('Generators', None), ('StorageOfNodes', [0, 1]), ('GeneratorsOfNode', [0, 1]),
+                   ('GeneratorsOfTechnology', [0, 1]), ('DirectionalLines', [0, 1]),
+                   ('LineTypeOfDirectionalLines', [0, 1, 2])]),
+    ('Generator.xlsx', [('FixedOMCosts', [0, 1, 2]), ('CapitalCosts', [0, 1, 2]), ('VariableOMCosts', [0, 1]),
+                        ('FuelCosts', [0, 1, 2]), ('CCSCostTSVariable', [0, 1]), ('Efficiency', [0, 1, 2]),
+                        ('RefInitialCap', [0, 1, 2]), ('ScaleFactorInitialCap', [0, 1, 2]),
+                        ('InitialCapacity', [0, 1, 2, 3]), ('MaxBuiltCapacity', [0, 1, 2, 3]),
+                        ('MaxInstalledCapacity', [0, 1, 2]), ('RampRate', [0, 1]),
+                        ('GeneratorTypeAvailability', [0, 1]), ('CO2Content', [0, 1]), ('Lifetime', [0, 1])]),
+    ('Transmission.xlsx', [('lineEfficiency', [0, 1, 2]), ('MaxInstallCapacityRaw', [0, 1, 2, 3]),
+                           ('MaxBuiltCapacity', [0, 1, 2, 3]), ('Length', [0, 1, 2]), ('TypeCapitalCost', [0, 1, 2]),
+                           ('TypeFixedOMCost', [0, 1, 2]), ('InitialCapacity', [0, 1, 2, 3]), ('Lifetime', [0, 1, 2])]),
+    ('Node.xlsx', [('ElectricAnnualDemand', [0, 1, 2]), ('NodeLostLoadCost', [0, 1, 2]),
+                   ('HydroGenMaxAnnualProduction', [0, 1])]),
+    ('General.xlsx', [('seasonScale', [0, 1]), ('CO2Cap', [0, 1]), ('CO2Price', [0, 1])]),
+    ('Storage.xlsx', [('StorageBleedEfficiency', [0, 1]), ('StorageChargeEff', [0, 1]),
+                      ('StorageDischargeEff', [0, 1]), ('StoragePowToEnergy', [0, 1]),
+                      ('StorageInitialEnergyLevel', [0, 1]), ('InitialPowerCapacity', [0, 1, 2, 3]),
+                      ('PowerCapitalCost', [0, 1, 2]), ('PowerFixedOMCost', [0, 1, 2]),
+                      ('PowerMaxBuiltCapacity', [0, 1, 2, 3]), ('EnergyCapitalCost', [0, 1, 2]),
+                      ('EnergyFixedOMCost', [0, 1, 2]), ('EnergyInitialCapacity', [0, 1, 2, 3]),
+                      ('EnergyMaxBuiltCapacity', [0, 1, 2, 3]), ('EnergyMaxInstalledCapacity', [0, 1, 2]),
+                      ('PowerMaxInstalledCapacity', [0, 1, 2]), ('Lifetime', [0, 1])])]
+
+DR_WORKBOOKS = [
+    ('DRModule/DRModuleSets.xlsx', [('StorageDemandResponse', None), ('StorageOfNodes', [0, 1]),
+                                    ('CostPiecesOfStorageDR', [0, 1])]),
+    ('DRModule/DRModuleStorage.xlsx', [('StorageBleedEfficiency', [0, 1]), ('StorageChargeEff', [0, 1]),
+                                       ('StorageDischargeEff', [0, 1]), ('StoragePowToEnergy', [0, 1]),
+                                       ('StorageInitialEnergyLevel', [0, 1]), ('InitialPowerCapacity', [0, 1, 2, 3]),
+                                       ('PowerCapitalCost', [0, 1, 2]), ('PowerFixedOMCost', [0, 1, 2]),
+                                       ('PowerMaxBuiltCapacity', [0, 1, 2, 3]), ('EnergyCapitalCost', [0, 1, 2]),
+                                       ('EnergyFixedOMCost', [0, 1, 2]), ('EnergyInitialCapacity', [0, 1, 2, 3]),
+                                       ('EnergyMaxBuiltCapacity', [0, 1, 2, 3]),
+                                       ('EnergyMaxInstalledCapacity', [0, 1, 2]),
+                                       ('PowerMaxInstalledCapacity', [0, 1, 2]), ('Lifetime', [0, 1]),
+                                       ('DRMarginalPieceCost', [0, 1, 2]), ('DRMarginalPieceActivation', [0, 1, 2])]),
+    ('DRModule/DRModuleStochastic.xlsx', [('DemandResponseDemand', [0, 1, 2, 3, 4, 5]),
+                                          ('DemandResponseMax', [0, 1, 2, 3, 4, 5]),
+                                          ('DischargeAvailability', [0, 1, 2, 3, 4, 5]),
+                                          ('ChargeAvailability', [0, 1, 2, 3, 4, 5]), ('Baseline', [0, 1, 2, 3, 4, 5])])]
+
+HEAT_WORKBOOKS = [
+    ('HeatModule/HeatModuleSets.xlsx', [('Storage', None), ('Generator', None), ('Technology', None),
+                                        ('Converter', None), ('Neighbourhood', None), ('StorageOfNodes', [0, 1]),
+                                        ('ConverterOfNodes', [0, 1]), ('NeighbourhoodOfNode', [0, 1]),
+                                        ('GeneratorsOfNode', [0, 1]), ('GeneratorsOfTechnology', [0, 1])]),
+    ('HeatModule/HeatModuleGenerator.xlsx', [('FixedOMCosts', [0, 1, 2]), ('CapitalCosts', [0, 1, 2]),
+                                             ('VariableOMCosts', [0, 1]), ('FuelCosts', [0, 1, 2]),
+                                             ('Efficiency', [0, 1, 2]), ('RefInitialCap', [0, 1, 2]),
+                                             ('ScaleFactorInitialCap', [0, 1, 2]), ('InitialCapacity', [0, 1, 2, 3]),
+                                             ('MaxBuiltCapacity', [0, 1, 2, 3]), ('MaxInstalledCapacity', [0, 1, 2]),
+                                             ('RampRate', [0, 1]), ('GeneratorTypeAvailability', [0, 1]),
+                                             ('CO2Content', [0, 1]), ('Lifetime', [0, 1]),
+                                             ('CHPEfficiency', [0, 1, 2])]),
+    ('HeatModule/HeatModuleStorage.xlsx', [('StorageBleedEfficiency', [0, 1]), ('StorageChargeEff', [0, 1]),
+                                           ('StorageDischargeEff', [0, 1]), ('StorageInitialEnergyLevel', [0, 1]),
+                                           ('InitialPowerCapacity', [0, 1, 2, 3]), ('PowerCapitalCost', [0, 1, 2]),
+                                           ('PowerFixedOMCost', [0, 1, 2]), ('PowerMaxBuiltCapacity', [0, 1, 2, 3]),
+                                           ('EnergyCapitalCost', [0, 1, 2]), ('EnergyFixedOMCost', [0, 1, 2]),
+                                           ('EnergyInitialCapacity', [0, 1, 2, 3]),
+                                           ('EnergyMaxBuiltCapacity', [0, 1, 2, 3]),
+                                           ('EnergyMaxInstalledCapacity', [0, 1, 2]),
+                                           ('PowerMaxInstalledCapacity', [0, 1, 2]), ('Lifetime', [0, 1]),
+                                           ('StoragePowToEnergy', [0, 1])]),
+    ('HeatModule/HeatModuleNode.xlsx', [('HeatAnnualDemand', [0, 1, 2]), ('NodeLostLoadCost', [0, 1, 2]),
+                                        ('ElectricHeatShare', [0, 1])]),
+    ('HeatModule/HeatModuleConverter.xlsx', [('FixedOMCosts', [0, 1, 2]), ('CapitalCosts', [0, 1, 2]),
+                                             ('InitialCapacity', [0, 1, 2, 3]), ('MaxBuildCapacity', [0, 1, 2, 3]),
+                                             ('MaxInstallCapacity', [0, 1, 2]), ('Efficiency', [0, 1]),
+                                             ('Lifetime', [0, 1])]),
+    ('HeatModule/HeatModuleNeighbourhood.xlsx', [('FixedOMCosts', [0, 1, 2]), ('CapitalCosts', [0, 1, 2]),
+                                                 ('InitialCapacity', [0, 1, 2, 3]),
+                                                 ('MaxBuildCapacity', [0, 1, 2, 3]),
+                                                 ('MaxInstallCapacity', [0, 1, 2]), ('Lifetime', [0, 1]),
+                                                 ('ElectricAvailability', [0, 1, 2, 3, 4]),
+                                                 ('HeatAvailability', [0, 1, 2, 3, 4]),
+                                                 ('ConverterAvailability', [0, 1, 2, 3, 4]),
+                                                 ('ConverterEfficiency', [0, 1, 2, 3, 4]), ('CO2Replacement', [0, 1])])]
+
+EXCEL_ENGINES = ['openpyxl', 'calamine']
+
+def file_frame(input_sheet, columns):
     data_table = input_sheet.iloc[:, columns]
     data_table.columns = pd.Series(data_table.columns).str.replace(' ', '_')
     data_nonempty = data_table.dropna()
@@ -12,219 +106,165 @@ def read_file(filepath, excel, sheet, columns, tab_file_path):
 
     save_csv_frame.replace('\s', '', regex=True, inplace=True)
 
-    if not os.path.exists(tab_file_path):
-        os.makedirs(tab_file_path)
-    #excel = excel.replace(".xlsx", "_")
-    #excel = excel.replace("Excel/", "")
-    save_csv_frame.to_csv(tab_file_path + "/" + excel.replace(".xlsx", '_') + sheet + '.tab', header=True, index=None, sep='\t', mode='w')
-    #save_csv_frame.to_csv(excel.replace(".xlsx", '_') + sheet + '.tab', header=True, index=None, sep='\t', mode='w')
-
-def read_sets(filepath, excel, sheet, tab_file_path):
-    input_sheet = pd.read_excel(filepath + "/" + excel, sheet)
+    #Types as read back from the .tab file
+    return save_csv_frame.reset_index(drop=True).infer_objects()
 
+def set_frames(input_sheet, excel):
+    frames = {}
     for ind, column in enumerate(input_sheet.columns):
         data_table = input_sheet.iloc[:, ind]
         data_nonempty = data_table.dropna()
-        data_nonempty.replace(" ", "")
         save_csv_frame = pd.DataFrame(data_nonempty)
         save_csv_frame.replace('\s', '', regex=True, inplace=True)
-        if not os.path.exists(tab_file_path):
-            os.makedirs(tab_file_path)
-        #excel = excel.replace(".xlsx", "_")
-        #excel = excel.replace("Excel/", "")
-        save_csv_frame.to_csv(tab_file_path + "/" + excel.replace(".xlsx", '_') + column + '.tab', header=True, index=None, sep='\t', mode='w')
-        #save_csv_frame.to_csv(excel.replace(".xlsx", '_') + column + '.tab', header=True, index=None, sep='\t', mode='w')
-
-def generate_tab_files(filepath, tab_file_path, HEATMODULE, DRMODULE):
+        frames[excel.replace(".xlsx", '_') + column + '.tab'] = save_csv_frame.reset_index(drop=True).infer_objects()
+    return frames
+
+def write_tab(save_csv_frame, tab_file_path, name):
+    if not os.path.exists(os.path.dirname(tab_file_path + "/" + name)):
+        os.makedirs(os.path.dirname(tab_file_path + "/" + name))
+    save_csv_frame.to_csv(tab_file_path + "/" + name, header=True, index=None, sep='\t', mode='w')
+
+def read_file(filepath, excel, sheet, columns, tab_file_path, EXCEL_ENGINE="openpyxl"):
+    input_sheet = pd.read_excel(filepath + "/" + excel, sheet, skiprows=2, engine=EXCEL_ENGINE)
+    write_tab(file_frame(input_sheet, columns), tab_file_path, excel.replace(".xlsx", '_') + sheet + '.tab')
+
+def read_sets(filepath, excel, sheet, tab_file_path, EXCEL_ENGINE="openpyxl"):
+    input_sheet = pd.read_excel(filepath + "/" + excel, sheet, engine=EXCEL_ENGINE)
+    for (name, save_csv_frame) in set_frames(input_sheet, excel).items():
+        write_tab(save_csv_frame, tab_file_path, name)
+
+_filepath = None
+_engine = None
+
+def init_reader(filepath, EXCEL_ENGINE):
+    global _filepath, _engine
+    _filepath = filepath
+    _engine = EXCEL_ENGINE
+
+def read_workbook(excel, sheets, tab_file_path):
+    #Open the workbook once and return the frames of all its sheets by .tab
+    #file name, writing the .tab files to tab_file_path unless it is None
+    start = time.time()
+    frames = {}
+    with pd.ExcelFile(_filepath + "/" + excel, engine=_engine) as workbook:
+        for (sheet, columns) in sheets:
+            if columns is None:
+                frames.update(set_frames(workbook.parse(sheet), excel))
+            else:
+                frames[excel.replace(".xlsx", '_') + sheet + '.tab'] = file_frame(workbook.parse(sheet, skiprows=2), columns)
+    if tab_file_path is not None:
+        for (name, save_csv_frame) in frames.items():
+            write_tab(save_csv_frame, tab_file_path, name)
+    return excel, time.time() - start, frames
+
+def workbook_key(filepath, excel, sheets):
+    #Hash of the workbook, of the sheets and columns read from it and of the
+    #cache format
+    h = hashlib.sha256((str(TAB_CACHE_VERSION) + excel + repr(sheets)).encode())
+    with open(filepath + "/" + excel, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return excel.replace('/', '_').replace('.xlsx', '_') + h.hexdigest()[:32]
+
+def cached_frames(entry):
+    #Frames of a cache entry, from its .tab files
+    frames = {}
+    for (folder, subfolders, files) in os.walk(entry):
+        for f in files:
+            if f.endswith('.tab'):
+                name = os.path.relpath(folder + "/" + f, entry).replace(os.sep, '/')
+                frames[name] = pd.read_csv(folder + "/" + f, sep='\t', float_precision='round_trip')
+    return frames
+
+def copy_tab_files(source, tab_file_path):
+    for (folder, subfolders, files) in os.walk(source):
+        target = tab_file_path + "/" + os.path.relpath(folder, source)
+        if not os.path.exists(target):
+            os.makedirs(target)
+        for f in files:
+            if f.endswith('.tab'):
+                shutil.copyfile(folder + "/" + f, target + "/" + f)
+
+def generate_tab_files(filepath, tab_file_path, HEATMODULE, DRMODULE, NO_OF_WORKERS, EXCEL_ENGINE, USE_TAB_CACHE,
+                       WRITE_TAB_FILES, cache_path="Cache"):
     # Function description: read column value from excel sheet and save as .tab file "sheet.tab"
     # Input: excel name, sheet name, the number of columns to be read
     # Output:  .tab file
+    #Returns the tables as frames by .tab file name (relative to
+    #tab_file_path) for run_empire, the .tab files are only written with
+    #WRITE_TAB_FILES
     
     print("Generating .tab-files...")
 
-    # Reading Excel workbooks using our function read_file
+    if EXCEL_ENGINE == "calamine":
+        try:
+            import python_calamine
+        except ImportError:
+            sys.exit("ERROR! The calamine Excel engine needs the python-calamine package")
+    elif EXCEL_ENGINE != "openpyxl":
+        sys.exit("ERROR! Invalid Excel engine! Options: " + ", ".join(EXCEL_ENGINES))
+
+    if not WRITE_TAB_FILES:
+        print("Keeping .tab-files in memory...")
 
     if not os.path.exists(tab_file_path):
         os.makedirs(tab_file_path)
 
-    read_sets(filepath, 'Sets.xlsx', 'Nodes', tab_file_path = tab_file_path)
-    read_sets(filepath, 'Sets.xlsx', 'Horizon', tab_file_path = tab_file_path)
-    read_sets(filepath, 'Sets.xlsx', 'LineType', tab_file_path = tab_file_path)
-    read_sets(filepath, 'Sets.xlsx', 'Technology', tab_file_path = tab_file_path)
-    read_sets(filepath, 'Sets.xlsx', 'Storage', tab_file_path = tab_file_path)
-    read_sets(filepath, 'Sets.xlsx', 'Generators', tab_file_path = tab_file_path)
-    read_file(filepath, 'Sets.xlsx', 'StorageOfNodes', [0, 1], tab_file_path = tab_file_path)
-    read_file(filepath, 'Sets.xlsx', 'GeneratorsOfNode', [0, 1], tab_file_path = tab_file_path)
-    read_file(filepath, 'Sets.xlsx', 'GeneratorsOfTechnology', [0, 1], tab_file_path = tab_file_path)
-    read_file(filepath, 'Sets.xlsx', 'DirectionalLines', [0, 1], tab_file_path = tab_file_path)
-    read_file(filepath, 'Sets.xlsx', 'LineTypeOfDirectionalLines', [0, 1, 2], tab_file_path = tab_file_path)
-
-    # Reading GeneratorPeriod
-    read_file(filepath, 'Generator.xlsx', 'FixedOMCosts', [0, 1, 2], tab_file_path = tab_file_path)
-    read_file(filepath, 'Generator.xlsx', 'CapitalCosts', [0, 1, 2], tab_file_path = tab_file_path)
-    read_file(filepath, 'Generator.xlsx', 'VariableOMCosts', [0, 1], tab_file_path = tab_file_path)
-    read_file(filepath, 'Generator.xlsx', 'FuelCosts', [0, 1, 2], tab_file_path = tab_file_path)
-    read_file(filepath, 'Generator.xlsx', 'CCSCostTSVariable', [0, 1], tab_file_path = tab_file_path)
-    read_file(filepath, 'Generator.xlsx', 'Efficiency', [0, 1, 2], tab_file_path = tab_file_path)
-    read_file(filepath, 'Generator.xlsx', 'RefInitialCap', [0, 1, 2], tab_file_path = tab_file_path)
-    read_file(filepath, 'Generator.xlsx', 'ScaleFactorInitialCap', [0, 1, 2], tab_file_path = tab_file_path)
-    read_file(filepath, 'Generator.xlsx', 'InitialCapacity', [0, 1, 2, 3], tab_file_path = tab_file_path)
-    read_file(filepath, 'Generator.xlsx', 'MaxBuiltCapacity', [0, 1, 2, 3], tab_file_path = tab_file_path)
-    read_file(filepath, 'Generator.xlsx', 'MaxInstalledCapacity', [0, 1, 2], tab_file_path = tab_file_path)
-    read_file(filepath, 'Generator.xlsx', 'RampRate', [0, 1], tab_file_path = tab_file_path)
-    read_file(filepath, 'Generator.xlsx', 'GeneratorTypeAvailability', [0, 1], tab_file_path = tab_file_path)
-    read_file(filepath, 'Generator.xlsx', 'CO2Content', [0, 1], tab_file_path = tab_file_path)
-    read_file(filepath, 'Generator.xlsx', 'Lifetime', [0, 1], tab_file_path = tab_file_path)
-
-    #Reading InterConnector
-    read_file(filepath, 'Transmission.xlsx', 'lineEfficiency', [0, 1, 2], tab_file_path = tab_file_path)
-    read_file(filepath, 'Transmission.xlsx', 'MaxInstallCapacityRaw', [0, 1, 2, 3], tab_file_path = tab_file_path)
-    read_file(filepath, 'Transmission.xlsx', 'MaxBuiltCapacity', [0, 1, 2, 3], tab_file_path = tab_file_path)
-    read_file(filepath, 'Transmission.xlsx', 'Length', [0, 1, 2], tab_file_path = tab_file_path)
-    read_file(filepath, 'Transmission.xlsx', 'TypeCapitalCost', [0, 1, 2], tab_file_path = tab_file_path)
-    read_file(filepath, 'Transmission.xlsx', 'TypeFixedOMCost', [0, 1, 2], tab_file_path = tab_file_path)
-    read_file(filepath, 'Transmission.xlsx', 'InitialCapacity', [0, 1, 2, 3], tab_file_path = tab_file_path)
-    read_file(filepath, 'Transmission.xlsx', 'Lifetime', [0, 1, 2], tab_file_path = tab_file_path)
-
-    #Reading Node
-    read_file(filepath, 'Node.xlsx', 'ElectricAnnualDemand', [0, 1, 2], tab_file_path = tab_file_path)
-    read_file(filepath, 'Node.xlsx', 'NodeLostLoadCost', [0, 1, 2], tab_file_path = tab_file_path)
-    read_file(filepath, 'Node.xlsx', 'HydroGenMaxAnnualProduction', [0, 1], tab_file_path = tab_file_path)
-
-    #Reading Season
-    read_file(filepath, 'General.xlsx', 'seasonScale', [0, 1], tab_file_path = tab_file_path)
-    read_file(filepath, 'General.xlsx', 'CO2Cap', [0, 1], tab_file_path = tab_file_path)
-    read_file(filepath, 'General.xlsx', 'CO2Price', [0, 1], tab_file_path = tab_file_path)
-    
-    #Reading Storage
-    read_file(filepath, 'Storage.xlsx', 'StorageBleedEfficiency', [0, 1], tab_file_path = tab_file_path)
-    read_file(filepath, 'Storage.xlsx', 'StorageChargeEff', [0, 1], tab_file_path = tab_file_path)
-    read_file(filepath, 'Storage.xlsx', 'StorageDischargeEff', [0, 1], tab_file_path = tab_file_path)
-    read_file(filepath, 'Storage.xlsx', 'StoragePowToEnergy', [0, 1], tab_file_path = tab_file_path)
-    read_file(filepath, 'Storage.xlsx', 'StorageInitialEnergyLevel', [0, 1], tab_file_path = tab_file_path)
-    read_file(filepath, 'Storage.xlsx', 'InitialPowerCapacity', [0, 1, 2, 3], tab_file_path = tab_file_path)
-    read_file(filepath, 'Storage.xlsx', 'PowerCapitalCost', [0, 1, 2], tab_file_path = tab_file_path)
-    read_file(filepath, 'Storage.xlsx', 'PowerFixedOMCost', [0, 1, 2], tab_file_path = tab_file_path)
-    read_file(filepath, 'Storage.xlsx', 'PowerMaxBuiltCapacity', [0, 1, 2, 3], tab_file_path = tab_file_path)
-    read_file(filepath, 'Storage.xlsx', 'EnergyCapitalCost', [0, 1, 2], tab_file_path = tab_file_path)
-    read_file(filepath, 'Storage.xlsx', 'EnergyFixedOMCost', [0, 1, 2], tab_file_path = tab_file_path)
-    read_file(filepath, 'Storage.xlsx', 'EnergyInitialCapacity', [0, 1, 2, 3], tab_file_path = tab_file_path)
-    read_file(filepath, 'Storage.xlsx', 'EnergyMaxBuiltCapacity', [0, 1, 2, 3], tab_file_path = tab_file_path)
-    read_file(filepath, 'Storage.xlsx', 'EnergyMaxInstalledCapacity', [0, 1, 2], tab_file_path = tab_file_path)
-    read_file(filepath, 'Storage.xlsx', 'PowerMaxInstalledCapacity', [0, 1, 2], tab_file_path = tab_file_path)
-    read_file(filepath, 'Storage.xlsx', 'Lifetime', [0, 1], tab_file_path = tab_file_path)
-
+    workbooks = list(WORKBOOKS)
     if DRMODULE:
-        if not os.path.exists(tab_file_path + '/DRModule'):
+        if WRITE_TAB_FILES and not os.path.exists(tab_file_path + '/DRModule'):
             os.makedirs(tab_file_path + '/DRModule')
-
-        # reading DR sets
-        read_sets(filepath, 'DRModule/DRModuleSets.xlsx', 'StorageDemandResponse', tab_file_path = tab_file_path)
-        read_file(filepath, 'DRModule/DRModuleSets.xlsx', 'StorageOfNodes', [0, 1], tab_file_path = tab_file_path)
-        read_file(filepath, 'DRModule/DRModuleSets.xlsx', 'CostPiecesOfStorageDR', [0, 1], tab_file_path = tab_file_path)
-
-        # reading DR storage specifications
-        read_file(filepath, 'DRModule/DRModuleStorage.xlsx', 'StorageBleedEfficiency', [0, 1], tab_file_path = tab_file_path)
-        read_file(filepath, 'DRModule/DRModuleStorage.xlsx', 'StorageChargeEff', [0, 1], tab_file_path = tab_file_path)
-        read_file(filepath, 'DRModule/DRModuleStorage.xlsx', 'StorageDischargeEff', [0, 1], tab_file_path = tab_file_path)
-        read_file(filepath, 'DRModule/DRModuleStorage.xlsx', 'StoragePowToEnergy', [0, 1], tab_file_path = tab_file_path)
-        read_file(filepath, 'DRModule/DRModuleStorage.xlsx', 'StorageInitialEnergyLevel', [0, 1], tab_file_path = tab_file_path)
-        read_file(filepath, 'DRModule/DRModuleStorage.xlsx', 'InitialPowerCapacity', [0, 1, 2, 3], tab_file_path = tab_file_path)
-        read_file(filepath, 'DRModule/DRModuleStorage.xlsx', 'PowerCapitalCost', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'DRModule/DRModuleStorage.xlsx', 'PowerFixedOMCost', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'DRModule/DRModuleStorage.xlsx', 'PowerMaxBuiltCapacity', [0, 1, 2, 3], tab_file_path = tab_file_path)
-        read_file(filepath, 'DRModule/DRModuleStorage.xlsx', 'EnergyCapitalCost', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'DRModule/DRModuleStorage.xlsx', 'EnergyFixedOMCost', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'DRModule/DRModuleStorage.xlsx', 'EnergyInitialCapacity', [0, 1, 2, 3], tab_file_path = tab_file_path)
-        read_file(filepath, 'DRModule/DRModuleStorage.xlsx', 'EnergyMaxBuiltCapacity', [0, 1, 2, 3], tab_file_path = tab_file_path)
-        read_file(filepath, 'DRModule/DRModuleStorage.xlsx', 'EnergyMaxInstalledCapacity', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'DRModule/DRModuleStorage.xlsx', 'PowerMaxInstalledCapacity', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'DRModule/DRModuleStorage.xlsx', 'Lifetime', [0, 1], tab_file_path = tab_file_path)
-        read_file(filepath, 'DRModule/DRModuleStorage.xlsx', 'DRMarginalPieceCost', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'DRModule/DRModuleStorage.xlsx', 'DRMarginalPieceActivation', [0, 1, 2], tab_file_path = tab_file_path)
-
-        # reading stochastic demand for DR
-        read_file(filepath, 'DRModule/DRModuleStochastic.xlsx', 'DemandResponseDemand', [0, 1, 2, 3, 4, 5], tab_file_path = tab_file_path)
-        read_file(filepath, 'DRModule/DRModuleStochastic.xlsx', 'DemandResponseMax', [0, 1, 2, 3, 4, 5], tab_file_path = tab_file_path)
-        read_file(filepath, 'DRModule/DRModuleStochastic.xlsx', 'DischargeAvailability', [0, 1, 2, 3, 4, 5], tab_file_path = tab_file_path)
-        read_file(filepath, 'DRModule/DRModuleStochastic.xlsx', 'ChargeAvailability', [0, 1, 2, 3, 4, 5], tab_file_path = tab_file_path)
-        read_file(filepath, 'DRModule/DRModuleStochastic.xlsx', 'Baseline', [0, 1, 2, 3, 4, 5], tab_file_path = tab_file_path)
-
+        workbooks += DR_WORKBOOKS
     if HEATMODULE:
-        if not os.path.exists(tab_file_path + '/HeatModule'):
+        if WRITE_TAB_FILES and not os.path.exists(tab_file_path + '/HeatModule'):
             os.makedirs(tab_file_path + '/HeatModule')
+        workbooks += HEAT_WORKBOOKS
+
+    #With the cache the .tab files of every workbook are kept in
+    #cache_path/TabCache under the hash of the workbook, shared by all runs on
+    #the dataset. Only workbooks without an entry are converted, into a
+    #temporary folder that becomes the entry when it is complete.
+    if USE_TAB_CACHE:
+        cache = cache_path + "/" + 'TabCache'
+        entries = [cache + "/" + workbook_key(filepath, excel, sheets) for (excel, sheets) in workbooks]
+        todo = [(w, e + '.tmp' + str(os.getpid())) for (w, e) in zip(workbooks, entries) if not os.path.isdir(e)]
+        print("Reusing .tab-files of " + str(len(workbooks) - len(todo)) + " of " + str(len(workbooks)) + " workbooks from " + cache + "...")
+    else:
+        todo = [(w, tab_file_path if WRITE_TAB_FILES else None) for w in workbooks]
+
+    #One task per workbook, the largest first. The workbooks are read on a
+    #pool of at most NO_OF_WORKERS processes, or one by one without a pool.
+    start = time.time()
+    todo.sort(key=lambda t: -os.path.getsize(filepath + "/" + t[0][0]))
+    out = []
+    if len(todo) > 0:
+        pool = process_pool(min(NO_OF_WORKERS, len(todo)), init_reader, (filepath, EXCEL_ENGINE))
+        out = pool_map(pool, read_workbook, [t[0][0] for t in todo], [t[0][1] for t in todo], [t[1] for t in todo])
+        if pool is not None:
+            pool.shutdown()
+
+    tab_frames = {}
+    for (excel, seconds, frames) in out:
+        tab_frames.update(frames)
+    if USE_TAB_CACHE:
+        for ((w, temp), (excel, seconds, frames)) in zip(todo, out):
+            if not os.path.exists(temp):
+                os.makedirs(temp)
+            entry = temp[:temp.rindex('.tmp')]
+            try:
+                os.rename(temp, entry)
+            except OSError:
+                #Another run wrote the entry first
+                shutil.rmtree(temp)
+        converted = set(t[0][0] for t in todo)
+        for ((excel, sheets), entry) in zip(workbooks, entries):
+            if excel not in converted:
+                tab_frames.update(cached_frames(entry))
+            if WRITE_TAB_FILES:
+                copy_tab_files(entry, tab_file_path)
 
-        # Reading Excel heat sets
-        read_sets(filepath, 'HeatModule/HeatModuleSets.xlsx', 'Storage', tab_file_path = tab_file_path)
-        read_sets(filepath, 'HeatModule/HeatModuleSets.xlsx', 'Generator', tab_file_path = tab_file_path)
-        read_sets(filepath, 'HeatModule/HeatModuleSets.xlsx', 'Technology', tab_file_path = tab_file_path)
-        read_sets(filepath, 'HeatModule/HeatModuleSets.xlsx', 'Converter', tab_file_path = tab_file_path)
-        read_sets(filepath, 'HeatModule/HeatModuleSets.xlsx', 'Neighbourhood', tab_file_path = tab_file_path)
-        
-        read_file(filepath, 'HeatModule/HeatModuleSets.xlsx', 'StorageOfNodes', [0, 1], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleSets.xlsx', 'ConverterOfNodes', [0, 1], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleSets.xlsx', 'NeighbourhoodOfNode', [0, 1], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleSets.xlsx', 'GeneratorsOfNode', [0, 1], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleSets.xlsx', 'GeneratorsOfTechnology', [0, 1], tab_file_path = tab_file_path) 
-
-        # Reading heat Generator
-        read_file(filepath, 'HeatModule/HeatModuleGenerator.xlsx', 'FixedOMCosts', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleGenerator.xlsx', 'CapitalCosts', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleGenerator.xlsx', 'VariableOMCosts', [0, 1], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleGenerator.xlsx', 'FuelCosts', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleGenerator.xlsx', 'Efficiency', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleGenerator.xlsx', 'RefInitialCap', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleGenerator.xlsx', 'ScaleFactorInitialCap', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleGenerator.xlsx', 'InitialCapacity', [0, 1, 2, 3], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleGenerator.xlsx', 'MaxBuiltCapacity', [0, 1, 2, 3], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleGenerator.xlsx', 'MaxInstalledCapacity', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleGenerator.xlsx', 'RampRate', [0, 1], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleGenerator.xlsx', 'GeneratorTypeAvailability', [0, 1], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleGenerator.xlsx', 'CO2Content', [0, 1], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleGenerator.xlsx', 'Lifetime', [0, 1], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleGenerator.xlsx', 'CHPEfficiency', [0, 1, 2], tab_file_path = tab_file_path)
-
-        #Reading heat Storage
-        read_file(filepath, 'HeatModule/HeatModuleStorage.xlsx', 'StorageBleedEfficiency', [0, 1], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleStorage.xlsx', 'StorageChargeEff', [0, 1], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleStorage.xlsx', 'StorageDischargeEff', [0, 1], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleStorage.xlsx', 'StorageInitialEnergyLevel', [0, 1], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleStorage.xlsx', 'InitialPowerCapacity', [0, 1, 2, 3], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleStorage.xlsx', 'PowerCapitalCost', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleStorage.xlsx', 'PowerFixedOMCost', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleStorage.xlsx', 'PowerMaxBuiltCapacity', [0, 1, 2, 3], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleStorage.xlsx', 'EnergyCapitalCost', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleStorage.xlsx', 'EnergyFixedOMCost', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleStorage.xlsx', 'EnergyInitialCapacity', [0, 1, 2, 3], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleStorage.xlsx', 'EnergyMaxBuiltCapacity', [0, 1, 2, 3], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleStorage.xlsx', 'EnergyMaxInstalledCapacity', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleStorage.xlsx', 'PowerMaxInstalledCapacity', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleStorage.xlsx', 'Lifetime', [0, 1], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleStorage.xlsx', 'StoragePowToEnergy', [0, 1], tab_file_path = tab_file_path)
-
-        #reading head adjustments at nodes
-        read_file(filepath, 'HeatModule/HeatModuleNode.xlsx', 'HeatAnnualDemand', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleNode.xlsx', 'NodeLostLoadCost', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleNode.xlsx', 'ElectricHeatShare', [0, 1], tab_file_path = tab_file_path)
-
-        # Reading ElecToHeat
-        read_file(filepath, 'HeatModule/HeatModuleConverter.xlsx', 'FixedOMCosts', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleConverter.xlsx', 'CapitalCosts', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleConverter.xlsx', 'InitialCapacity', [0, 1, 2, 3], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleConverter.xlsx', 'MaxBuildCapacity', [0, 1, 2, 3], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleConverter.xlsx', 'MaxInstallCapacity', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleConverter.xlsx', 'Efficiency', [0, 1], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleConverter.xlsx', 'Lifetime', [0, 1], tab_file_path = tab_file_path)
-
-        # Reading Neighbourhood
-        read_file(filepath, 'HeatModule/HeatModuleNeighbourhood.xlsx', 'FixedOMCosts', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleNeighbourhood.xlsx', 'CapitalCosts', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleNeighbourhood.xlsx', 'InitialCapacity', [0, 1, 2, 3], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleNeighbourhood.xlsx', 'MaxBuildCapacity', [0, 1, 2, 3], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleNeighbourhood.xlsx', 'MaxInstallCapacity', [0, 1, 2], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleNeighbourhood.xlsx', 'Lifetime', [0, 1], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleNeighbourhood.xlsx', 'ElectricAvailability', [0, 1, 2, 3, 4], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleNeighbourhood.xlsx', 'HeatAvailability', [0, 1, 2, 3, 4], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleNeighbourhood.xlsx', 'ConverterAvailability', [0, 1, 2, 3, 4], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleNeighbourhood.xlsx', 'ConverterEfficiency', [0, 1, 2, 3, 4], tab_file_path = tab_file_path)
-        read_file(filepath, 'HeatModule/HeatModuleNeighbourhood.xlsx', 'CO2Replacement', [0, 1], tab_file_path = tab_file_path)
+    print("Generating .tab-files took [sec]:")
+    print(time.time() - start)
+    for (excel, seconds, frames) in out:
+        print("  " + excel + ": " + str(round(seconds, 3)))
+    return tab_frames
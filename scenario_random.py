@@ -1,9 +1,17 @@
 import pandas as pd
 import numpy as np
 import os
+import json
+import shutil
+import hashlib
 import matplotlib.pyplot as plt
 from sklearn.cluster import KMeans
-from scipy.stats import wasserstein_distance, skew, kurtosis
+from scipy.stats import skew, kurtosis
+from empire_pool import process_pool, pool_map
+
+#Format of the SeriesCache entries, part of their key. Raise it when
+#make_datetime or the layout of an entry changes.
+SERIES_CACHE_VERSION = 1
 
 def season_month(season):
     if season=="winter":
@@ -20,6 +28,62 @@ def year_month_filter(data, sample_year, sample_month):
     data = data.loc[data.month.isin([sample_month]), :]
     return data
 
+def row_ranges(keys):
+    #Row range (start, stop) of every key (a tuple of the key columns) that
+    #is one block of rows
+    n = len(keys[0])
+    if n == 0:
+        return {}
+    change = np.zeros(n, dtype=bool)
+    change[0] = True
+    for k in keys:
+        change[1:] |= k[1:] != k[:-1]
+    starts = np.flatnonzero(change)
+    stops = np.append(starts[1:], n)
+    ranges = {}
+    split = set()
+    for (a, b) in zip(starts, stops):
+        key = tuple(int(k[a]) for k in keys)
+        if key in ranges:
+            split.add(key)
+        ranges[key] = (a, b)
+    for key in split:
+        del ranges[key]
+    return ranges
+
+def calendar_index(sources):
+    #Row ranges of every (year, month) and (year,) of the sources, built
+    #once for every set of calendar columns and shared by the sources on the
+    #same hours. Months and years that are not one block of rows are left
+    #out and filtered instead.
+    index = {}
+    built = []
+    for (name, data) in sources.items():
+        year = data['year'].to_numpy()
+        month = data['month'].to_numpy()
+        for (y, m, ranges) in built:
+            if np.array_equal(y, year) and np.array_equal(m, month):
+                break
+        else:
+            ranges = row_ranges([year, month])
+            ranges.update(row_ranges([year]))
+            built.append((year, month, ranges))
+        index[name] = ranges
+    return index
+
+def year_month_window(data, ranges, sample_year, sample_month):
+    #year_month_filter as one slice of the rows of the month
+    if (sample_year, sample_month) in ranges:
+        (a, b) = ranges[(sample_year, sample_month)]
+        return data.iloc[a:b]
+    return year_month_filter(data, sample_year, sample_month)
+
+def year_window(data, ranges, sample_year):
+    if (sample_year,) in ranges:
+        (a, b) = ranges[(sample_year,)]
+        return data.iloc[a:b]
+    return data.loc[data.year.isin([sample_year]), :]
+
 def remove_time_index(data):
     data = data.reset_index(drop=True)
     data = data.drop(['time', 'year', 'month', 'dayofweek', 'hour'], axis=1)
@@ -36,6 +100,64 @@ def make_datetime(data, time_format):
     data['dayofweek'] = data['time'].dt.dayofweek
     return data
 
+def series_key(filepath, name, time_format):
+    #Hash of the time series file, of the time format it is parsed with and
+    #of the cache format
+    h = hashlib.sha256((str(SERIES_CACHE_VERSION) + name + time_format).encode())
+    with open(filepath + "/" + name, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return name.replace('/', '_').replace('.csv', '_') + h.hexdigest()[:32]
+
+def write_series(data, entry):
+    #Cache entry of a parsed time series: the country columns as one
+    #time x column array, the time and calendar columns as arrays of their
+    #own and the column order and types in columns.json
+    os.makedirs(entry)
+    calendar = ['time', 'year', 'month', 'hour', 'dayofweek']
+    columns = [c for c in data.columns if c not in calendar]
+    np.save(entry + "/" + 'values.npy', data[columns].to_numpy(dtype=float))
+    np.save(entry + "/" + 'time.npy', data['time'].dt.tz_localize(None).to_numpy(dtype='datetime64[ns]').view('i8'))
+    for c in calendar[1:]:
+        np.save(entry + "/" + c + '.npy', data[c].to_numpy())
+    with open(entry + "/" + 'columns.json', 'w') as f:
+        json.dump({'order': list(data.columns), 'columns': columns,
+                   'dtypes': [str(data[c].dtype) for c in columns],
+                   'tz': None if data['time'].dt.tz is None else str(data['time'].dt.tz)}, f)
+
+def read_series(entry):
+    #Frame of a cache entry as make_datetime returns it, from memory mapped
+    #arrays
+    with open(entry + "/" + 'columns.json') as f:
+        meta = json.load(f)
+    values = np.load(entry + "/" + 'values.npy', mmap_mode='r')
+    frame = {c: values[:, j].astype(dtype) for (j, (c, dtype)) in enumerate(zip(meta['columns'], meta['dtypes']))}
+    frame['time'] = np.load(entry + "/" + 'time.npy').view('datetime64[ns]')
+    if meta['tz'] is not None:
+        frame['time'] = pd.Series(frame['time']).dt.tz_localize(meta['tz'])
+    for c in ['year', 'month', 'hour', 'dayofweek']:
+        frame[c] = np.load(entry + "/" + c + '.npy')
+    return pd.DataFrame(frame, columns=meta['order'])
+
+def load_series(filepath, name, time_format, USE_SERIES_CACHE, cache_path):
+    #Time series of filepath/name with the calendar columns of make_datetime.
+    #With the cache the parsed series is kept in cache_path/SeriesCache under
+    #the hash of the file, so only a new or changed file is parsed again.
+    if not USE_SERIES_CACHE:
+        return make_datetime(pd.read_csv(filepath + "/" + name), time_format)
+    entry = cache_path + "/" + 'SeriesCache' + "/" + series_key(filepath, name, time_format)
+    if not os.path.isdir(entry):
+        print("Caching time series " + name + "...")
+        data = make_datetime(pd.read_csv(filepath + "/" + name), time_format)
+        temp = entry + '.tmp' + str(os.getpid())
+        write_series(data, temp)
+        try:
+            os.rename(temp, entry)
+        except OSError:
+            #Another run wrote the entry first
+            shutil.rmtree(temp)
+    return read_series(entry)
+
 def gather_regular_sample(data, season, seasons, regularSeasonHours,
                           sample_hour):
     data = data.reset_index(drop=True)
@@ -51,37 +173,44 @@ def gather_regular_sample(data, season, seasons, regularSeasonHours,
                        regularSeasonHours * (seasons.index(season) + 1) + 1))
     return [sample_data, hours]
 
+def node_columns(columns, startNOnode=1):
+    # Node of every sampled column, with NO split into the nodes NO1-NO5
+    # (from startNOnode) that all get the NO profile
+    nodes = []
+    positions = []
+    for (j, c) in enumerate(columns):
+        if c == "NO":
+            for i in range(startNOnode, 6):
+                nodes.append(c + str(i))
+                positions.append(j)
+        else:
+            nodes.append(c)
+            positions.append(j)
+    return [nodes, positions]
+
+def long_block(values, hours, nodes, positions):
+    # Long format of a sample (hours x columns): one row per node and hour,
+    # node by node
+    return [np.repeat(nodes, len(hours)), np.tile(hours, len(nodes)),
+            values[:, positions].ravel(order='F')]
+
 def sample_generator(data, regularSeasonHours, scenario, season, seasons,
                      period, generator, sample_hour):
     [sample_data, hours] = gather_regular_sample(data, season, seasons,
                                                  regularSeasonHours,
                                                  sample_hour)
-    generator_data = pd.DataFrame()
     if generator=='Windoffshore' or generator=='Windoffshoregrounded' or generator=='Windoffshorefloating':
         startNOnode = 2
     else:
         startNOnode = 1
-    for c in sample_data.columns:
-        if c == "NO":
-            for i in range(startNOnode, 6):
-                c_no = c + str(i)
-                df = pd.DataFrame(
-                    data={'Node': c_no, "IntermitentGenerators": generator,
-                          "Operationalhour": hours,
-                          "Scenario": "scenario" + str(scenario),
-                          "Period": period,
-                          "GeneratorStochasticAvailabilityRaw": 
-                              sample_data[c].values})
-                generator_data = pd.concat([generator_data, df], ignore_index=True)
-        else:
-            df = pd.DataFrame(
-                data={'Node': c, "IntermitentGenerators": generator,
-                      "Operationalhour": hours,
-                      "Scenario": "scenario" + str(scenario),
-                      "Period": period,
-                      "GeneratorStochasticAvailabilityRaw": 
-                          sample_data[c].values})
-            generator_data = pd.concat([generator_data, df], ignore_index=True)
+    [nodes, positions] = node_columns(sample_data.columns, startNOnode)
+    [node, hour, value] = long_block(sample_data.values, hours, nodes, positions)
+    generator_data = pd.DataFrame(
+        data={'Node': node, "IntermitentGenerators": generator,
+              "Operationalhour": hour,
+              "Scenario": "scenario" + str(scenario),
+              "Period": period,
+              "GeneratorStochasticAvailabilityRaw": value})
     return generator_data
 
 def sample_hydro(data, regularSeasonHours, scenario, season,
@@ -89,16 +218,14 @@ def sample_hydro(data, regularSeasonHours, scenario, season,
     [sample_data, hours] = gather_regular_sample(data, season, seasons,
                                                  regularSeasonHours,
                                                  sample_hour)
-    hydro_data = pd.DataFrame()
-    for c in sample_data.columns:
-        if c != 'time':
-            df = pd.DataFrame(
-                data={'Node': c, "Period": period, "Season": season,
-                      "Operationalhour": hours, 
-                      "Scenario": "scenario" + str(scenario),
-                      "HydroGeneratorMaxSeasonalProduction": 
-                          sample_data[c].values})
-            hydro_data = pd.concat([hydro_data, df], ignore_index=True)
+    [node, hour, value] = long_block(sample_data.values, hours,
+                                     list(sample_data.columns),
+                                     list(range(sample_data.shape[1])))
+    hydro_data = pd.DataFrame(
+        data={'Node': node, "Period": period, "Season": season,
+              "Operationalhour": hour,
+              "Scenario": "scenario" + str(scenario),
+              "HydroGeneratorMaxSeasonalProduction": value})
     return hydro_data
 
 def sample_load(data, regularSeasonHours, scenario, season, seasons,
@@ -106,14 +233,13 @@ def sample_load(data, regularSeasonHours, scenario, season, seasons,
     [sample_data, hours] = gather_regular_sample(data, season, seasons,
                                                  regularSeasonHours,
                                                  sample_hour)
-    load = pd.DataFrame()
-    for c in sample_data.columns:
-        if c != 'time':
-            df = pd.DataFrame(
-                data={'Node': c, "Period": period, "Operationalhour": hours,
-                      "Scenario": "scenario" + str(scenario),
-                      "ElectricLoadRaw_in_MW": sample_data[c].values})
-            load = pd.concat([load, df], ignore_index=True)
+    [node, hour, value] = long_block(sample_data.values, hours,
+                                     list(sample_data.columns),
+                                     list(range(sample_data.shape[1])))
+    load = pd.DataFrame(
+        data={'Node': node, "Period": period, "Operationalhour": hour,
+              "Scenario": "scenario" + str(scenario),
+              "ElectricLoadRaw_in_MW": value})
     return load
 
 def gather_peak_sample(data, seasons, regularSeasonHours, peakSeasonHours,
@@ -148,169 +274,172 @@ def gather_peak_sample(data, seasons, regularSeasonHours, peakSeasonHours,
 
 def sample_hydro_peak(data, seasons, scenario, period, regularSeasonHours,
                       peakSeasonHours, overall_sample, country_sample):
-    peak_data = pd.DataFrame()
     [country_peak, overall_peak,
      country_hours, overall_hours] = gather_peak_sample(data, seasons,
                                                         regularSeasonHours,
                                                         peakSeasonHours,
                                                         country_sample,
                                                         overall_sample)
-    for c in country_peak.columns:
-        df = pd.DataFrame(
-            data={'Node': c, "Period": period, "Season": "peak1",
-                  "Operationalhour": country_hours,
-                  "Scenario": "scenario" + str(scenario),
-                  "HydroGeneratorMaxSeasonalProduction": 
-                      country_peak[c].values})
-        peak_data = pd.concat([peak_data, df], ignore_index=True)
-        df = pd.DataFrame(
-            data={'Node': c, "Period": period, "Season": "peak2",
-                  "Operationalhour": overall_hours,
-                  "Scenario": "scenario" + str(scenario),
-                  "HydroGeneratorMaxSeasonalProduction": 
-                      overall_peak[c].values})
-        peak_data = pd.concat([peak_data, df], ignore_index=True)
+    # Both peak seasons of a node after each other
+    [node, hour, value] = long_block(np.vstack([country_peak.values, overall_peak.values]),
+                                     country_hours + overall_hours,
+                                     list(country_peak.columns),
+                                     list(range(country_peak.shape[1])))
+    peak_season = ["peak1"] * len(country_hours) + ["peak2"] * len(overall_hours)
+    peak_data = pd.DataFrame(
+        data={'Node': node, "Period": period,
+              "Season": np.tile(peak_season, country_peak.shape[1]),
+              "Operationalhour": hour,
+              "Scenario": "scenario" + str(scenario),
+              "HydroGeneratorMaxSeasonalProduction": value})
     return peak_data
 
 def sample_load_peak(data, seasons, scenario, period, regularSeasonHours,
                      peakSeasonHours, overall_sample, country_sample):
-    peak_data = pd.DataFrame()
     [country_peak, overall_peak,
      country_hours, overall_hours] = gather_peak_sample(data, seasons,
-                                                        regularSeasonHours, 
-                                                        peakSeasonHours, 
+                                                        regularSeasonHours,
+                                                        peakSeasonHours,
                                                         country_sample,
                                                         overall_sample)
-    for c in country_peak.columns:
-        df = pd.DataFrame(
-            data={'Node': c, "Period": period, 
-                  "Operationalhour": country_hours,
-                  "Scenario": "scenario" + str(scenario),
-                  "ElectricLoadRaw_in_MW": country_peak[c].values})
-        peak_data = pd.concat([peak_data, df], ignore_index=True)
-        df = pd.DataFrame(
-            data={'Node': c, "Period": period, 
-                  "Operationalhour": overall_hours,
-                  "Scenario": "scenario" + str(scenario),
-                  "ElectricLoadRaw_in_MW": overall_peak[c].values})
-        peak_data = pd.concat([peak_data, df], ignore_index=True)
+    [node, hour, value] = long_block(np.vstack([country_peak.values, overall_peak.values]),
+                                     country_hours + overall_hours,
+                                     list(country_peak.columns),
+                                     list(range(country_peak.shape[1])))
+    peak_data = pd.DataFrame(
+        data={'Node': node, "Period": period,
+              "Operationalhour": hour,
+              "Scenario": "scenario" + str(scenario),
+              "ElectricLoadRaw_in_MW": value})
     return peak_data
 
 def sample_generator_peak(data, seasons, g, scenario,
                           period, regularSeasonHours, peakSeasonHours,
                           overall_sample, country_sample):
-    peak_data = pd.DataFrame()
     [country_peak, overall_peak,
      country_hours, overall_hours] = gather_peak_sample(data, seasons,
                                                         regularSeasonHours,
-                                                        peakSeasonHours, 
-                                                        country_sample, 
+                                                        peakSeasonHours,
+                                                        country_sample,
                                                         overall_sample)
     if g=='Windoffshore' or g=='Windoffshoregrounded' or g=='Windoffshorefloating':
         startNOnode = 2
     else:
         startNOnode = 1
-    for c in country_peak.columns:
-        if c == "NO":
-            for i in range(startNOnode, 6):
-                c_no = c + str(i)
-                df = pd.DataFrame(
-                data={'Node': c_no, "IntermitentGenerators": g,
-                      "Operationalhour": country_hours,
-                      "Scenario": "scenario" + str(scenario),
-                      "Period": period, 
-                      "GeneratorStochasticAvailabilityRaw": 
-                          country_peak[c].values})
-                peak_data = pd.concat([peak_data, df], ignore_index=True)
-                df = pd.DataFrame(
-                data={'Node': c_no, "IntermitentGenerators": g, 
-                      "Operationalhour": overall_hours, 
-                      "Scenario": "scenario" + str(scenario),
-                      "Period": period, 
-                      "GeneratorStochasticAvailabilityRaw": 
-                          overall_peak[c].values})
-                peak_data = pd.concat([peak_data, df], ignore_index=True)
-        else:
-            df = pd.DataFrame(
-            data={'Node': c, "IntermitentGenerators": g, 
-                  "Operationalhour": country_hours, 
-                  "Scenario": "scenario" + str(scenario),
-                  "Period": period,
-                  "GeneratorStochasticAvailabilityRaw": 
-                      country_peak[c].values})
-            peak_data = pd.concat([peak_data, df], ignore_index=True)
-            df = pd.DataFrame(
-            data={'Node': c, "IntermitentGenerators": g, 
-                  "Operationalhour": overall_hours,
-                  "Scenario": "scenario" + str(scenario),
-                  "Period": period,
-                 "GeneratorStochasticAvailabilityRaw": 
-                     overall_peak[c].values})
-            peak_data = pd.concat([peak_data, df], ignore_index=True)
+    [nodes, positions] = node_columns(country_peak.columns, startNOnode)
+    [node, hour, value] = long_block(np.vstack([country_peak.values, overall_peak.values]),
+                                     country_hours + overall_hours,
+                                     nodes, positions)
+    peak_data = pd.DataFrame(
+        data={'Node': node, "IntermitentGenerators": g,
+              "Operationalhour": hour,
+              "Scenario": "scenario" + str(scenario),
+              "Period": period,
+              "GeneratorStochasticAvailabilityRaw": value})
     return peak_data
 
-def make_ws(data, regularSeasonHours, seasons):
-    ws = pd.DataFrame(columns=['Year','Season','Month','SampleIndex','Value'])
-    for s in seasons:
-        all_data = data.loc[data.month.isin(season_month(s)), :]
-        all_col = []
-        for col in all_data.columns:
-            if col not in ['time', 'year', 'month',
-                           'dayofweek', 'hour']:
-                all_col.append(col)
-        tot_data = pd.DataFrame()
-        tot_data['Tot'] = all_data.loc[:,all_col].sum(axis=1)
-        for col in ['time', 'year', 'month', 'dayofweek', 'hour']:
-            tot_data[col] = all_data[col]
-        for y in range(2015,2020):
-            for m in season_month(s):
-                sample_base = year_month_filter(tot_data, y, m)
-                max_sample = sample_base.shape[0]
-                for j in range(max_sample - regularSeasonHours - 1):
-                    sample = sample_base.iloc[j:j+regularSeasonHours]
-                    ws_value = wasserstein_distance(tot_data['Tot'],
-                                                    sample['Tot'])
-                    df = pd.DataFrame(data={'Year': y,
-                                            'Season': s,
-                                            'Month': m,
-                                            'SampleIndex': j,
-                                            'Value': ws_value}, index=[0])
-                    ws = pd.concat([ws, df], ignore_index = True)                                   
-    return ws
-
-def make_mean(data, regularSeasonHours, seasons):
-    ws = pd.DataFrame(columns=['Year','Season','Month','SampleIndex','Value'])
+def ws_table(values, regularSeasonHours):
+    # Sorted values and, for every step k/regularSeasonHours of the
+    # distribution function of a window, the integral of |F(x) - k/H| from
+    # the smallest value to each value, F being the distribution function
+    # of the values
+    xs = np.sort(values)
+    n = len(xs)
+    steps = np.arange(regularSeasonHours + 1) / regularSeasonHours
+    integrand = np.abs(np.arange(1, n)[None, :] / n - steps[:, None])
+    integral = np.zeros((regularSeasonHours + 1, n))
+    integral[:, 1:] = np.cumsum(integrand * np.diff(xs)[None, :], axis=1)
+    return [xs, integral]
+
+def window_ws(xs, integral, windows):
+    # Wasserstein distance between the values of ws_table and every window
+    # (row of windows). With the window sorted, its distribution function
+    # is j/H between its values j and j+1, so the distance is a sum of
+    # differences of the integrals of ws_table at the window values.
+    regularSeasonHours = windows.shape[1]
+    n = len(xs)
+    w = np.sort(windows, axis=1)
+    i = np.searchsorted(xs, w, side='right') - 1
+    base = np.maximum(i, 0)
+    j = np.arange(regularSeasonHours)[None, :]
+    def at(k):
+        # Integral of step k up to the window values, linear between values
+        return integral[k, base] + np.abs((i + 1) / n - k / regularSeasonHours) * (w - xs[base])
+    return (at(j) - at(j + 1)).sum(axis=1) + integral[regularSeasonHours, n - 1]
+
+_window_data = None
+
+def init_windows(window_data):
+    global _window_data
+    _window_data = window_data
+
+def window_stats(s, y, m):
+    # Statistic of every window of the sample month, the windows starting
+    # at the first max_sample - regularSeasonHours - 1 hours
+    d = _window_data
+    [tot, year, month] = d['seasons'][s]
+    regularSeasonHours = d['regularSeasonHours']
+    sample_base = tot[(year == y) & (month == m)]
+    max_sample = sample_base.shape[0]
+    count = max(max_sample - regularSeasonHours - 1, 0)
+    if count == 0:
+        return np.zeros(0)
+    if d['stat'] == 'mean':
+        cumulative = np.concatenate([[0], np.cumsum(sample_base)])
+        return (cumulative[regularSeasonHours:regularSeasonHours + count] - cumulative[:count]) / regularSeasonHours
+    windows = np.lib.stride_tricks.sliding_window_view(sample_base, regularSeasonHours)[:count]
+    [xs, integral] = d['tables'][s]
+    return window_ws(xs, integral, windows)
+
+def make_window_stats(data, regularSeasonHours, seasons, stat, NO_OF_WORKERS):
+    # Table of the Wasserstein distance ("ws") to the season or of the mean
+    # ("mean") of the total over the columns for every window of every
+    # sample month, with one task per season, year and month on a pool of
+    # at most NO_OF_WORKERS processes (or one by one without a pool)
+    window_data = {'regularSeasonHours': regularSeasonHours, 'stat': stat, 'seasons': {}, 'tables': {}}
     for s in seasons:
         all_data = data.loc[data.month.isin(season_month(s)), :]
-        all_col = []
-        for col in all_data.columns:
-            if col not in ['time', 'year', 'month',
-                           'dayofweek', 'hour']:
-                all_col.append(col)
-        tot_data = pd.DataFrame()
-        tot_data['Tot'] = all_data.loc[:,all_col].sum(axis=1)
-        for col in ['time', 'year', 'month', 'dayofweek', 'hour']:
-            tot_data[col] = all_data[col]
-        for y in range(2015,2020):
-            for m in season_month(s):
-                sample_base = year_month_filter(tot_data, y, m)
-                max_sample = sample_base.shape[0]
-                for j in range(max_sample - regularSeasonHours - 1):
-                    sample = sample_base.iloc[j:j+regularSeasonHours]
-                    ws_value = np.mean(sample['Tot'])
-                    df = pd.DataFrame(data={'Year': y,
-                                            'Season': s,
-                                            'Month': m,
-                                            'SampleIndex': j,
-                                            'Value': ws_value}, index=[0])
-                    ws = pd.concat([ws, df], ignore_index=True)
-    return ws
-
-def make_filter_result(data1, data2, regularSeasonHours, seasons, n_cluster):
-    data1_ws = make_ws(data1, regularSeasonHours, seasons)
+        all_col = [col for col in all_data.columns if col not in ['time', 'year', 'month', 'dayofweek', 'hour']]
+        tot = all_data.loc[:,all_col].sum(axis=1).to_numpy()
+        window_data['seasons'][s] = [tot, all_data['year'].to_numpy(), all_data['month'].to_numpy()]
+        if stat == 'ws':
+            window_data['tables'][s] = ws_table(tot, regularSeasonHours)
+    units = [(s, y, m) for s in seasons for y in range(2015,2020) for m in season_month(s)]
+
+    pool = process_pool(min(NO_OF_WORKERS, len(units)), init_windows, (window_data,))
+    out = pool_map(pool, window_stats, [u[0] for u in units], [u[1] for u in units], [u[2] for u in units])
+    if pool is not None:
+        pool.shutdown()
+
+    # One table for all windows, in the order of the seasons, years, months
+    # and windows
+    rows = sum(len(v) for v in out)
+    ws = {'Year': np.zeros(rows, dtype=int), 'Season': np.empty(rows, dtype=object),
+          'Month': np.zeros(rows, dtype=int), 'SampleIndex': np.zeros(rows, dtype=int),
+          'Value': np.zeros(rows)}
+    start = 0
+    for ((s, y, m), values) in zip(units, out):
+        stop = start + len(values)
+        ws['Year'][start:stop] = y
+        ws['Season'][start:stop] = s
+        ws['Month'][start:stop] = m
+        ws['SampleIndex'][start:stop] = np.arange(len(values))
+        ws['Value'][start:stop] = values
+        start = stop
+    return pd.DataFrame(ws, columns=['Year','Season','Month','SampleIndex','Value'])
+
+def make_ws(data, regularSeasonHours, seasons, NO_OF_WORKERS):
+    return make_window_stats(data, regularSeasonHours, seasons, 'ws', NO_OF_WORKERS)
+
+def make_mean(data, regularSeasonHours, seasons, NO_OF_WORKERS):
+    return make_window_stats(data, regularSeasonHours, seasons, 'mean', NO_OF_WORKERS)
+
+def make_filter_result(data1, data2, regularSeasonHours, seasons, n_cluster,
+                       NO_OF_WORKERS):
+    data1_ws = make_ws(data1, regularSeasonHours, seasons, NO_OF_WORKERS)
     #elload_ws.to_csv("elload_ws.csv", index=False)
     #elload_ws = pd.read_csv("elload_ws.csv")
-    data2_ws = make_mean(data2, regularSeasonHours, seasons)
+    data2_ws = make_mean(data2, regularSeasonHours, seasons, NO_OF_WORKERS)
     #data2_ws = make_ws(data2, regularSeasonHours, seasons)
     #wind_ws.to_csv("wind_ws.csv", index=False)
     #wind_ws = pd.read_csv("wind_ws.csv")
@@ -332,76 +461,421 @@ def make_filter_result(data1, data2, regularSeasonHours, seasons, n_cluster):
     filter_result = pd.concat(frames)
     filter_result.to_csv("filter_result.csv", index=False)
 
+_scenario_data = None
+
+def init_sampler(scenario_data):
+    global _scenario_data
+    _scenario_data = scenario_data
+
+def sample_scenario(tree, i, scenario, seed):
+    #Samples of scenario in period i (of moment matching tree) for the
+    #stochastic-files, and its rows of the sampling key. The draws come from
+    #the random stream seed of the scenario only, so the samples do not
+    #depend on the order or the process they are made in.
+    
+    rng = np.random.default_rng(seed)
+    d = _scenario_data
+    [seasons, Periods, scenarios, regularSeasonHours, peakSeasonHours] = [
+        d['seasons'], d['Periods'], d['scenarios'], d['regularSeasonHours'], d['peakSeasonHours']]
+    [filter_use, n_cluster, HEATMODULE, LOADCHANGEMODULE, fix_sample, north_sea] = [
+        d['filter_use'], d['n_cluster'], d['HEATMODULE'], d['LOADCHANGEMODULE'], d['fix_sample'], d['north_sea']]
+    [filter_result, sampling_key, index] = [d['filter_result'], d['sampling_key'], d['index']]
+    [solar_data, windonshore_data, windoffshore_data, hydroror_data, hydroseasonal_data, electricload_data] = [
+        d['solar_data'], d['windonshore_data'], d['windoffshore_data'], d['hydroror_data'], d['hydroseasonal_data'],
+        d['electricload_data']]
+    [heatload_data, cop_data, elecLoadMod_periods, heatLoadMod_periods] = [
+        d['heatload_data'], d['cop_data'], d['elecLoadMod_periods'], d['heatLoadMod_periods']]
+    
+    genAvail = []
+    elecLoad = []
+    hydroSeasonal = []
+    heatLoad = []
+    cop = []
+    elecLoadMod = []
+    heatLoadMod = []
+    key_rows = []
+    
+    for s in seasons:
+        ###################
+        ##REGULAR SEASONS##
+        ###################
+        
+        # Get sample year (2015-2019) and month for each season/scenario 
+        
+        if filter_use:
+            # The clusters take turns over all draws, in the order of the
+            # trees, periods, scenarios and seasons
+            cluster = ((((tree * Periods) + i - 1) * scenarios + scenario - 1) * len(seasons) + seasons.index(s)) % n_cluster
+            valid_pick = filter_result[filter_result["ClusterGroup"]==cluster]
+            valid_pick = valid_pick[valid_pick["Season"]==s]
+            sample_year = rng.choice(valid_pick["Year"])
+            valid_pick = valid_pick[valid_pick['Year']==sample_year]
+            sample_month = rng.choice(valid_pick["Month"])
+            valid_pick = valid_pick[valid_pick['Month']==sample_month]
+        else:
+            sample_year = rng.choice(list(range(2015,2020)))
+            sample_month = rng.choice(season_month(s))
+        
+        # Set sample year and month according to key
+        
+        if fix_sample:
+            sample_year = sampling_key.loc[(i,scenario,s),'Year']
+            sample_month = sampling_key.loc[(i,scenario,s),'Month']                        
+        
+        # Filter out the hours within the sample year
+        
+        solar_month = year_month_window(solar_data, index['solar'],
+                                        sample_year,
+                                        sample_month)
+        windonshore_month = year_month_window(windonshore_data, index['windonshore'],
+                                              sample_year,
+                                              sample_month)
+        windoffshore_month = year_month_window(windoffshore_data, index['windoffshore'],
+                                               sample_year,
+                                               sample_month)
+        hydroror_month = year_month_window(hydroror_data, index['hydroror'],
+                                           sample_year,
+                                           sample_month)
+        hydroseasonal_month = year_month_window(hydroseasonal_data, index['hydroseasonal'],
+                                                sample_year,
+                                                sample_month)
+        electricload_month = year_month_window(electricload_data, index['electricload'],
+                                               sample_year,
+                                               sample_month)
+        
+        if HEATMODULE:
+            heatload_month = year_month_window(heatload_data, index['heatload'],
+                                              sample_year,
+                                              sample_month)
+            cop_month = year_month_window(cop_data, index['cop'],
+                                          sample_year,
+                                          sample_month)
+
+        if LOADCHANGEMODULE:
+            elecLoadMod_period = elecLoadMod_periods[i]
+            elecLoadMod_month = year_month_window(elecLoadMod_period, index[('elecLoadMod', i)],
+                                                  sample_year,
+                                                  sample_month)
+            if HEATMODULE:
+                heatLoadMod_period = heatLoadMod_periods[i]
+                heatLoadMod_month = year_month_window(heatLoadMod_period, index[('heatLoadMod', i)],
+                                                      sample_year,
+                                                      sample_month)
+        
+        # Filter the sample range by K-means if filter_sample=True
+        
+        if filter_use:
+            sample_hour = rng.choice(valid_pick['SampleIndex'])
+        else:
+            sample_hour = rng.integers(
+                0, solar_month.shape[0] - regularSeasonHours - 1)
+        
+
+        # Choose sample_hour from key or save sampling key
+
+        if fix_sample:
+            sample_hour = sampling_key.loc[(i,scenario,s),'Hour']
+        else:
+            key_rows.append({'Period': i,
+                             'Scenario': scenario,
+                             'Season': s,
+                             'Year': sample_year,
+                             'Month': sample_month,
+                             'Hour': sample_hour})
+        
+        # Sample generator availability for regular seasons
+        genAvail.append(sample_generator(data=solar_month,
+                                         regularSeasonHours=regularSeasonHours,
+                                         scenario=scenario, season=s,
+                                         seasons=seasons, period=i,
+                                         generator="Solar",
+                                         sample_hour=sample_hour))
+        genAvail.append(sample_generator(data=windonshore_month,
+                                         regularSeasonHours=regularSeasonHours,
+                                         scenario=scenario, season=s,
+                                         seasons=seasons, period=i,
+                                         generator="Windonshore",
+                                         sample_hour=sample_hour))
+        if north_sea:
+            genAvail.append(sample_generator(data=windoffshore_month,
+                                             regularSeasonHours=regularSeasonHours, 
+                                             scenario=scenario, season=s,
+                                             seasons=seasons, period=i,
+                                             generator="Windoffshoregrounded", 
+                                             sample_hour=sample_hour))
+            genAvail.append(sample_generator(data=windoffshore_month,
+                                             regularSeasonHours=regularSeasonHours, 
+                                             scenario=scenario, season=s,
+                                             seasons=seasons, period=i,
+                                             generator="Windoffshorefloating", 
+                                             sample_hour=sample_hour))
+        else:
+            genAvail.append(sample_generator(data=windoffshore_month,
+                                             regularSeasonHours=regularSeasonHours, 
+                                             scenario=scenario, season=s,
+                                             seasons=seasons, period=i,
+                                             generator="Windoffshore", 
+                                             sample_hour=sample_hour))
+        genAvail.append(sample_generator(data=hydroror_month,
+                                         regularSeasonHours=regularSeasonHours, 
+                                         scenario=scenario, season=s, 
+                                         seasons=seasons, period=i, 
+                                         generator="Hydrorun-of-the-river", 
+                                         sample_hour=sample_hour))
+
+        # Sample electric load for regular seasons
+        elecLoad.append(sample_load(data=electricload_month,
+                                    regularSeasonHours=regularSeasonHours,
+                                    scenario=scenario, season=s,
+                                    seasons=seasons, period=i, 
+                                    sample_hour=sample_hour))
+        
+        # Sample seasonal hydro limit for regular seasons
+        hydroSeasonal.append(sample_hydro(data=hydroseasonal_month,
+                                          regularSeasonHours=regularSeasonHours,
+                                          scenario=scenario, season=s, 
+                                          seasons=seasons, period=i,
+                                          sample_hour=sample_hour))
+        
+        # Sample HEATMODULE profiles
+        if HEATMODULE:
+            heatLoad.append(sample_load(data=heatload_month,
+                                        regularSeasonHours=regularSeasonHours,
+                                        scenario=scenario, season=s,
+                                        seasons=seasons, period=i,
+                                        sample_hour=sample_hour))
+            
+            cop.append(sample_generator(data=cop_month,
+                                        regularSeasonHours=regularSeasonHours,
+                                        scenario=scenario, season=s,
+                                        seasons=seasons, period=i,
+                                        generator="HeatPumpAir",
+                                        sample_hour=sample_hour))
+        
+        if LOADCHANGEMODULE:
+            elecLoadMod.append(sample_load(data=elecLoadMod_month,
+                                           regularSeasonHours=regularSeasonHours,
+                                           scenario=scenario, season=s,
+                                           seasons=seasons, period=i,
+                                           sample_hour=sample_hour))
+            
+            if HEATMODULE:
+                heatLoadMod.append(sample_load(data=heatLoadMod_month,
+                                               regularSeasonHours=regularSeasonHours,
+                                               scenario=scenario, season=s,
+                                               seasons=seasons, period=i,
+                                               sample_hour=sample_hour))
+    
+    ################
+    ##PEAK SEASONS##
+    ################
+    
+    # Get peak sample year (2015-2019)
+        
+    sample_year = rng.choice(list(range(2015,2020)))
+    
+    if fix_sample:
+        sample_year = sampling_key.loc[(i,scenario,'peak'),'Year']
+    else:
+        key_rows.append({'Period': i,
+                         'Scenario': scenario,
+                         'Season': 'peak',
+                         'Year': sample_year,
+                         'Month': 0,
+                         'Hour': 0})
+ 
+    # Filter out the hours within the sample year
+    
+    solar_data_year = year_window(solar_data, index['solar'], sample_year)
+    windonshore_data_year = year_window(windonshore_data, index['windonshore'], sample_year)
+    windoffshore_data_year = year_window(windoffshore_data, index['windoffshore'], sample_year)
+    hydroror_data_year = year_window(hydroror_data, index['hydroror'], sample_year)
+    hydroseasonal_data_year = year_window(hydroseasonal_data, index['hydroseasonal'], sample_year)
+    electricload_data_year = year_window(electricload_data, index['electricload'], sample_year)
+    
+    if HEATMODULE:
+        heatload_year = year_window(heatload_data, index['heatload'], sample_year)
+        cop_year = year_window(cop_data, index['cop'], sample_year)
+
+    if LOADCHANGEMODULE:
+        elecLoadMod_data_year = year_window(elecLoadMod_period, index[('elecLoadMod', i)], sample_year)
+        if HEATMODULE:
+            heatLoadMod_data_year = year_window(heatLoadMod_period, index[('heatLoadMod', i)], sample_year)
+
+    #Peak1: The highest load when all loads are summed together
+    electricload_data_year_notime = remove_time_index(electricload_data_year)
+    overall_sample = electricload_data_year_notime.sum(axis=1).idxmax()
+    #Peak2: The highest load of a single country
+    max_load_country = electricload_data_year_notime.max().idxmax()
+    country_sample = electricload_data_year_notime[max_load_country].idxmax()
+
+    #Sample generator availability for peak seasons
+    genAvail.append(sample_generator_peak(data=solar_data_year,
+                                          seasons=seasons,
+                                          g="Solar", scenario=scenario, period=i,
+                                          regularSeasonHours=regularSeasonHours,
+                                          peakSeasonHours=peakSeasonHours,
+                                          overall_sample=overall_sample,
+                                          country_sample=country_sample))
+    genAvail.append(sample_generator_peak(data=windonshore_data_year,
+                                          seasons=seasons, 
+                                          g="Windonshore", scenario=scenario, 
+                                          period=i, 
+                                          regularSeasonHours=regularSeasonHours,
+                                          peakSeasonHours=peakSeasonHours,
+                                          overall_sample=overall_sample, 
+                                          country_sample=country_sample))
+    if north_sea:
+        genAvail.append(sample_generator_peak(data=windoffshore_data_year,
+                                              seasons=seasons, 
+                                              g="Windoffshoregrounded", scenario=scenario,
+                                              period=i, 
+                                              regularSeasonHours=regularSeasonHours, 
+                                              peakSeasonHours=peakSeasonHours, 
+                                              overall_sample=overall_sample, 
+                                              country_sample=country_sample))
+        genAvail.append(sample_generator_peak(data=windoffshore_data_year,
+                                              seasons=seasons, 
+                                              g="Windoffshorefloating", scenario=scenario,
+                                              period=i, 
+                                              regularSeasonHours=regularSeasonHours, 
+                                              peakSeasonHours=peakSeasonHours, 
+                                              overall_sample=overall_sample, 
+                                              country_sample=country_sample))
+    else:
+        genAvail.append(sample_generator_peak(data=windoffshore_data_year,
+                                              seasons=seasons, 
+                                              g="Windoffshore", scenario=scenario,
+                                              period=i, 
+                                              regularSeasonHours=regularSeasonHours, 
+                                              peakSeasonHours=peakSeasonHours, 
+                                              overall_sample=overall_sample, 
+                                              country_sample=country_sample))
+    genAvail.append(sample_generator_peak(data=hydroror_data_year,
+                                          seasons=seasons, 
+                                          g="Hydrorun-of-the-river",
+                                          scenario=scenario, period=i, 
+                                          regularSeasonHours=regularSeasonHours,
+                                          peakSeasonHours=peakSeasonHours,
+                                          overall_sample=overall_sample, 
+                                          country_sample=country_sample))
+
+    #Sample electric load for peak seasons
+    elecLoad.append(sample_load_peak(data=electricload_data_year,
+                                     seasons=seasons,
+                                     scenario=scenario, period=i, 
+                                     regularSeasonHours=regularSeasonHours, 
+                                     peakSeasonHours=peakSeasonHours,
+                                     overall_sample=overall_sample, 
+                                     country_sample=country_sample))
+
+    #Sample seasonal hydro limit for peak seasons
+    hydroSeasonal.append(sample_hydro_peak(data=hydroseasonal_data_year,
+                                           seasons=seasons,
+                                           scenario=scenario, period=i, 
+                                           regularSeasonHours=regularSeasonHours, 
+                                           peakSeasonHours=peakSeasonHours,
+                                           overall_sample=overall_sample, 
+                                           country_sample=country_sample))
+    
+    # Sample HEATMODULE profiles
+    if HEATMODULE:
+        heatLoad.append(sample_load_peak(data=heatload_year,
+                                         seasons=seasons,
+                                         scenario=scenario, period=i,
+                                         regularSeasonHours=regularSeasonHours,
+                                         peakSeasonHours=peakSeasonHours,
+                                         overall_sample=overall_sample,
+                                         country_sample=country_sample))
+        
+        cop.append(sample_generator_peak(data=cop_year,
+                                         seasons=seasons,
+                                         g="HeatPumpAir",
+                                         scenario=scenario, period=i,
+                                         regularSeasonHours=regularSeasonHours,
+                                         peakSeasonHours=peakSeasonHours,
+                                         overall_sample=overall_sample,
+                                         country_sample=country_sample))
+    
+    # Sample the change of load
+    if LOADCHANGEMODULE:
+        elecLoadMod.append(sample_load_peak(data=elecLoadMod_data_year,
+                                            seasons=seasons,
+                                            scenario=scenario, period=i,
+                                            regularSeasonHours=regularSeasonHours,
+                                            peakSeasonHours=peakSeasonHours,
+                                            overall_sample=overall_sample,
+                                            country_sample=country_sample))
+        
+        if HEATMODULE:
+            heatLoadMod.append(sample_load_peak(data=heatLoadMod_data_year,
+                                                seasons=seasons,
+                                                scenario=scenario, period=i,
+                                                regularSeasonHours=regularSeasonHours,
+                                                peakSeasonHours=peakSeasonHours,
+                                                overall_sample=overall_sample,
+                                                country_sample=country_sample))
+    
+    # One frame per stochastic-file, to send few and large objects back
+    samples = {'genAvail': genAvail, 'elecLoad': elecLoad, 'hydroSeasonal': hydroSeasonal,
+               'heatLoad': heatLoad, 'cop': cop, 'elecLoadMod': elecLoadMod, 'heatLoadMod': heatLoadMod}
+    samples = {name: pd.concat(frames, ignore_index=True) for (name, frames) in samples.items() if len(frames) > 0}
+    return [samples, key_rows]
+
 def generate_random_scenario(filepath, tab_file_path, scenarios, seasons,
                              Periods, regularSeasonHours, peakSeasonHours, 
                              dict_countries, time_format, filter_make,
                              filter_use, n_cluster, moment_matching,
                              n_tree_compare, HEATMODULE, LOADCHANGEMODULE,
-                             fix_sample, north_sea):
+                             fix_sample, north_sea, USE_SERIES_CACHE,
+                             NO_OF_WORKERS, scenario_seed, cache_path="Cache"):
     
     if fix_sample:
         print("Generating scenarios according to key...")
     else:
         print("Generating random scenarios...")
 
-    # Generate dataframes to print as stochastic-files
-    genAvail = pd.DataFrame()
-    elecLoad = pd.DataFrame()
-    hydroSeasonal = pd.DataFrame()
+    # Collect the samples to print as stochastic-files, concatenated once
+    # after sampling
+    genAvail = []
+    elecLoad = []
+    hydroSeasonal = []
     
     if HEATMODULE:
-        heatLoad = pd.DataFrame()
-        cop = pd.DataFrame()
+        heatLoad = []
+        cop = []
 
     if LOADCHANGEMODULE:
-        elecLoadMod = pd.DataFrame()
+        elecLoadMod = []
         if HEATMODULE:
-            heatLoadMod = pd.DataFrame()
+            heatLoadMod = []
     
-    # Load all the raw scenario data
-    solar_data = pd.read_csv(filepath + "/solar.csv")
-    windonshore_data = pd.read_csv(filepath + "/windonshore.csv")
-    windoffshore_data = pd.read_csv(filepath + "/windoffshore.csv")
-    hydroror_data = pd.read_csv(filepath + "/hydroror.csv")
-    hydroseasonal_data = pd.read_csv(filepath + "/hydroseasonal.csv")
-    electricload_data = pd.read_csv(filepath + "/electricload.csv")
+    # Load all the raw scenario data with datetime columns
+    solar_data = load_series(filepath, "solar.csv", time_format, USE_SERIES_CACHE, cache_path)
+    windonshore_data = load_series(filepath, "windonshore.csv", time_format, USE_SERIES_CACHE, cache_path)
+    windoffshore_data = load_series(filepath, "windoffshore.csv", time_format, USE_SERIES_CACHE, cache_path)
+    hydroror_data = load_series(filepath, "hydroror.csv", time_format, USE_SERIES_CACHE, cache_path)
+    hydroseasonal_data = load_series(filepath, "hydroseasonal.csv", time_format, USE_SERIES_CACHE, cache_path)
+    electricload_data = load_series(filepath, "electricload.csv", time_format, USE_SERIES_CACHE, cache_path)
     
     if HEATMODULE:
-        heatload_data = pd.read_csv(filepath + "/HeatModule/heatload.csv")
-        cop_data = pd.read_csv(filepath + "/HeatModule/cop_ashp.csv")
+        heatload_data = load_series(filepath, "HeatModule/heatload.csv", "%Y-%m-%d %H:%M", USE_SERIES_CACHE, cache_path)
+        cop_data = load_series(filepath, "HeatModule/cop_ashp.csv", "%Y-%m-%d %H:%M", USE_SERIES_CACHE, cache_path)
 
     if LOADCHANGEMODULE:
-        elecLoadMod_data = pd.read_csv(filepath + "/LoadchangeModule/elec_load_mod.csv")
+        elecLoadMod_data = load_series(filepath, "LoadchangeModule/elec_load_mod.csv", "%Y-%m-%d %H:%M", USE_SERIES_CACHE, cache_path)
         if HEATMODULE:
-            heatLoadMod_data = pd.read_csv(filepath + "/LoadchangeModule/heat_load_mod.csv")
-
-    # Make datetime columns
-    solar_data = make_datetime(solar_data, time_format)
-    windonshore_data = make_datetime(windonshore_data, time_format)
-    windoffshore_data = make_datetime(windoffshore_data, time_format)
-    hydroror_data = make_datetime(hydroror_data, time_format)
-    hydroseasonal_data = make_datetime(hydroseasonal_data, time_format)
-    electricload_data = make_datetime(electricload_data, time_format)
-    
-    if HEATMODULE:
-        heatload_data = make_datetime(heatload_data, "%Y-%m-%d %H:%M")
-        cop_data = make_datetime(cop_data, "%Y-%m-%d %H:%M")
-
-    if LOADCHANGEMODULE:
-        elecLoadMod_data = make_datetime(elecLoadMod_data, "%Y-%m-%d %H:%M")
-        if HEATMODULE:
-            heatLoadMod_data = make_datetime(heatLoadMod_data, "%Y-%m-%d %H:%M")
+            heatLoadMod_data = load_series(filepath, "LoadchangeModule/heat_load_mod.csv", "%Y-%m-%d %H:%M", USE_SERIES_CACHE, cache_path)
     
     if filter_make:
         print("Making stratified filter...")
         make_filter_result(electricload_data, electricload_data, 
-                           regularSeasonHours, seasons, n_cluster)
+                           regularSeasonHours, seasons, n_cluster, NO_OF_WORKERS)
         #import pdb; pdb.set_trace()
     
     if filter_use:
         print("Using stratified filter...")
         filter_result = pd.read_csv("filter_result.csv")
-        cluster = n_cluster - 1
         
     if moment_matching:
         genAvail_dict = {}
@@ -431,384 +905,71 @@ def generate_random_scenario(filepath, tab_file_path, scenarios, seasons,
         sampling_key = pd.read_csv(filepath + "/sampling_key.csv")
         sampling_key = sampling_key.set_index(['Period','Scenario','Season'])
     else:
-        sampling_key = pd.DataFrame(columns=['Period','Scenario','Season','Year','Month','Hour'])   
+        sampling_key = []
     
-    for tree in range(n_tree_compare):
+    # The load change of every period, and the row ranges of the months and
+    # years of all sources for the draws
+    sources = {'solar': solar_data, 'windonshore': windonshore_data,
+               'windoffshore': windoffshore_data, 'hydroror': hydroror_data,
+               'hydroseasonal': hydroseasonal_data, 'electricload': electricload_data}
+    if HEATMODULE:
+        sources['heatload'] = heatload_data
+        sources['cop'] = cop_data
+    if LOADCHANGEMODULE:
+        elecLoadMod_periods = {}
+        heatLoadMod_periods = {}
         for i in range(1,Periods+1):
-            for scenario in range(1,scenarios+1):
-                for s in seasons:
-                    ###################
-                    ##REGULAR SEASONS##
-                    ###################
-                    
-                    # Get sample year (2015-2019) and month for each season/scenario 
-                    
-                    if filter_use:
-                        if cluster == n_cluster - 1:
-                            cluster = 0
-                        else:
-                            cluster += 1
-                        valid_pick = filter_result[filter_result["ClusterGroup"]==cluster]
-                        valid_pick = valid_pick[valid_pick["Season"]==s]
-                        sample_year = np.random.choice(valid_pick["Year"])
-                        valid_pick = valid_pick[valid_pick['Year']==sample_year]
-                        sample_month = np.random.choice(valid_pick["Month"])
-                        valid_pick = valid_pick[valid_pick['Month']==sample_month]
-                    else:
-                        sample_year = np.random.choice(list(range(2015,2020)))
-                        sample_month = np.random.choice(season_month(s))
-                    
-                    # Set sample year and month according to key
-                    
-                    if fix_sample:
-                        sample_year = sampling_key.loc[(i,scenario,s),'Year']
-                        sample_month = sampling_key.loc[(i,scenario,s),'Month']                        
-                    
-                    # Filter out the hours within the sample year
-                    
-                    solar_month = year_month_filter(solar_data,
-                                                    sample_year,
-                                                    sample_month)
-                    windonshore_month = year_month_filter(windonshore_data,
-                                                          sample_year,
-                                                          sample_month)
-                    windoffshore_month = year_month_filter(windoffshore_data,
-                                                           sample_year,
-                                                           sample_month)
-                    hydroror_month = year_month_filter(hydroror_data,
-                                                       sample_year,
-                                                       sample_month)
-                    hydroseasonal_month = year_month_filter(hydroseasonal_data,
-                                                            sample_year,
-                                                            sample_month)
-                    electricload_month = year_month_filter(electricload_data,
-                                                           sample_year,
-                                                           sample_month)
-                    
-                    if HEATMODULE:
-                        heatload_month = year_month_filter(heatload_data,
-                                                          sample_year,
-                                                          sample_month)
-                        cop_month = year_month_filter(cop_data,
-                                                      sample_year,
-                                                      sample_month)
-
-                    if LOADCHANGEMODULE:
-                        elecLoadMod_period = elecLoadMod_data.loc[elecLoadMod_data.Period.isin([i])]
-                        elecLoadMod_period = elecLoadMod_period.drop(columns=['Period'])
-                        elecLoadMod_month = year_month_filter(elecLoadMod_period,
-                                                              sample_year,
-                                                              sample_month)
-                        if HEATMODULE:
-                            heatLoadMod_period = heatLoadMod_data.loc[heatLoadMod_data.Period.isin([i])]
-                            heatLoadMod_period = heatLoadMod_period.drop(columns=['Period'])
-                            heatLoadMod_month = year_month_filter(heatLoadMod_period,
-                                                                  sample_year,
-                                                                  sample_month)
-                    
-                    # Filter the sample range by K-means if filter_sample=True
-                    
-                    if filter_use:
-                        sample_hour = np.random.choice(valid_pick['SampleIndex'])
-                    else:
-                        sample_hour = np.random.randint(
-                            0, solar_month.shape[0] - regularSeasonHours - 1)
-                    
-
-                    # Choose sample_hour from key or save sampling key
-
-                    if fix_sample:
-                        sample_hour = sampling_key.loc[(i,scenario,s),'Hour']
-                    else:
-                        df = pd.DataFrame(data={'Period': i,
-                                                'Scenario': scenario,
-                                                'Season': s,
-                                                'Year': sample_year,
-                                                'Month': sample_month,
-                                                'Hour': sample_hour}, index=[0])
-                        sampling_key = pd.concat([sampling_key, df], ignore_index=True)
-                    
-                    # Sample generator availability for regular seasons
-                    genAvail = pd.concat([genAvail,
-                                          sample_generator(data=solar_month,
-                                                           regularSeasonHours=regularSeasonHours,
-                                                           scenario=scenario, season=s,
-                                                           seasons=seasons, period=i,
-                                                           generator="Solar",
-                                                           sample_hour=sample_hour)],
-                                         ignore_index=True)
-                    genAvail = pd.concat([genAvail,
-                                          sample_generator(data=windonshore_month,
-                                                           regularSeasonHours=regularSeasonHours,
-                                                           scenario=scenario, season=s,
-                                                           seasons=seasons, period=i,
-                                                           generator="Windonshore",
-                                                           sample_hour=sample_hour)],
-                                         ignore_index=True)
-                    if north_sea:
-                        genAvail = pd.concat([genAvail,
-                                              sample_generator(data=windoffshore_month,
-                                                               regularSeasonHours=regularSeasonHours, 
-                                                               scenario=scenario, season=s,
-                                                               seasons=seasons, period=i,
-                                                               generator="Windoffshoregrounded", 
-                                                               sample_hour=sample_hour)],
-                                             ignore_index=True)
-                        genAvail = pd.concat([genAvail,
-                                              sample_generator(data=windoffshore_month,
-                                                               regularSeasonHours=regularSeasonHours, 
-                                                               scenario=scenario, season=s,
-                                                               seasons=seasons, period=i,
-                                                               generator="Windoffshorefloating", 
-                                                               sample_hour=sample_hour)],
-                                             ignore_index=True)
-                    else:
-                        genAvail = pd.concat([genAvail,
-                                              sample_generator(data=windoffshore_month,
-                                                               regularSeasonHours=regularSeasonHours, 
-                                                               scenario=scenario, season=s,
-                                                               seasons=seasons, period=i,
-                                                               generator="Windoffshore", 
-                                                               sample_hour=sample_hour)],
-                                             ignore_index=True)
-                    genAvail = pd.concat([genAvail,
-                                          sample_generator(data=hydroror_month,
-                                                           regularSeasonHours=regularSeasonHours, 
-                                                           scenario=scenario, season=s, 
-                                                           seasons=seasons, period=i, 
-                                                           generator="Hydrorun-of-the-river", 
-                                                           sample_hour=sample_hour)],
-                                         ignore_index=True)
-    
-                    # Sample electric load for regular seasons
-                    elecLoad = pd.concat([elecLoad,
-                                          sample_load(data=electricload_month,
-                                                      regularSeasonHours=regularSeasonHours,
-                                                      scenario=scenario, season=s,
-                                                      seasons=seasons, period=i, 
-                                                      sample_hour=sample_hour)],
-                                         ignore_index=True)
-                    
-                    # Sample seasonal hydro limit for regular seasons
-                    hydroSeasonal = pd.concat([hydroSeasonal,
-                                               sample_hydro(data=hydroseasonal_month,
-                                                            regularSeasonHours=regularSeasonHours,
-                                                            scenario=scenario, season=s, 
-                                                            seasons=seasons, period=i,
-                                                            sample_hour=sample_hour)],
-                                              ignore_index=True)                 
-                    
-                    # Sample HEATMODULE profiles
-                    if HEATMODULE:
-                        heatLoad = pd.concat([heatLoad,
-                                              sample_load(data=heatload_month,
-                                                          regularSeasonHours=regularSeasonHours,
-                                                          scenario=scenario, season=s,
-                                                          seasons=seasons, period=i,
-                                                          sample_hour=sample_hour)],
-                                             ignore_index=True)
-                        
-                        cop = pd.concat([cop,
-                                         sample_generator(data=cop_month,
-                                                          regularSeasonHours=regularSeasonHours,
-                                                          scenario=scenario, season=s,
-                                                          seasons=seasons, period=i,
-                                                          generator="HeatPumpAir",
-                                                          sample_hour=sample_hour)],
-                                        ignore_index=True)
-                    
-                    if LOADCHANGEMODULE:
-                        elecLoadMod = pd.concat([elecLoadMod,
-                                                 sample_load(data=elecLoadMod_month,
-                                                             regularSeasonHours=regularSeasonHours,
-                                                             scenario=scenario, season=s,
-                                                             seasons=seasons, period=i,
-                                                             sample_hour=sample_hour)],
-                                                ignore_index=True)
-                        
-                        if HEATMODULE:
-                            heatLoadMod = pd.concat([heatLoadMod,
-                                                     sample_load(data=heatLoadMod_month,
-                                                                 regularSeasonHours=regularSeasonHours,
-                                                                 scenario=scenario, season=s,
-                                                                 seasons=seasons, period=i,
-                                                                 sample_hour=sample_hour)],
-                                                    ignore_index=True)
-                
-                ################
-                ##PEAK SEASONS##
-                ################
-                
-                # Get peak sample year (2015-2019)
-                    
-                sample_year = np.random.choice(list(range(2015,2020)))
-                
-                if fix_sample:
-                    sample_year = sampling_key.loc[(i,scenario,'peak'),'Year']
-                else:
-                    df = pd.DataFrame(data={'Period': i,
-                                            'Scenario': scenario,
-                                            'Season': 'peak',
-                                            'Year': sample_year,
-                                            'Month': 0,
-                                            'Hour': 0}, index=[0])
-                    sampling_key = pd.concat([sampling_key, df], ignore_index=True)
-             
-                # Filter out the hours within the sample year
-                
-                solar_data_year = solar_data.loc[solar_data.year.isin([sample_year]), :]
-                windonshore_data_year = windonshore_data.loc[windonshore_data.year.isin([sample_year]), :]
-                windoffshore_data_year = windoffshore_data.loc[windoffshore_data.year.isin([sample_year]), :]
-                hydroror_data_year = hydroror_data.loc[hydroror_data.year.isin([sample_year]), :]
-                hydroseasonal_data_year = hydroseasonal_data.loc[hydroseasonal_data.year.isin([sample_year]), :]
-                electricload_data_year = electricload_data.loc[electricload_data.year.isin([sample_year]), :]
-                
-                if HEATMODULE:
-                    heatload_year = heatload_data.loc[heatload_data.year.isin([sample_year])]
-                    cop_year = cop_data.loc[cop_data.year.isin([sample_year])]
-
-                if LOADCHANGEMODULE:
-                	elecLoadMod_data_year = elecLoadMod_period.loc[elecLoadMod_period.year.isin([sample_year])]
-                	if HEATMODULE:
-                		heatLoadMod_data_year = heatLoadMod_period.loc[heatLoadMod_period.year.isin([sample_year])]
-            
-                #Peak1: The highest load when all loads are summed together
-                electricload_data_year_notime = remove_time_index(electricload_data_year)
-                overall_sample = electricload_data_year_notime.sum(axis=1).idxmax()
-                #Peak2: The highest load of a single country
-                max_load_country = electricload_data_year_notime.max().idxmax()
-                country_sample = electricload_data_year_notime[max_load_country].idxmax()
-    
-                #Sample generator availability for peak seasons
-                genAvail = pd.concat([genAvail,
-                                      sample_generator_peak(data=solar_data_year,
-                                                            seasons=seasons,
-                                                            g="Solar", scenario=scenario, period=i,
-                                                            regularSeasonHours=regularSeasonHours,
-                                                            peakSeasonHours=peakSeasonHours,
-                                                            overall_sample=overall_sample,
-                                                            country_sample=country_sample)],
-                                     ignore_index=True)
-                genAvail = pd.concat([genAvail,
-                                      sample_generator_peak(data=windonshore_data_year,
-                                                            seasons=seasons, 
-                                                            g="Windonshore", scenario=scenario, 
-                                                            period=i, 
-                                                            regularSeasonHours=regularSeasonHours,
-                                                            peakSeasonHours=peakSeasonHours,
-                                                            overall_sample=overall_sample, 
-                                                            country_sample=country_sample)],
-                                     ignore_index=True)
-                if north_sea:
-                    genAvail = pd.concat([genAvail,
-                          sample_generator_peak(data=windoffshore_data_year,
-                                                seasons=seasons, 
-                                                g="Windoffshoregrounded", scenario=scenario,
-                                                period=i, 
-                                                regularSeasonHours=regularSeasonHours, 
-                                                peakSeasonHours=peakSeasonHours, 
-                                                overall_sample=overall_sample, 
-                                                country_sample=country_sample)],
-                         ignore_index=True)
-                    genAvail = pd.concat([genAvail,
-                          sample_generator_peak(data=windoffshore_data_year,
-                                                seasons=seasons, 
-                                                g="Windoffshorefloating", scenario=scenario,
-                                                period=i, 
-                                                regularSeasonHours=regularSeasonHours, 
-                                                peakSeasonHours=peakSeasonHours, 
-                                                overall_sample=overall_sample, 
-                                                country_sample=country_sample)],
-                         ignore_index=True)
-                else:
-                    genAvail = pd.concat([genAvail,
-                                          sample_generator_peak(data=windoffshore_data_year,
-                                                                seasons=seasons, 
-                                                                g="Windoffshore", scenario=scenario,
-                                                                period=i, 
-                                                                regularSeasonHours=regularSeasonHours, 
-                                                                peakSeasonHours=peakSeasonHours, 
-                                                                overall_sample=overall_sample, 
-                                                                country_sample=country_sample)],
-                                         ignore_index=True)
-                genAvail = pd.concat([genAvail,
-                                      sample_generator_peak(data=hydroror_data_year,
-                                                            seasons=seasons, 
-                                                            g="Hydrorun-of-the-river",
-                                                            scenario=scenario, period=i, 
-                                                            regularSeasonHours=regularSeasonHours,
-                                                            peakSeasonHours=peakSeasonHours,
-                                                            overall_sample=overall_sample, 
-                                                            country_sample=country_sample)],
-                                     ignore_index=True)
-
-                #Sample electric load for peak seasons
-                elecLoad = pd.concat([elecLoad,
-                                      sample_load_peak(data=electricload_data_year,
-                                                       seasons=seasons,
-                                                       scenario=scenario, period=i, 
-                                                       regularSeasonHours=regularSeasonHours, 
-                                                       peakSeasonHours=peakSeasonHours,
-                                                       overall_sample=overall_sample, 
-                                                       country_sample=country_sample)],
-                                     ignore_index=True)
-
-                #Sample seasonal hydro limit for peak seasons
-                hydroSeasonal = pd.concat([hydroSeasonal,
-                                           sample_hydro_peak(data=hydroseasonal_data_year,
-                                                             seasons=seasons,
-                                                             scenario=scenario, period=i, 
-                                                             regularSeasonHours=regularSeasonHours, 
-                                                             peakSeasonHours=peakSeasonHours,
-                                                             overall_sample=overall_sample, 
-                                                             country_sample=country_sample)],
-                                          ignore_index=True)
-                
-                # Sample HEATMODULE profiles
+            elecLoadMod_periods[i] = elecLoadMod_data.loc[elecLoadMod_data.Period.isin([i])]
+            elecLoadMod_periods[i] = elecLoadMod_periods[i].drop(columns=['Period'])
+            sources[('elecLoadMod', i)] = elecLoadMod_periods[i]
+            if HEATMODULE:
+                heatLoadMod_periods[i] = heatLoadMod_data.loc[heatLoadMod_data.Period.isin([i])]
+                heatLoadMod_periods[i] = heatLoadMod_periods[i].drop(columns=['Period'])
+                sources[('heatLoadMod', i)] = heatLoadMod_periods[i]
+    index = calendar_index(sources)
+    
+    # One random stream per tree, period and scenario from the seed of the
+    # run. The scenarios are sampled on a pool of at most NO_OF_WORKERS
+    # processes (or one by one without a pool) and collected in a fixed
+    # order, so the result does not depend on the number of workers. The
+    # seed is saved next to the sampling key to repeat the run.
+    seed = np.random.SeedSequence(scenario_seed)
+    streams = [t.spawn(Periods * scenarios) for t in seed.spawn(n_tree_compare)]
+    units = [(tree, i, scenario) for tree in range(n_tree_compare)
+             for i in range(1,Periods+1) for scenario in range(1,scenarios+1)]
+    scenario_data = {'seasons': seasons, 'Periods': Periods, 'scenarios': scenarios,
+                     'regularSeasonHours': regularSeasonHours, 'peakSeasonHours': peakSeasonHours,
+                     'filter_use': filter_use, 'n_cluster': n_cluster, 'HEATMODULE': HEATMODULE,
+                     'LOADCHANGEMODULE': LOADCHANGEMODULE, 'fix_sample': fix_sample, 'north_sea': north_sea,
+                     'filter_result': filter_result if filter_use else None,
+                     'sampling_key': sampling_key if fix_sample else None, 'index': index,
+                     'solar_data': solar_data, 'windonshore_data': windonshore_data,
+                     'windoffshore_data': windoffshore_data, 'hydroror_data': hydroror_data,
+                     'hydroseasonal_data': hydroseasonal_data, 'electricload_data': electricload_data,
+                     'heatload_data': heatload_data if HEATMODULE else None,
+                     'cop_data': cop_data if HEATMODULE else None,
+                     'elecLoadMod_periods': elecLoadMod_periods if LOADCHANGEMODULE else None,
+                     'heatLoadMod_periods': heatLoadMod_periods if LOADCHANGEMODULE else None}
+    pool = process_pool(min(NO_OF_WORKERS, len(units)), init_sampler, (scenario_data,))
+    out = pool_map(pool, sample_scenario, [u[0] for u in units], [u[1] for u in units], [u[2] for u in units],
+                   [streams[tree][(i - 1) * scenarios + scenario - 1] for (tree, i, scenario) in units])
+    if pool is not None:
+        pool.shutdown()
+    
+    for tree in range(n_tree_compare):
+        for [samples, key_rows] in out[tree * Periods * scenarios:(tree + 1) * Periods * scenarios]:
+            genAvail.append(samples['genAvail'])
+            elecLoad.append(samples['elecLoad'])
+            hydroSeasonal.append(samples['hydroSeasonal'])
+            if HEATMODULE:
+                heatLoad.append(samples['heatLoad'])
+                cop.append(samples['cop'])
+            if LOADCHANGEMODULE:
+                elecLoadMod.append(samples['elecLoadMod'])
                 if HEATMODULE:
-                    heatLoad = pd.concat([heatLoad,
-                                          sample_load_peak(data=heatload_year,
-                                                           seasons=seasons,
-                                                           scenario=scenario, period=i,
-                                                           regularSeasonHours=regularSeasonHours,
-                                                           peakSeasonHours=peakSeasonHours,
-                                                           overall_sample=overall_sample,
-                                                           country_sample=country_sample)],
-                                         ignore_index=True)
-                    
-                    cop = pd.concat([cop,
-                                     sample_generator_peak(data=cop_year,
-                                                           seasons=seasons,
-                                                           g="HeatPumpAir",
-                                                           scenario=scenario, period=i,
-                                                           regularSeasonHours=regularSeasonHours,
-                                                           peakSeasonHours=peakSeasonHours,
-                                                           overall_sample=overall_sample,
-                                                           country_sample=country_sample)],
-                                    ignore_index=True)
-                
-                # Sample the change of load
-                if LOADCHANGEMODULE:
-                    elecLoadMod = pd.concat([elecLoadMod,
-                                             sample_load_peak(data=elecLoadMod_data_year,
-                                                              seasons=seasons,
-                                                              scenario=scenario, period=i,
-                                                              regularSeasonHours=regularSeasonHours,
-                                                              peakSeasonHours=peakSeasonHours,
-                                                              overall_sample=overall_sample,
-                                                              country_sample=country_sample)],
-                                            ignore_index=True)
-                    
-                    if HEATMODULE:
-                        heatLoadMod = pd.concat([heatLoadMod,
-                                                 sample_load_peak(data=heatLoadMod_data_year,
-                                                                  seasons=seasons,
-                                                                  scenario=scenario, period=i,
-                                                                  regularSeasonHours=regularSeasonHours,
-                                                                  peakSeasonHours=peakSeasonHours,
-                                                                  overall_sample=overall_sample,
-                                                                  country_sample=country_sample)],
-                                                ignore_index=True)
+                    heatLoadMod.append(samples['heatLoadMod'])
+            if not fix_sample:
+                sampling_key += key_rows
         
         if moment_matching:
             #Save the tree
@@ -816,6 +977,7 @@ def generate_random_scenario(filepath, tab_file_path, scenarios, seasons,
             elecLoad_dict[tree] = elecLoad
             hydroSeasonal_dict[tree] = hydroSeasonal
             #Calculate the tree score
+            elecLoad = pd.concat(elecLoad, ignore_index=True)
             score = []
             for s in seasons:
                 hours = list(range(1 + regularSeasonHours * seasons.index(s),
@@ -834,9 +996,9 @@ def generate_random_scenario(filepath, tab_file_path, scenarios, seasons,
                     score.append(weight[s+c]*(relmeandist + relvardist + relskewdist + relkurtdist))
             score_dict[tree] = sum(score)
             #Reset the tree
-            genAvail = pd.DataFrame()
-            elecLoad = pd.DataFrame()
-            hydroSeasonal = pd.DataFrame()
+            genAvail = []
+            elecLoad = []
+            hydroSeasonal = []
     
     if moment_matching:
         min_tree_key = min(score_dict, key=score_dict.get)
@@ -844,6 +1006,19 @@ def generate_random_scenario(filepath, tab_file_path, scenarios, seasons,
         elecLoad = elecLoad_dict[min_tree_key]
         hydroSeasonal = hydroSeasonal_dict[min_tree_key] 
     
+    genAvail = pd.concat(genAvail, ignore_index=True)
+    elecLoad = pd.concat(elecLoad, ignore_index=True)
+    hydroSeasonal = pd.concat(hydroSeasonal, ignore_index=True)
+    
+    if HEATMODULE:
+        heatLoad = pd.concat(heatLoad, ignore_index=True)
+        cop = pd.concat(cop, ignore_index=True)
+        
+    if LOADCHANGEMODULE:
+        elecLoadMod = pd.concat(elecLoadMod, ignore_index=True)
+        if HEATMODULE:
+            heatLoadMod = pd.concat(heatLoadMod, ignore_index=True)
+    
     #Replace country codes with country names
     genAvail = genAvail.replace({"Node": dict_countries})
     elecLoad = elecLoad.replace({"Node": dict_countries})
@@ -888,10 +1063,14 @@ def generate_random_scenario(filepath, tab_file_path, scenarios, seasons,
     # Save sampling key
     if fix_sample:
         sampling_key = sampling_key.reset_index(level=['Period','Scenario','Season'])
+    else:
+        sampling_key = pd.DataFrame(sampling_key, columns=['Period','Scenario','Season','Year','Month','Hour'])
         
     sampling_key.to_csv(
         tab_file_path + "/sampling_key" + '.csv',
         header=True, index=None, mode='w')        
+    with open(tab_file_path + "/scenario_seed" + '.txt', 'w') as f:
+        f.write(str(seed.entropy) + "\n")
 
     genAvail.to_csv(
         tab_file_path + "/Stochastic_StochasticAvailability" + '.tab',
@@ -20,9 +20,13 @@ lengthPeakSeason = 24
 discountrate = 0.05
 WACC = 0.05
 LeapYearsInvestment = 5
-solver = "Gurobi" #"Xpress" # #"CPLEX"
+solver = "Gurobi" #"Xpress" # #"CPLEX" #"HiGHS"
+SOLVER_INTERFACE = "file" #"memory"
+OUTPUT_FORMAT = "csv" #"parquet" #"arrow"
+OUTPUT_LEVEL = "hourly" #"daily" #"seasonal" #"capacity" #"summary"
 scenariogeneration = False#True #
 fix_sample = True#False #
+scenario_seed = None #1
 time_format = "%d/%m/%Y %H:%M"
 HEATMODULE = True #False#
 DRMODULE = False#True #
@@ -31,8 +35,24 @@ EMISSION_CAP = True #False
 IAMC_PRINT = False #True
 WRITE_LP = False #True
 PICKLE_INSTANCE = False #True
+SNAPSHOT = False #True
+BUILD_ENGINE = "pyomo" #"array"
+SOLUTION_METHOD = "extensive" #"benders" #"ph"
+BENDERS_GAP = 1e-4
+BENDERS_MAX_ITER = 200
+BENDERS_CUTS = "scenario" #"period-scenario" #"single"
+PH_TOLERANCE = 1e-3
+PH_MAX_ITER = 200
+PH_RHO_SCALE = 1.0
+NO_OF_WORKERS = 4
+EXCEL_ENGINE = "openpyxl" #"calamine"
+USE_TAB_CACHE = True #False
+WRITE_TAB_FILES = True #False
+USE_SERIES_CACHE = True #False
 OUT_OF_SAMPLE = False #True
 NoOfScenariosOOS = 20
+OOS_SPLIT = "none" #"scenario" #"season"
+OOS_BATCH_SIZE = 0 #20
 filter_make = False#True #False 
 filter_use = False#True #
 n_cluster = 10
@@ -60,6 +80,7 @@ tab_file_path = 'Data handler/' + version + '/Tab_Files_' + name
 scenario_data_path = 'Data handler/' + version + '/ScenarioData'
 sample_file_path = 'Data handler/' + version + '/OutOfSample'
 result_file_path = 'Results/' + name
+cache_path = 'Cache/' + version
 FirstHoursOfRegSeason = [lengthRegSeason*i + 1 for i in range(NoOfRegSeason)]
 FirstHoursOfPeakSeason = [lengthRegSeason*NoOfRegSeason + lengthPeakSeason*i + 1 for i in range(NoOfPeakSeason)]
 Period = [i + 1 for i in range(NoOfPeriods)]
@@ -114,10 +135,18 @@ if scenariogeneration:
                              n_tree_compare = n_tree_compare,
                              HEATMODULE = HEATMODULE,
                              LOADCHANGEMODULE = LOADCHANGEMODULE,
-                             fix_sample = fix_sample)
+                             fix_sample = fix_sample,
+                             north_sea = False,
+                             USE_SERIES_CACHE = USE_SERIES_CACHE,
+                             NO_OF_WORKERS = NO_OF_WORKERS,
+                             scenario_seed = scenario_seed,
+                             cache_path = cache_path)
 
-generate_tab_files(filepath = workbook_path, tab_file_path = tab_file_path,
-                   HEATMODULE = HEATMODULE, DRMODULE = DRMODULE)
+tab_frames = generate_tab_files(filepath = workbook_path, tab_file_path = tab_file_path,
+                                HEATMODULE = HEATMODULE, DRMODULE = DRMODULE,
+                                NO_OF_WORKERS = NO_OF_WORKERS, EXCEL_ENGINE = EXCEL_ENGINE,
+                                USE_TAB_CACHE = USE_TAB_CACHE, WRITE_TAB_FILES = WRITE_TAB_FILES,
+                                cache_path = cache_path)
 
 run_empire(name = name, 
            tab_file_path = tab_file_path,
@@ -147,7 +176,23 @@ run_empire(name = name,
            OUT_OF_SAMPLE = False,
            sample_file_path = sample_file_path,
            USE_TEMP_DIR = USE_TEMP_DIR,
-           LOADCHANGEMODULE = LOADCHANGEMODULE)
+           LOADCHANGEMODULE = LOADCHANGEMODULE,
+           BUILD_ENGINE = BUILD_ENGINE,
+           SOLUTION_METHOD = SOLUTION_METHOD,
+           BENDERS_GAP = BENDERS_GAP,
+           BENDERS_MAX_ITER = BENDERS_MAX_ITER,
+           BENDERS_CUTS = BENDERS_CUTS,
+           PH_TOLERANCE = PH_TOLERANCE,
+           PH_MAX_ITER = PH_MAX_ITER,
+           PH_RHO_SCALE = PH_RHO_SCALE,
+           NO_OF_WORKERS = NO_OF_WORKERS,
+           OOS_SPLIT = OOS_SPLIT,
+           OOS_BATCH_SIZE = OOS_BATCH_SIZE,
+           SOLVER_INTERFACE = SOLVER_INTERFACE,
+           OUTPUT_FORMAT = OUTPUT_FORMAT,
+           OUTPUT_LEVEL = OUTPUT_LEVEL,
+           SNAPSHOT = SNAPSHOT,
+           tab_frames = tab_frames)
 
 if OUT_OF_SAMPLE:
     run_empire(name = name, 
@@ -178,4 +223,20 @@ if OUT_OF_SAMPLE:
                OUT_OF_SAMPLE = OUT_OF_SAMPLE,
                sample_file_path = sample_file_path,
                USE_TEMP_DIR = USE_TEMP_DIR,
-               LOADCHANGEMODULE = LOADCHANGEMODULE)
+               LOADCHANGEMODULE = LOADCHANGEMODULE,
+               BUILD_ENGINE = BUILD_ENGINE,
+               SOLUTION_METHOD = SOLUTION_METHOD,
+               BENDERS_GAP = BENDERS_GAP,
+               BENDERS_MAX_ITER = BENDERS_MAX_ITER,
+               BENDERS_CUTS = BENDERS_CUTS,
+               PH_TOLERANCE = PH_TOLERANCE,
+               PH_MAX_ITER = PH_MAX_ITER,
+               PH_RHO_SCALE = PH_RHO_SCALE,
+               NO_OF_WORKERS = NO_OF_WORKERS,
+               OOS_SPLIT = OOS_SPLIT,
+               OOS_BATCH_SIZE = OOS_BATCH_SIZE,
+               SOLVER_INTERFACE = SOLVER_INTERFACE,
+               OUTPUT_FORMAT = OUTPUT_FORMAT,
+               OUTPUT_LEVEL = OUTPUT_LEVEL,
+               SNAPSHOT = SNAPSHOT,
+               tab_frames = tab_frames)
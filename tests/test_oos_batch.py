@@ -0,0 +1,77 @@
+import pytest
+
+pyo = pytest.importorskip('pyomo.environ')
+from empire_oos import solve_batches
+
+NODES = ['Norway', 'Germany']
+SCENARIOS = ['scenario1', 'scenario2', 'scenario3', 'scenario4', 'scenario5']
+PROBABILITY = {w: 0.2 for w in SCENARIOS}
+LOAD = {'Norway': [50., 80., 65., 30., 45.], 'Germany': [90., 70., 110., 60., 85.]}
+HYDRO = {'Norway': [40., 20., 60., 35., 10.], 'Germany': [0.]*5}
+FIRST_STAGE = 1000.
+
+@pytest.fixture(autouse=True)
+def highs():
+    if not pyo.SolverFactory('appsi_highs').available(exception_flag=False):
+        pytest.skip('appsi_highs is not available')
+
+def values(slots, batch):
+    #Stochastic parameters of the scenarios in batch over the model scenarios,
+    #a short batch repeats its first scenario with zero probability
+    size = len(batch)
+    batch = batch + [batch[0]]*(len(slots) - size)
+    prob = {slot: (PROBABILITY[w] if k < size else 0.) for (k, (slot, w)) in enumerate(zip(slots, batch))}
+    pos = [SCENARIOS.index(w) for w in batch]
+    return {'sceProbab': prob,
+            'sload': {(n, slot): LOAD[n][p] for n in NODES for (slot, p) in zip(slots, pos)},
+            'hydroAvail': {(n, slot): HYDRO[n][p] for n in NODES for (slot, p) in zip(slots, pos)}}
+
+def build(slots, batch, budget):
+    #Hydro and gas supply the load of every node, hydro is limited per scenario
+    #and by the expected production over the scenarios as in hydro_node_limit
+    m = pyo.ConcreteModel()
+    m.Node = pyo.Set(initialize=NODES, ordered=True)
+    m.PeriodActive = pyo.Set(initialize=[1], ordered=True)
+    m.Scenario = pyo.Set(initialize=slots, ordered=True)
+    v = values(slots, batch)
+    m.sceProbab = pyo.Param(m.Scenario, initialize=v['sceProbab'], mutable=True)
+    m.sload = pyo.Param(m.Node, m.Scenario, initialize=v['sload'], mutable=True)
+    m.hydroAvail = pyo.Param(m.Node, m.Scenario, initialize=v['hydroAvail'], mutable=True)
+    m.maxHydroNode = pyo.Param(m.Node, initialize={'Norway': budget, 'Germany': 0.}, mutable=True)
+    m.hydro = pyo.Var(m.Node, m.PeriodActive, m.Scenario, domain=pyo.NonNegativeReals)
+    m.gas = pyo.Var(m.Node, m.PeriodActive, m.Scenario, domain=pyo.NonNegativeReals)
+    m.FlowBalance = pyo.Constraint(m.Node, m.PeriodActive, m.Scenario,
+                                   rule=lambda m, n, i, w: m.hydro[n,i,w] + m.gas[n,i,w] == m.sload[n,w])
+    m.hydro_gen_limit = pyo.Constraint(m.Node, m.PeriodActive, m.Scenario,
+                                       rule=lambda m, n, i, w: m.hydro[n,i,w] <= m.hydroAvail[n,w])
+    m.hydro_node_limit = pyo.Constraint(m.Node, m.PeriodActive,
+                                        rule=lambda m, n, i: sum(m.sceProbab[w]*m.hydro[n,i,w] for w in m.Scenario) - m.maxHydroNode[n] <= 0)
+    m.Obj = pyo.Objective(expr=FIRST_STAGE + sum(scenario_cost(m, i, w) for i in m.PeriodActive for w in m.Scenario))
+    return m
+
+def scenario_cost(m, i, w):
+    return m.sceProbab[w]*sum(1.*m.hydro[n,i,w] + 10.*m.gas[n,i,w] for n in m.Node)
+
+def solve_in_batches(size, budget, logfile):
+    batches = [SCENARIOS[k:k + size] for k in range(0, len(SCENARIOS), size)]
+    m = build(batches[0], batches[0], budget)
+    return solve_batches(m, batches, PROBABILITY, lambda batch: values(batches[0], batch),
+                         lambda i, w: pyo.value(scenario_cost(m, i, w)), 'HiGHS', logfile)
+
+def solve_all(budget):
+    m = build(SCENARIOS, SCENARIOS, budget)
+    results = pyo.SolverFactory('appsi_highs').solve(m)
+    assert results.solver.termination_condition == pyo.TerminationCondition.optimal
+    return pyo.value(m.Obj)
+
+@pytest.mark.parametrize('size', [2, 3])
+def test_batches_give_objective_of_all_scenarios(size, tmp_path):
+    objective, costs = solve_in_batches(size, 1000., str(tmp_path / 'batches.log'))
+    assert objective == pytest.approx(solve_all(budget=1000.), rel=1e-6)
+    assert sorted(w for (i, w, cost) in costs) == SCENARIOS
+
+def test_binding_hydro_budget_is_refused(tmp_path):
+    #The budget binds over all scenarios, the batches would split it
+    assert solve_all(budget=20.) > solve_all(budget=1000.)
+    with pytest.raises(SystemExit, match="Hydro budget of Norway binds"):
+        solve_in_batches(2, 20., str(tmp_path / 'batches.log'))
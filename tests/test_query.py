@@ -0,0 +1,70 @@
+import os
+import pandas as pd
+import pytest
+import empire_query
+from empire_query import query, compare
+
+PERIODS = ['2020-2025', '2025-2030']
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    empire_query._cache.clear()
+    empire_query._tables.clear()
+
+def write_gen(path, scale=1.0):
+    #results_output_gen.csv of two nodes with two generators
+    os.makedirs(path, exist_ok=True)
+    df = pd.DataFrame({'Node': ['Norway', 'Norway', 'Germany', 'Germany']*2,
+                       'GeneratorType': ['Hydroregulated', 'Windonshore']*4,
+                       'Period': [p for p in PERIODS for k in range(4)],
+                       'genInstalledCap_MW': [scale*x for x in [10., 20., 30., 40., 15., 25., 35., 45.]]})
+    df.to_csv(path + "/" + 'results_output_gen.csv', index=False)
+
+def test_integer_period_is_position_of_label(tmp_path):
+    source = str(tmp_path / 'run')
+    write_gen(source)
+    for (i, label) in enumerate(PERIODS, start=1):
+        by_position = query(source, 'genInstalledCap_MW', by=['Node'], Period=i)
+        by_label = query(source, 'genInstalledCap_MW', by=['Node'], Period=label)
+        assert len(by_position) == 2
+        assert by_position.equals(by_label)
+    assert query(source, 'genInstalledCap_MW', Node='Norway', Generator='Windonshore', Period=2) == 25.
+
+def test_compare_keeps_cached_queries(tmp_path):
+    cached = str(tmp_path / 'cached')
+    other = str(tmp_path / 'other')
+    write_gen(cached)
+    write_gen(other, scale=2.0)
+    expected = query(cached, 'genInstalledCap_MW', by=['Node'], Period=2)
+    compared = compare([cached, other], 'genInstalledCap_MW', by=['Node'], NO_OF_WORKERS=1, Period=2)
+    result = compared[compared['Run'] == cached].drop(columns='Run').reset_index(drop=True)
+    assert result.equals(expected)
+    result = compared[compared['Run'] == other].drop(columns='Run').reset_index(drop=True)
+    assert list(result['genInstalledCap_MW']) == [2*x for x in expected['genInstalledCap_MW']]
+
+def test_rewritten_dataset_is_read_again(tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    ds = pytest.importorskip('pyarrow.dataset')
+    source = str(tmp_path / 'run')
+    path = source + "/" + 'results_output_transmision_operational'
+
+    def write(flow):
+        #Rewrite in place like write_hourly, into the Period=/Scenario= folders
+        table = pa.table({'FromNode': ['Norway', 'Germany'], 'ToNode': ['Germany', 'Norway'],
+                          'Period': [PERIODS[0]]*2, 'Scenario': ['scenario1']*2, 'TransmissionRecieved_MW': [flow, flow]})
+        ds.write_dataset(table, path, format='parquet', basename_template='part-{i}.parquet',
+                         partitioning=ds.partitioning(pa.schema([table.schema.field('Period'), table.schema.field('Scenario')]), flavor='hive'),
+                         existing_data_behavior='delete_matching')
+
+    write(1.0)
+    assert query(source, 'TransmissionRecieved_MW', Period=1) == 2.
+    folders = {f: os.stat(f) for f in [source, path]}
+    write(2.0)
+    #Only the part files tell the rerun apart
+    for (f, st) in folders.items():
+        os.utime(f, ns=(st.st_atime_ns, st.st_mtime_ns))
+    for (folder, subfolders, files) in os.walk(path):
+        for f in files:
+            st = os.stat(folder + "/" + f)
+            os.utime(folder + "/" + f, ns=(st.st_atime_ns, st.st_mtime_ns + 10**10))
+    assert query(source, 'TransmissionRecieved_MW', Period=1) == 4.